@@ -1,62 +1,69 @@
 import sys
-import asyncio
+import logging
 import threading
 import time
-import json
-import logging
 from collections import deque
+from functools import partial
 from PyQt5.QtWidgets import (QApplication, QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLabel, QSlider,
-                             QFrame, QColorDialog, QGridLayout, QLineEdit, QMessageBox, QDialog, QListWidget, QTextEdit,
-                             QMenuBar, QAction, QMainWindow, QComboBox, QWidgetAction)
-from PyQt5.QtGui import QIntValidator
-from PyQt5.QtCore import QThread, pyqtSignal, QObject, Qt
-from bleak import BleakClient, BleakScanner
-from openrgb import OpenRGBClient
-from openrgb.utils import RGBColor
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg
+                             QFrame, QColorDialog, QGridLayout, QLineEdit, QMessageBox, QDialog, QListWidget, QListWidgetItem, QTextEdit,
+                             QMenuBar, QAction, QMainWindow, QComboBox, QWidgetAction, QCheckBox, QFileDialog)
+from PyQt5.QtGui import QColor, QIntValidator, QPalette
+from PyQt5.QtCore import QThread, pyqtSignal, QObject, Qt, QFileSystemWatcher, QTimer
 import gettext
 import os
-from logging.handlers import RotatingFileHandler  # Import the RotatingFileHandler
+from log_setup import setup_logging
+from metrics import registry, serve as serve_metrics
+from sample_feed import SampleFeed
+from config_store import ConfigStore
+from led_output import LedOutputService
+from led_renderer import LedRenderWorker
+from ble_discovery import GattCache, stream_discovery
+from ble_executor import BleExecutor
+from ble_supervisor import STATE_CONNECTING, STATE_CONNECTED, STATE_RECONNECTING
+from input_sources import SOURCES
+from session_export import export_csv, export_fit
+from trainer_pipeline import CUSTOM_PROFILE, BleSession, bleak_client, create_riders
+
+# Journalisation en file d'attente : fichier tournant (200 Ko, 5 sauvegardes) et console
+setup_logging("trainer_led.log")
+logging.info("Configuration du logging terminée")
 
-# Configuration du logging avec RotatingFileHandler
-log_formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-log_handler = RotatingFileHandler("trainer_led.log", maxBytes=200*1024, backupCount=5)  # 200KB per file, keep 5 backups
-log_handler.setFormatter(log_formatter)
+# Chemin du fichier de configuration
+CONFIG_FILE = 'config.json'
 
-console_handler = logging.StreamHandler(sys.stdout)
-console_handler.setFormatter(log_formatter)
+# Cache des cartes GATT des périphériques déjà connectés
+GATT_CACHE_FILE = 'gatt_cache.json'
 
-logging.basicConfig(
-    level=logging.INFO,
-    handlers=[
-        log_handler,
-        console_handler
-    ]
-)
+# Mesures de l'application écrites à la fermeture
+METRICS_FILE = 'metrics.json'
 
-print("Configuration du logging terminée")
+# Durée d'une recherche de périphériques (s)
+SCAN_TIMEOUT = 10.0
 
-# Chemin du fichier de configuration
-CONFIG_FILE = 'config.json'
+# Configuration gardée en mémoire, écrite sur disque en tâche de fond
+config_store = ConfigStore(CONFIG_FILE)
+gatt_cache = GattCache(GATT_CACHE_FILE)
 
-# Variable globale pour arrêter le script
-running = True
+# Thread et boucle asyncio uniques pour tout le travail Bluetooth
+ble_executor = BleExecutor()
 
-# Déclaration des variables pour la puissance et la couleur
-power_values = deque(maxlen=10)
-last_update_time = time.time()
-current_color = RGBColor(0, 0, 0)
-color_lock = threading.Lock()
+# Connexion OpenRGB partagée entre les notifications et les boutons Démarrer/Arrêter
+led_output = LedOutputService()
+# Thread unique qui applique les transitions de couleur
+led_renderer = LedRenderWorker(led_output)
 
-# UUID du service et de la caractéristique pour les notifications de puissance
-SERVICE_UUID = '00001818-0000-1000-8000-00805f9b34fb'
-CHARACTERISTIC_UUID = '00002a63-0000-1000-8000-00805f9b34fb'
+# Rafraîchissement de l'interface : images affichées, images en retard sur le minuteur,
+# valeurs remplacées avant d'être affichées, âge de la plus ancienne valeur affichée et durée d'une image
+gui_frames = registry.counter('gui.frames')
+gui_frames_dropped = registry.counter('gui.frames_dropped')
+gui_coalesced = registry.counter('gui.coalesced')
+gui_latency = registry.histogram('gui.latency_s')
+gui_refresh_time = registry.histogram('gui.refresh_s')
 
 # Fonction pour changer la langue
 def set_language(lang_code):
     global current_language
-    print(f"Changement de langue : {lang_code}")
+    logging.info(f"Changement de langue : {lang_code}")
     localedir = os.path.join(os.path.dirname(__file__), 'translations')
     translation = gettext.translation('translations', localedir, languages=[lang_code], fallback=True)
     translation.install()
@@ -64,230 +71,187 @@ def set_language(lang_code):
     global _
     _ = translation.gettext
 
-# Classe pour gérer les notifications de puissance
-class PowerNotificationHandler(QObject):
-    power_updated = pyqtSignal(int)
-    color_updated = pyqtSignal(tuple)
-
-    def __init__(self):
-        super().__init__()
-        print("Initialisation du gestionnaire de notifications de puissance")
-        self.zone_thresholds, self.zone_colors, self.default_device, self.default_language = self.load_config()
-        set_language(self.default_language)  # Initialiser la langue par défaut
-        print("Configuration chargée")
-
-    def load_config(self):
-        try:
-            with open(CONFIG_FILE, 'r') as f:
-                config = json.load(f)
-                zone_thresholds = config['thresholds']
-                zone_colors = [tuple(color) for color in config['colors']]
-                default_device = config.get('default_device', '')
-                default_language = config.get('default_language', 'fr')
-                return zone_thresholds, zone_colors, default_device, default_language
-        except (FileNotFoundError, KeyError, ValueError) as e:
-            logging.error("Erreur lors du chargement de la configuration", exc_info=True)
-            return [106, 146, 175, 205, 234, 293], [
-                (255, 255, 255),  # Default color for zone 1
-                (0, 0, 255),      # Default color pour zone 2
-                (0, 255, 0),      # Default color pour zone 3
-                (255, 255, 0),    # Default color pour zone 4
-                (255, 165, 0),    # Default color pour la zone 5
-                (255, 0, 0),      # Default color pour la zone 6
-                (128, 0, 128)     # Default color pour la zone 7
-            ], '', 'fr'
-
-    def save_config(self):
-        config = {
-            'thresholds': self.zone_thresholds,
-            'colors': [list(color) for color in self.zone_colors],
-            'default_device': self.default_device,
-            'default_language': current_language  # Enregistrer la langue actuelle
-        }
-        try:
-            with open(CONFIG_FILE, 'w') as f:
-                json.dump(config, f)
-        except Exception as e:
-            logging.error("Erreur lors de la sauvegarde de la configuration", exc_info=True)
-
-    def restore_default_config(self):
-        self.zone_thresholds = [106, 146, 175, 205, 234, 293]
-        self.zone_colors = [
-            (255, 255, 255),  # Default color for zone 1
-            (0, 0, 255),      # Default color pour zone 2
-            (0, 255, 0),      # Default color pour zone 3
-            (255, 255, 0),    # Default color pour zone 4
-            (255, 165, 0),    # Default color pour la zone 5
-            (255, 0, 0),      # Default color pour la zone 6
-            (128, 0, 128)     # Default color pour la zone 7
-        ]
-        self.default_device = ''
-        self.default_language = 'fr'
-        set_language(self.default_language)  # Réinitialiser la langue par défaut
-        self.save_config()
-
-    def set_default_device(self, device_address):
-        self.default_device = device_address
-        self.save_config()
-
-    def get_zone_ranges(self):
-        ranges = []
-        lower_bound = 0
-        for threshold in self.zone_thresholds:
-            ranges.append((lower_bound, threshold))
-            lower_bound = threshold + 1
-        ranges.append((lower_bound, float('inf')))  # La dernière plage est ouverte
-        return ranges
-
-    def set_zone_threshold(self, index, value):
-        self.zone_thresholds[index] = value
-        self.save_config()
-
-    def set_zone_color(self, index, color):
-        self.zone_colors[index] = color
-        self.save_config()
-
-    def handle_notification(self, sender, data):
-        global last_update_time
-        try:
-            puissance = int.from_bytes(data[2:4], byteorder='little')
-            last_update_time = time.time()
-            power_values.append(puissance)
-
-            if len(power_values) == power_values.maxlen:
-                avg_puissance = sum(power_values) / len(power_values)
-                self.power_updated.emit(int(avg_puissance))
-
-                for i, threshold in enumerate(self.zone_thresholds):
-                    if avg_puissance <= threshold:
-                        new_color = self.zone_colors[i]
-                        zone = i + 1
-                        break
-                else:
-                    new_color = self.zone_colors[-1]
-                    zone = len(self.zone_colors)
-
-                self.color_updated.emit((new_color, zone))
-                threading.Thread(target=set_led_color_with_transition, args=new_color).start()
-        except Exception as e:
-            logging.error("Erreur lors de la gestion des données de puissance", exc_info=True)
-
-def set_led_color_with_transition(r, g, b, steps=10, delay=0.01):
-    global current_color
-    try:
-        client = OpenRGBClient('localhost', 6742)
-        devices = client.devices
-
-        with color_lock:
-            current_r = current_color.red
-            current_g = current_color.green
-            current_b = current_color.blue
-
-        step_r = (r - current_r) / steps
-        step_g = (g - current_g) / steps
-        step_b = (b - current_b) / steps
-
-        for i in range(steps):
-            new_r = int(current_r + step_r * i)
-            new_g = int(current_g + step_g * i)
-            new_b = int(current_b + step_b * i)
-            color = RGBColor(new_r, new_g, new_b)
-
-            with color_lock:
-                current_color = color
-                for device in devices:
-                    device.set_color(color)
-            time.sleep(delay)
-
-        final_color = RGBColor(r, g, b)
-        with color_lock:
-            current_color = final_color
-            for device in devices:
-                device.set_color(final_color)
-    except Exception as e:
-        logging.error("Erreur de connexion à OpenRGB", exc_info=True)
-
-async def main(notification_handler, device_address, service_uuid, characteristic_uuid, status_label):
-    global last_update_time, running
-    retry_attempts = 5
-    status_label.setText(_("En attente de connexion au périphérique"))
-    for attempt in range(retry_attempts):
-        try:
-            async with BleakClient(device_address) as client:
-                status_label.setText(_("Périphérique {device_address} connecté").format(device_address=device_address))
-                await client.start_notify(characteristic_uuid, notification_handler.handle_notification)
-                try:
-                    while running:
-                        if time.time() - last_update_time > 10:
-                            logging.warning("Aucune donnée reçue depuis 10 secondes, attente de nouvelles données...")
-                        await asyncio.sleep(1)
-                except asyncio.CancelledError:
-                    logging.info("Tâche annulée.")
-                except KeyboardInterrupt:
-                    running = False
-                    logging.info("Interruption reçue, arrêt du script...")
-                finally:
-                    await client.stop_notify(characteristic_uuid)
-                break
-        except Exception as e:
-            logging.error(f"Tentative {attempt + 1}/{retry_attempts} échouée", exc_info=True)
-            if attempt < retry_attempts - 1:
-                await asyncio.sleep(2)
-            else:
-                logging.error("Échec de la connexion après plusieurs tentatives, arrêt du script.")
-                status_label.setText(_("Échec de la connexion après plusieurs tentatives"))
+# Relais Qt des changements d'état de connexion : émis depuis le thread Bluetooth, ils sont
+# traités dans le thread de l'interface
+class PipelineSignals(QObject):
+    # Adresse, état (voir ble_supervisor) et détails : tentative, délai avant reconnexion, temps de reconnexion
+    connection_state_changed = pyqtSignal(str, str, object)
 
-class AsyncThread(QThread):
-    def __init__(self, notification_handler, device_address, service_uuid, characteristic_uuid, status_label):
+    def __init__(self, pipeline):
         super().__init__()
-        self.notification_handler = notification_handler
-        self.device_address = device_address
-        self.service_uuid = service_uuid
-        self.characteristic_uuid = characteristic_uuid
-        self.status_label = status_label
+        pipeline.subscribe('connection_state', self.connection_state_changed.emit)
+
+# Dernières mesures du pipeline, écrites par le thread Bluetooth et lues à chaque image par le
+# minuteur de l'interface : entre deux images seule la dernière valeur de chaque mesure est
+# gardée, et les puissances sont conservées pour le graphique (les plus anciennes au-delà de max_points)
+class PipelineView:
+    EVENTS = ('power', 'color', 'cadence', 'speed', 'heart_rate')
+
+    def __init__(self, pipeline, max_points=1000):
+        self.lock = threading.Lock()
+        self.values = {}
+        self.points = deque(maxlen=max_points)
+        self.since = None
+        for event in self.EVENTS:
+            pipeline.subscribe(event, partial(self.update, event))
+
+    def update(self, event, *args):
+        value = args[0] if len(args) == 1 else args
+        with self.lock:
+            if event in self.values:
+                gui_coalesced.inc()
+            self.values[event] = value
+            if event == 'power':
+                self.points.append(value)
+            if self.since is None:
+                self.since = time.monotonic()
+
+    # Mesures arrivées depuis la dernière image, puissances du graphique et arrivée de la plus ancienne
+    def take(self):
+        with self.lock:
+            values, points, since = self.values, list(self.points), self.since
+            self.values = {}
+            self.points.clear()
+            self.since = None
+        return values, points, since
+
+# Pastille de couleur : la couleur passe par la palette, sans feuille de style à analyser
+def color_swatch(color=(0, 0, 0)):
+    frame = QFrame()
+    frame.setFixedSize(20, 20)
+    frame.setAutoFillBackground(True)
+    set_swatch_color(frame, color)
+    return frame
+
+def set_swatch_color(frame, color):
+    palette = frame.palette()
+    palette.setColor(QPalette.Window, QColor(*color))
+    frame.setPalette(palette)
+
+# Périphériques trouvés pendant la recherche : adresse, nom, RSSI (dBm), services annoncés
+class DiscoverySignals(QObject):
+    device_found = pyqtSignal(str, str, int, object)
+
+# Résultat d'une tâche Bluetooth renvoyé au thread de l'interface par un signal Qt
+class BleTaskSignals(QObject):
+    result_ready = pyqtSignal(object)
+
+def submit_ble_task(coro_factory, on_result, key=None):
+    signals = BleTaskSignals()
+    signals.result_ready.connect(on_result)
+
+    def done(future):
+        if future.cancelled():
+            return
+        if future.exception() is not None:
+            logging.error(f"Erreur lors de la tâche Bluetooth {key}", exc_info=future.exception())
+            signals.result_ready.emit([])
+        else:
+            signals.result_ready.emit(future.result() or [])
 
-    def run(self):
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        loop.run_until_complete(main(self.notification_handler, self.device_address, self.service_uuid, self.characteristic_uuid, self.status_label))
+    future = ble_executor.submit(coro_factory, key=key)
+    future.add_done_callback(done)
+    return future
 
-class AsyncTaskRunner(QThread):
-    result_ready = pyqtSignal(list)
+# Export CSV et FIT d'un enregistrement, hors du thread de l'interface
+class ExportThread(QThread):
+    export_finished = pyqtSignal(str)
 
-    def __init__(self, coro):
+    def __init__(self, log_path):
         super().__init__()
-        self.coro = coro
+        self.log_path = log_path
 
     def run(self):
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        result = loop.run_until_complete(self.coro)
-        if result is None:
-            result = []
-        self.result_ready.emit(result)
+        base = os.path.splitext(self.log_path)[0]
+        try:
+            export_csv(self.log_path, base + '.csv')
+            export_fit(self.log_path, base + '.fit')
+            self.export_finished.emit(base)
+        except Exception:
+            logging.error("Erreur lors de l'export de la sortie", exc_info=True)
+            self.export_finished.emit('')
 
 class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
-        print("Initialisation de la fenêtre principale")
-        self.notification_handler = PowerNotificationHandler()
-        self.notification_handler.power_updated.connect(self.update_power)
-        self.notification_handler.color_updated.connect(self.update_color)
+        logging.info("Initialisation de la fenêtre principale")
+        # L'interface est une vue du pipeline, qui fonctionne aussi sans elle (trainer_daemon.py).
+        # Un pipeline par cycliste : l'interface règle le premier, les autres viennent de "riders"
+        self.riders = create_riders(config_store, led_output, led_renderer, gatt_cache)
+        self.notification_handler = self.riders[0]
+        set_language(self.notification_handler.default_language)  # Initialiser la langue par défaut
+        self.pipeline_view = PipelineView(self.notification_handler)
+        self.pipeline_signals = PipelineSignals(self.notification_handler)
+        self.pipeline_signals.connection_state_changed.connect(self.update_connection_state)
+
+        self.discovery_signals = DiscoverySignals()
+        self.discovery_signals.device_found.connect(self.add_discovered_device)
+        self.device_items = {}
 
         self.central_widget = QWidget()
         self.setCentralWidget(self.central_widget)
 
         self.init_ui()
-        self.async_thread = None
+        self.init_rider_labels()
+        self.ble_session = None
+        self.chart = None
+
+        # Les mesures sont affichées au rythme de ce minuteur, pas à celui des notifications
+        self.refresh_interval = 1.0 / max(1, self.notification_handler.gui_refresh_hz)
+        self.last_refresh = None
+        self.last_analytics = None
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.timeout.connect(self.refresh_view)
+        self.refresh_timer.start(round(self.refresh_interval * 1000))
+        self.startup_pending = True
+        if not led_renderer.is_alive():
+            led_renderer.start()
         self.HOME_TRAINER_MAC = self.notification_handler.default_device
 
-        if self.HOME_TRAINER_MAC:
+        # Collecte locale des mesures (metrics_port à 0 : désactivée)
+        self.metrics_server = None
+        if self.notification_handler.metrics_port:
+            try:
+                self.metrics_server = serve_metrics(registry, self.notification_handler.metrics_port)
+            except OSError:
+                logging.error(f"Serveur de mesures impossible sur le port {self.notification_handler.metrics_port}", exc_info=True)
+
+        # Diffusion locale des échantillons de tous les cyclistes (feed_udp, feed_port)
+        self.sample_feed = None
+        if self.notification_handler.feed_udp or self.notification_handler.feed_port:
+            try:
+                self.sample_feed = SampleFeed(self.notification_handler.feed_udp, self.notification_handler.feed_port).start()
+            except (OSError, ValueError):
+                logging.error("Diffusion des échantillons impossible", exc_info=True)
+            else:
+                for rider in self.riders:
+                    self.sample_feed.attach(rider)
+
+        # Surveillance de config.json : le fichier et son dossier, car une écriture atomique
+        # (fichier temporaire renommé) remplace le fichier surveillé
+        self.config_watcher = QFileSystemWatcher(self)
+        self.config_watcher.addPath(os.path.dirname(os.path.abspath(CONFIG_FILE)))
+        self.watch_config_file()
+        self.config_watcher.fileChanged.connect(self.config_file_changed)
+        self.config_watcher.directoryChanged.connect(self.config_file_changed)
+
+    # La connexion Bluetooth et le graphique (import de matplotlib) attendent le premier
+    # affichage de la fenêtre
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if self.startup_pending:
+            self.startup_pending = False
+            QTimer.singleShot(0, self.finish_startup)
+
+    def finish_startup(self):
+        self.startup_pending = False
+        if self.HOME_TRAINER_MAC and self.ble_session is None:
             self.start_thread()
-
-        self.init_plot()
+        if self.chart is None:
+            self.init_plot()
 
     def init_ui(self):
-        print("Initialisation de l'interface utilisateur")
+        logging.info("Initialisation de l'interface utilisateur")
         self.setWindowTitle('TrainerLED')
         self.layout = QVBoxLayout(self.central_widget)
 
@@ -300,10 +264,13 @@ class MainWindow(QMainWindow):
         self.set_default_device_button = QPushButton(_('Définir comme périphérique par défaut'))
         self.status_label = QLabel(_('En attente de connexion au périphérique'))
         self.power_label = QLabel(_('Puissance: N/A'))
+        self.cadence_label = QLabel(_('Cadence: N/A'))
+        self.speed_label = QLabel(_('Vitesse: N/A'))
+        self.heart_rate_label = QLabel(_('Fréquence cardiaque: N/A'))
         self.zone_label = QLabel(_('Zone de puissance: N/A'))
-        self.color_frame = QFrame()
-        self.color_frame.setFixedSize(20, 20)
-        self.color_frame.setStyleSheet("background-color: rgb(0, 0, 0);")
+        self.analytics_label = QLabel(_('NP: N/A'))
+        self.time_in_zone_label = QLabel()
+        self.color_frame = color_swatch()
 
         self.search_button.clicked.connect(self.search_devices)
         self.device_list.itemClicked.connect(self.device_selected)
@@ -336,7 +303,29 @@ class MainWindow(QMainWindow):
         self.layout.addWidget(self.save_default_button)
         self.layout.addWidget(self.restore_default_button)
         self.layout.addWidget(self.power_label)
+        cadence_speed_layout = QHBoxLayout()
+        cadence_speed_layout.addWidget(self.cadence_label)
+        cadence_speed_layout.addWidget(self.speed_label)
+        cadence_speed_layout.addWidget(self.heart_rate_label)
+        self.layout.addLayout(cadence_speed_layout)
         self.layout.addLayout(power_zone_layout)
+        self.layout.addWidget(self.analytics_label)
+        self.layout.addWidget(self.time_in_zone_label)
+
+        profile_layout = QHBoxLayout()
+        self.profile_label = QLabel(_('Profil de zones'))
+        self.profile_selector = QComboBox()
+        self.profile_selector.currentIndexChanged.connect(self.change_zone_profile)
+        self.ftp_label = QLabel(_('FTP'))
+        self.ftp_edit = QLineEdit()
+        self.ftp_edit.setFixedWidth(50)
+        self.ftp_edit.setValidator(QIntValidator(1, 2000))
+        self.ftp_edit.editingFinished.connect(self.change_ftp)
+        profile_layout.addWidget(self.profile_label)
+        profile_layout.addWidget(self.profile_selector)
+        profile_layout.addWidget(self.ftp_label)
+        profile_layout.addWidget(self.ftp_edit)
+        self.layout.addLayout(profile_layout)
 
         grid_layout = QGridLayout()
 
@@ -367,9 +356,7 @@ class MainWindow(QMainWindow):
             color_button = QPushButton(_('Sélectionner Couleur Zone {index}').format(index=i + 1))
             color_button.clicked.connect(self.create_color_change_handler(i))
 
-            color_frame = QFrame()
-            color_frame.setFixedSize(20, 20)
-            color_frame.setStyleSheet(f"background-color: rgb({self.notification_handler.zone_colors[i][0]}, {self.notification_handler.zone_colors[i][1]}, {self.notification_handler.zone_colors[i][2]});")
+            color_frame = color_swatch(self.notification_handler.zone_colors[i])
 
             self.sliders.append(slider)
             self.color_buttons.append(color_button)
@@ -391,9 +378,7 @@ class MainWindow(QMainWindow):
         color_button_7 = QPushButton(_('Sélectionner Couleur Zone {index}').format(index=7))
         color_button_7.clicked.connect(self.create_color_change_handler(6))
 
-        color_frame_7 = QFrame()
-        color_frame_7.setFixedSize(20, 20)
-        color_frame_7.setStyleSheet(f"background-color: rgb({self.notification_handler.zone_colors[6][0]}, {self.notification_handler.zone_colors[6][1]}, {self.notification_handler.zone_colors[6][2]});")
+        color_frame_7 = color_swatch(self.notification_handler.zone_colors[6])
 
         slider_7 = QSlider(Qt.Horizontal)
         slider_7.setMinimum(0)
@@ -413,7 +398,16 @@ class MainWindow(QMainWindow):
         self.range_labels.append(range_label_7)
         self.layout.addLayout(grid_layout)
 
+        # Emplacement du graphique, remplacé par init_plot après le premier affichage
+        self.chart_placeholder = QLabel(_('Chargement du graphique...'))
+        self.chart_placeholder.setAlignment(Qt.AlignCenter)
+        self.layout.addWidget(self.chart_placeholder)
+        self.full_ride_checkbox = QCheckBox(_('Afficher toute la sortie'))
+        self.full_ride_checkbox.setEnabled(False)
+        self.layout.addWidget(self.full_ride_checkbox)
+
         self.update_ranges()
+        self.update_profile_selector()
 
         self.create_menu()
 
@@ -430,6 +424,11 @@ class MainWindow(QMainWindow):
         about_action.triggered.connect(self.show_about_dialog)
         about_menu.addAction(about_action)
 
+        sessions_menu = menu_bar.addMenu(_("Sorties"))
+        export_action = QAction(_("Exporter une sortie (CSV/FIT)"), self)
+        export_action.triggered.connect(self.export_session)
+        sessions_menu.addAction(export_action)
+
         language_menu = menu_bar.addMenu(_("Langue"))
 
         lang_selector = QComboBox(self)
@@ -442,16 +441,32 @@ class MainWindow(QMainWindow):
         language_widget_action.setDefaultWidget(lang_selector)
         language_menu.addAction(language_widget_action)
 
+    def export_session(self):
+        log_path, _filter = QFileDialog.getOpenFileName(self, _("Exporter une sortie (CSV/FIT)"),
+                                                        self.notification_handler.recording_dir,
+                                                        "TrainerLED (*.tled)")
+        if not log_path:
+            return
+        self.export_thread = ExportThread(log_path)
+        self.export_thread.export_finished.connect(self.session_exported)
+        self.export_thread.start()
+
+    def session_exported(self, base):
+        if base:
+            QMessageBox.information(self, _("Sorties"), _("Sortie exportée : {path}").format(path=base + '.csv / .fit'))
+        else:
+            QMessageBox.warning(self, _("Erreur"), _("Erreur lors de l'export de la sortie"))
+
     def change_language(self, index):
         lang_code = 'fr' if index == 0 else 'en'
-        print(f"Changement de langue demandé : {lang_code}")
+        logging.info(f"Changement de langue demandé : {lang_code}")
         set_language(lang_code)
         self.notification_handler.default_language = lang_code  # Mémoriser la langue par défaut
         self.notification_handler.save_config()  # Sauvegarder la configuration
         self.retranslate_ui()
 
     def retranslate_ui(self):
-        print(f"Retraduction de l'interface utilisateur")
+        logging.info("Retraduction de l'interface utilisateur")
         self.setWindowTitle('TrainerLED')
         self.search_button.setText(_('Rechercher Home Trainer'))
         self.start_button.setText(_('Démarrer'))
@@ -461,55 +476,134 @@ class MainWindow(QMainWindow):
         self.set_default_device_button.setText(_('Définir comme périphérique par défaut'))
         self.status_label.setText(_('En attente de connexion au périphérique'))
         self.power_label.setText(_('Puissance: N/A'))
+        self.cadence_label.setText(_('Cadence: N/A'))
+        self.speed_label.setText(_('Vitesse: N/A'))
+        self.heart_rate_label.setText(_('Fréquence cardiaque: N/A'))
         self.zone_label.setText(_('Zone de puissance: N/A'))
+        self.analytics_label.setText(_('NP: N/A'))
+        self.time_in_zone_label.setText('')
+        self.full_ride_checkbox.setText(_('Afficher toute la sortie'))
 
         for i, button in enumerate(self.color_buttons):
             button.setText(_('Sélectionner Couleur Zone {index}').format(index=i + 1))
+        self.profile_label.setText(_('Profil de zones'))
+        self.update_profile_selector()
 
         self.update_ranges()
         self.create_menu()
 
+    def update_profile_selector(self):
+        handler = self.notification_handler
+        self.profile_selector.blockSignals(True)
+        self.profile_selector.clear()
+        self.profile_selector.addItem(_('Zones personnalisées'), CUSTOM_PROFILE)
+        for name in sorted(name for name in handler.zone_profiles if name != CUSTOM_PROFILE):
+            self.profile_selector.addItem(name, name)
+        self.profile_selector.setCurrentIndex(self.profile_selector.findData(handler.active_profile))
+        self.profile_selector.blockSignals(False)
+        ftp = handler.zone_profiles[handler.active_profile].get('ftp')
+        self.ftp_edit.setEnabled(ftp is not None)
+        self.ftp_edit.setText('' if ftp is None else str(ftp))
+
+    # Met les curseurs, champs et couleurs à jour sans renvoyer de modification au gestionnaire
+    def refresh_zone_widgets(self):
+        handler = self.notification_handler
+        for i in range(6):
+            self.sliders[i].blockSignals(True)
+            self.sliders[i].setValue(handler.zone_thresholds[i])
+            self.sliders[i].blockSignals(False)
+            self.threshold_edits[i].setText(str(handler.zone_thresholds[i]))
+        for i, color in enumerate(handler.zone_colors):
+            set_swatch_color(self.color_frames[i], color)
+        self.update_ranges()
+        self.update_profile_selector()
+
+    def change_zone_profile(self, index):
+        name = self.profile_selector.itemData(index)
+        try:
+            self.notification_handler.select_zone_profile(name)
+        except (KeyError, ValueError, TypeError):
+            logging.error(f"Profil de zones invalide : {name!r}", exc_info=True)
+            QMessageBox.warning(self, _("Erreur"), _("Profil de zones invalide : {name}").format(name=name))
+        self.refresh_zone_widgets()
+
+    def change_ftp(self):
+        if self.ftp_edit.text():
+            self.notification_handler.set_profile_ftp(int(self.ftp_edit.text()))
+            self.refresh_zone_widgets()
+
+    def watch_config_file(self):
+        if os.path.exists(CONFIG_FILE) and os.path.abspath(CONFIG_FILE) not in self.config_watcher.files():
+            self.config_watcher.addPath(os.path.abspath(CONFIG_FILE))
+
+    def config_file_changed(self, path):
+        self.watch_config_file()
+        config = config_store.reload_if_changed()
+        if config is not None:
+            for rider in self.riders:
+                rider.reload_zones(config)
+            self.refresh_zone_widgets()
+
     def toggle_info(self):
         self.info_widget.setVisible(not self.info_widget.isVisible())
 
-    async def search_devices_async(self):
-        devices = await BleakScanner.discover()
-        return [f"{device.name} - {device.address}" for device in devices]
+    # Services annoncés par les périphériques gérés (puissance, FTMS, cardio), ou aucun filtre
+    def scan_service_uuids(self):
+        if self.notification_handler.scan_all_devices:
+            return None
+        uuids = {profile_class().service_uuid for profile_class in SOURCES.values()}
+        uuids.add(self.notification_handler.trainer_source.service_uuid)
+        return sorted(uuids)
 
     async def discover_services_and_characteristics(self, device_address):
-        async with BleakClient(device_address) as client:
-            services = await client.get_services()
-            result = []
-            for service in services:
-                result.append(f"Service: {service.uuid}")
-                for char in service.characteristics:
-                    result.append(f"  Characteristic: {char.uuid}, Properties: {char.properties}")
-            return result
+        async with bleak_client(device_address) as client:
+            gatt_cache.update_from_client(device_address, client)
+        return gatt_cache.get(device_address)
 
+    # Une nouvelle recherche remplace celle en cours ; la liste se remplit au fil des annonces
     def search_devices(self):
-        coro = self.search_devices_async()
-        self.task_runner = AsyncTaskRunner(coro)
-        self.task_runner.result_ready.connect(self.update_device_list)
-        self.task_runner.start()
-
-    def update_device_list(self, devices):
         self.device_list.clear()
-        for device in devices:
-            self.device_list.addItem(device)
+        self.device_items = {}
+        self.status_label.setText(_('Recherche des périphériques...'))
+        device_found = self.discovery_signals.device_found.emit
+        service_uuids = self.scan_service_uuids()
+        submit_ble_task(lambda: stream_discovery(device_found, service_uuids, SCAN_TIMEOUT),
+                        self.discovery_finished, key='scan')
+
+    def add_discovered_device(self, address, name, rssi, services):
+        text = f"{name or _('Inconnu')} - {address} ({rssi} dBm)"
+        item = self.device_items.get(address)
+        if item is None:
+            item = self.device_items[address] = QListWidgetItem(text)
+            item.setData(Qt.UserRole, address)
+            self.device_list.addItem(item)
+        else:
+            item.setText(text)
+
+    def discovery_finished(self, count):
+        self.status_label.setText(_('{count} périphérique(s) trouvé(s)').format(count=len(self.device_items)))
 
+    # La carte GATT vient du cache si le périphérique a déjà été connecté, sinon d'une connexion
+    # de découverte, évitée pendant une session pour ne pas concurrencer la connexion de réception
     def device_selected(self, item):
-        address = item.text().split(" - ")[1]
+        address = item.data(Qt.UserRole)
         self.HOME_TRAINER_MAC = address
         QMessageBox.information(self, _("Home Trainer Sélectionné"), f"{_('Adresse MAC')}: {address}")
-        coro = self.discover_services_and_characteristics(address)
-        self.task_runner = AsyncTaskRunner(coro)
-        self.task_runner.result_ready.connect(self.update_service_characteristics)
-        self.task_runner.start()
+        services = gatt_cache.get(address)
+        if services is not None:
+            self.update_service_characteristics(services)
+        elif self.ble_session and address in (supervisor.address for supervisor in self.ble_session.supervisors):
+            self.service_characteristics.setPlainText(_('Services lus à la connexion en cours'))
+        else:
+            submit_ble_task(lambda: self.discover_services_and_characteristics(address),
+                            self.update_service_characteristics, key='discover')
 
-    def update_service_characteristics(self, result):
+    def update_service_characteristics(self, services):
         self.service_characteristics.clear()
-        for line in result:
-            self.service_characteristics.append(line)
+        for service, characteristics in (services or {}).items():
+            self.service_characteristics.append(f"Service: {service}")
+            for characteristic, properties in characteristics:
+                self.service_characteristics.append(f"  Characteristic: {characteristic}, Properties: {properties}")
 
     def create_slider_change_handler(self, index, threshold_edit, range_label):
         def handler(value):
@@ -532,35 +626,178 @@ class MainWindow(QMainWindow):
             if color.isValid():
                 rgb = (color.red(), color.green(), color.blue())
                 self.notification_handler.set_zone_color(index, rgb)
-                self.color_frames[index].setStyleSheet(f"background-color: rgb({rgb[0]}, {rgb[1]}, {rgb[2]});")
+                set_swatch_color(self.color_frames[index], rgb)
         return handler
 
     def start_thread(self):
-        global running
         if not self.HOME_TRAINER_MAC:
             QMessageBox.warning(self, _("Erreur"), _("Veuillez sélectionner un Home Trainer avant de démarrer."))
             return
-        running = True
-        self.async_thread = AsyncThread(self.notification_handler, self.HOME_TRAINER_MAC, SERVICE_UUID, CHARACTERISTIC_UUID, self.status_label)
-        self.async_thread.start()
-        zone_1_color = self.notification_handler.zone_colors[0]
-        threading.Thread(target=set_led_color_with_transition, args=zone_1_color).start()
+        # Une seule session à la fois : l'ancienne est arrêtée avant d'en démarrer une nouvelle.
+        # Les home trainers de tous les cyclistes partagent la même boucle Bluetooth
+        if self.ble_session:
+            self.ble_session.stop(timeout=2)
+        supervisors = self.notification_handler.start_session(self.HOME_TRAINER_MAC)
+        for rider in self.riders[1:]:
+            supervisors += rider.start_session()
+        self.ble_session = BleSession(supervisors, ble_executor)
+        for rider in self.riders:
+            led_renderer.submit(*rider.zone_colors[0], channel=rider.channel)
 
     def stop_thread(self):
-        global running
-        running = False
-        if self.async_thread:
-            self.async_thread.quit()
-        threading.Thread(target=set_led_color_with_transition, args=(0, 0, 0)).start()
+        if self.ble_session:
+            self.ble_session.stop()
+        for rider in self.riders:
+            led_renderer.submit(0, 0, 0, channel=rider.channel)
+            rider.stop_recording()
+
+    def closeEvent(self, event):
+        self.refresh_timer.stop()
+        if self.ble_session:
+            self.ble_session.stop(timeout=2)
+            logging.info(f"Connexions Bluetooth : {self.ble_session.metrics()}")
+        ble_executor.stop()
+        gatt_cache.close()
+        for rider in self.riders:
+            rider.stop_recording(wait=True)
+        led_renderer.stop()
+        logging.info(f"Statistiques du rendu LED : {led_renderer.stats()}")
+        logging.info(f"Temps d'écriture OpenRGB : {led_output.flush_stats()}")
+        led_output.close()
+        config_store.close()
+        logging.info(f"Sauvegardes de la configuration : {config_store.stats()}")
+        if self.metrics_server is not None:
+            self.metrics_server.shutdown()
+        if self.sample_feed is not None:
+            self.sample_feed.close()
+            logging.info(f"Diffusion des échantillons : {self.sample_feed.stats()}")
+        try:
+            registry.dump(METRICS_FILE)
+        except OSError:
+            logging.error("Écriture des mesures impossible", exc_info=True)
+        super().closeEvent(event)
+
+    def update_connection_state(self, address, state, info):
+        if state == STATE_CONNECTED:
+            text = _("Périphérique {device_address} connecté").format(device_address=address)
+            if 'reconnect_time' in info:
+                text += " " + _("(reconnecté en {seconds:.1f} s)").format(seconds=info['reconnect_time'])
+        elif state == STATE_RECONNECTING and 'retry_in' in info:
+            text = _("Connexion perdue avec {device_address}, nouvelle tentative dans {seconds:.1f} s (tentative {attempt})").format(
+                device_address=address, seconds=info['retry_in'], attempt=info['attempt'])
+        elif state == STATE_CONNECTING and 'retry_in' in info:
+            text = _("Échec de la connexion à {device_address}, nouvelle tentative dans {seconds:.1f} s (tentative {attempt})").format(
+                device_address=address, seconds=info['retry_in'], attempt=info['attempt'])
+        elif state in (STATE_CONNECTING, STATE_RECONNECTING):
+            text = _("Connexion au périphérique {device_address}...").format(device_address=address)
+        else:
+            text = _("Périphérique {device_address} déconnecté").format(device_address=address)
+        self.status_label.setText(text)
+
+    # Une ligne d'état par cycliste supplémentaire : puissance, zone et connexion
+    def init_rider_labels(self):
+        self.rider_signals = []
+        self.rider_views = []
+        for rider in self.riders[1:]:
+            label = QLabel(_('{name} : en attente de connexion').format(name=rider.name))
+            state = {'power': None, 'zone': None, 'connection': ''}
+            signals = PipelineSignals(rider)
+            signals.connection_state_changed.connect(lambda address, connection, info, label=label, name=rider.name, state=state:
+                                                     self.update_rider_label(label, name, state, connection=connection))
+            self.rider_signals.append(signals)
+            self.rider_views.append((PipelineView(rider), label, rider.name, state))
+            self.layout.insertWidget(self.layout.indexOf(self.status_label) + len(self.rider_signals), label)
+
+    def update_rider_label(self, label, name, state, **changes):
+        state.update(changes)
+        text = f"{name} : {_('Puissance')}: {state['power'] if state['power'] is not None else 'N/A'} W"
+        if state['zone'] is not None:
+            text += f", {_('Zone de puissance')}: {state['zone']}"
+        if state['connection'] and state['connection'] != STATE_CONNECTED:
+            text += f" ({state['connection']})"
+        label.setText(text)
+
+    # Une image : les dernières mesures de chaque cycliste et un seul dessin du graphique
+    def refresh_view(self):
+        start = time.monotonic()
+        if self.last_refresh is not None:
+            missed = round((start - self.last_refresh) / self.refresh_interval) - 1
+            if missed > 0:
+                gui_frames_dropped.inc(missed)
+        self.last_refresh = start
+
+        values, points, oldest = self.pipeline_view.take()
+        for power in points:
+            self.update_plot(power)
+        if 'power' in values:
+            self.update_power(values['power'])
+        if 'color' in values:
+            self.update_color(values['color'])
+        if 'cadence' in values:
+            self.update_cadence(values['cadence'])
+        if 'speed' in values:
+            self.update_speed(values['speed'])
+        if 'heart_rate' in values:
+            self.update_heart_rate(values['heart_rate'])
+        for view, label, name, state in self.rider_views:
+            rider_values, _points, since = view.take()
+            if since is None:
+                continue
+            oldest = since if oldest is None else min(oldest, since)
+            changes = {}
+            if 'power' in rider_values:
+                changes['power'] = rider_values['power']
+            if 'color' in rider_values:
+                changes['zone'] = rider_values['color'][1]
+            self.update_rider_label(label, name, state, **changes)
+        if self.chart is not None:
+            self.chart.refresh()
+        # L'analyse de la sortie n'est affichée qu'une fois par seconde
+        if self.last_analytics is None or start - self.last_analytics >= 1.0:
+            self.last_analytics = start
+            self.update_analytics(self.notification_handler.ride_summary())
+
+        if oldest is not None:
+            end = time.monotonic()
+            gui_frames.inc()
+            gui_latency.observe(end - oldest)
+            gui_refresh_time.observe(end - start)
 
     def update_power(self, power):
         self.power_label.setText(f'{_("Puissance")}: {power} W')
-        self.update_plot(power)
+
+    def update_analytics(self, summary):
+        if not summary['elapsed_s']:
+            return
+
+        def watts(value):
+            return 'N/A' if value is None else f'{value:.0f} W'
+
+        text = f"NP: {watts(summary['normalized_power'])}"
+        if summary['intensity_factor'] is not None:
+            text += f"  IF: {summary['intensity_factor']:.2f}  TSS: {summary['tss']:.0f}"
+        best = summary['best_power']
+        text += "  " + _("Meilleures puissances") + ": " + " / ".join(
+            f"{duration // 60} min {watts(best[duration])}" if duration >= 60 else f"{duration} s {watts(best[duration])}"
+            for duration in best)
+        self.analytics_label.setText(text)
+        self.time_in_zone_label.setText(_("Temps en zone") + ": " + "  ".join(
+            f"Z{zone + 1} {int(seconds) // 60}:{int(seconds) % 60:02d}"
+            for zone, seconds in enumerate(summary['time_in_zone_s']) if seconds >= 1))
+
+    def update_cadence(self, cadence):
+        self.cadence_label.setText(f'{_("Cadence")}: {cadence} tr/min')
+
+    def update_speed(self, speed):
+        self.speed_label.setText(f'{_("Vitesse")}: {speed:.1f} km/h')
+
+    def update_heart_rate(self, heart_rate):
+        self.heart_rate_label.setText(f'{_("Fréquence cardiaque")}: {heart_rate} bpm')
 
     def update_color(self, color_zone):
         color, zone = color_zone
         self.zone_label.setText(f'{_("Zone de puissance")}: {zone}')
-        self.color_frame.setStyleSheet(f"background-color: rgb({color[0]}, {color[1]}, {color[2]});")
+        set_swatch_color(self.color_frame, color)
 
     def update_ranges(self):
         ranges = self.notification_handler.get_zone_ranges()
@@ -581,11 +818,8 @@ class MainWindow(QMainWindow):
 
     def restore_defaults(self):
         self.notification_handler.restore_default_config()
-        self.update_ranges()
-        for i in range(6):
-            self.sliders[i].setValue(self.notification_handler.zone_thresholds[i])
-            self.color_frames[i].setStyleSheet(f"background-color: rgb({self.notification_handler.zone_colors[i][0]}, {self.notification_handler.zone_colors[i][1]}, {self.notification_handler.zone_colors[i][2]});")
-        self.color_frames[6].setStyleSheet(f"background-color: rgb({self.notification_handler.zone_colors[6][0]}, {self.notification_handler.zone_colors[6][1]}, {self.notification_handler.zone_colors[6][2]});")
+        set_language(self.notification_handler.default_language)  # Réinitialiser la langue par défaut
+        self.refresh_zone_widgets()
 
     def set_default_device(self):
         if self.HOME_TRAINER_MAC:
@@ -612,39 +846,26 @@ class MainWindow(QMainWindow):
         dialog.exec_()
 
     def init_plot(self):
-        self.figure, self.ax = plt.subplots()
-        self.canvas = FigureCanvasQTAgg(self.figure)
-        self.layout.addWidget(self.canvas)
-        self.xdata, self.ydata, self.colors = [], [], []
-
-        self.ax.set_ylim(0, 300)
-        self.ax.set_xlim(0, 50)
-        self.ax.grid()
+        from power_chart import PowerChart
+        self.chart = PowerChart()
+        self.layout.replaceWidget(self.chart_placeholder, self.chart.canvas)
+        self.chart_placeholder.deleteLater()
+        self.full_ride_checkbox.toggled.connect(self.chart.set_full_ride)
+        self.full_ride_checkbox.setEnabled(True)
 
     def update_plot(self, power):
-        self.ydata.append(power)
-        self.xdata.append(len(self.ydata))
-        self.colors.append(self.get_color_for_power(power))
-
-        self.ax.clear()
-        self.ax.grid()
-        self.ax.set_xlim(max(0, self.xdata[-1] - 50), self.xdata[-1])
-
-        self.ax.set_ylim(min(self.ydata) - 10, max(self.ydata) + 10)
-
-        for i in range(1, len(self.xdata)):
-            self.ax.plot(self.xdata[i-1:i+1], self.ydata[i-1:i+1], color=self.colors[i-1], lw=2)
-
-        self.canvas.draw()
+        if self.chart is None:
+            return
+        self.chart.append(power, self.get_color_for_power(power))
 
     def get_color_for_power(self, power):
-        for i, threshold in enumerate(self.notification_handler.zone_thresholds):
-            if power <= threshold:
-                return [c / 255 for c in self.notification_handler.zone_colors[i]]
-        return [c / 255 for c in self.notification_handler.zone_colors[-1]]
+        index = self.notification_handler.zones.index
+        if self.notification_handler.chart_gradient:
+            return index.gradient_color(power)
+        return index.chart_color(power)
 
 if __name__ == '__main__':
-    print("Lancement de l'application")
+    logging.info("Lancement de l'application")
     app = QApplication(sys.argv)
     window = MainWindow()
     window.show()
@@ -0,0 +1,115 @@
+import json
+import random
+import sys
+import time
+import tracemalloc
+import numpy as np
+from ride_analytics import RideAnalytics
+from zones import ZoneIndex
+
+# Banc d'essai de l'analyse en continu : une sortie simulée à 4 Hz (intervalles irréguliers,
+# efforts par paliers) est analysée échantillon par échantillon, puis comparée au calcul
+# complet avec NumPy sur la puissance rééchantillonnée à la seconde. Mesure le coût par
+# échantillon et la mémoire de RideAnalytics après 1 h et après toute la sortie.
+# Lancer depuis le dossier TrainerLED : python -m benchmarks.bench_analytics [--json] [--hours N]
+
+THRESHOLDS = [137, 187, 225, 262, 300, 375]
+COLORS = [(255, 255, 255), (0, 0, 255), (0, 255, 0), (255, 255, 0), (255, 165, 0), (255, 0, 0), (128, 0, 128)]
+FTP = 250
+
+
+def simulate(hours, rate=4.0, seed=1):
+    rng = random.Random(seed)
+    times = []
+    powers = []
+    now = 0.0
+    target = 180
+    while now < hours * 3600:
+        if rng.random() < 1 / (rate * 60):
+            target = rng.choice((120, 180, 240, 280, 350, 500))
+        times.append(now)
+        powers.append(max(0, round(rng.gauss(target, 15))))
+        now += rng.uniform(0.8, 1.2) / rate
+    return times, powers
+
+
+# Calcul de référence sur toute la sortie : puissance tenue entre échantillons, moyennée par seconde
+def reference(times, powers, durations, index):
+    times = np.asarray(times)
+    powers = np.asarray(powers, dtype=float)
+    seconds = np.arange(int(times[-1]))
+    # Énergie cumulée aux limites de chaque seconde, par intégration de la puissance tenue
+    energy = np.concatenate(([0.0], np.cumsum(powers[:-1] * np.diff(times))))
+    bounds = np.arange(int(times[-1]) + 1, dtype=float)
+    positions = np.searchsorted(times, bounds, side='right') - 1
+    cumulative = energy[positions] + powers[positions] * (bounds - times[positions])
+    per_second = np.diff(cumulative)[:len(seconds)]
+
+    rolling = np.convolve(per_second, np.ones(30) / 30, mode='valid')
+    normalized = np.mean(rolling ** 4) ** 0.25
+    best = {duration: float(np.max(np.convolve(per_second, np.ones(duration) / duration, mode='valid')))
+            for duration in durations}
+    zones = np.array([index.zone(power) for power in powers[:-1]])
+    time_in_zone = np.bincount(zones, weights=np.diff(times), minlength=len(index.colors))
+    return normalized, best, time_in_zone
+
+
+def run(hours=4.0):
+    times, powers = simulate(hours)
+    index = ZoneIndex(THRESHOLDS, COLORS)
+
+    # Mémoire : premier passage sous tracemalloc
+    analytics = RideAnalytics()
+    tracemalloc.start()
+    hour_mark = None
+    for now, power in zip(times, powers):
+        analytics.update(now, power, power, index)
+        if hour_mark is None and now >= 3600:
+            hour_mark = tracemalloc.get_traced_memory()[0]
+    end_memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    # Temps : second passage, tableau des durées alloué d'avance
+    analytics = RideAnalytics()
+    durations = [0.0] * len(times)
+    update = analytics.update
+    clock = time.perf_counter
+    for i, (now, power) in enumerate(zip(times, powers)):
+        start = clock()
+        update(now, power, power, index)
+        durations[i] = clock() - start
+
+    start = time.perf_counter()
+    summary = analytics.summary(FTP)
+    summary_time = time.perf_counter() - start
+
+    normalized, best, time_in_zone = reference(times, powers, analytics.durations, index)
+    durations.sort()
+    return {
+        'samples': len(times),
+        'ride_hours': hours,
+        'update_mean_us': sum(durations) / len(durations) * 1e6,
+        'update_p99_us': durations[int(len(durations) * 0.99)] * 1e6,
+        'summary_us': summary_time * 1e6,
+        'memory_1h_kb': None if hour_mark is None else hour_mark / 1024,
+        'memory_end_kb': end_memory / 1024,
+        'normalized_power': summary['normalized_power'],
+        'normalized_power_error': abs(summary['normalized_power'] - normalized),
+        'tss': summary['tss'],
+        'best_power_error': max(abs(summary['best_power'][duration] - best[duration]) for duration in best),
+        'time_in_zone_error_s': float(np.max(np.abs(np.array(summary['time_in_zone_s']) - time_in_zone[:len(summary['time_in_zone_s'])]))),
+    }
+
+
+if __name__ == '__main__':
+    hours = float(sys.argv[sys.argv.index('--hours') + 1]) if '--hours' in sys.argv else 4.0
+    result = run(hours)
+    if '--json' in sys.argv:
+        print(json.dumps(result, indent=1))
+    else:
+        print(f"{result['samples']} échantillons ({result['ride_hours']} h)  mise à jour {result['update_mean_us']:.2f} µs "
+              f"(p99 {result['update_p99_us']:.2f})  résumé {result['summary_us']:.1f} µs  "
+              f"mémoire {result['memory_1h_kb']:.1f} Ko à 1 h, {result['memory_end_kb']:.1f} Ko à la fin")
+        print(f"NP {result['normalized_power']:.1f} W (écart {result['normalized_power_error']:.3f})  TSS {result['tss']:.1f}  "
+              f"écart meilleures puissances {result['best_power_error']:.3f} W  "
+              f"écart temps en zone {result['time_in_zone_error_s']:.3f} s")
@@ -0,0 +1,87 @@
+import argparse
+import json
+import os
+import tempfile
+import time
+from config_store import ConfigStore
+
+# Banc d'essai de la sauvegarde de la configuration pendant le déplacement d'un curseur :
+# un appel de sauvegarde par valeur (100 -> 300 W) au rythme de l'interface, comparé à
+# l'ancienne écriture synchrone de config.json. Mesure la durée de chaque appel côté
+# interface (p50/p99/max) et le nombre d'écritures sur disque.
+# Lancer depuis le dossier TrainerLED : python -m benchmarks.bench_config_store [--json]
+
+CONFIG = {
+    'thresholds': [106, 146, 175, 205, 234, 293],
+    'colors': [[255, 255, 255], [0, 0, 255], [0, 255, 0], [255, 255, 0], [255, 165, 0], [255, 0, 0], [128, 0, 128]],
+    'default_device': 'XX:XX:XX:XX:XX:XX',
+    'default_language': 'fr',
+    'smoothing': {'led': 'sma:10', 'label': 'sma:10'},
+}
+
+
+def legacy_save(path, config):
+    with open(path, 'w') as f:
+        json.dump(config, f)
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, round(p / 100 * (len(values) - 1)))]
+
+
+def drag(save, interval):
+    durations = []
+    for value in range(100, 301):
+        CONFIG['thresholds'][0] = value
+        start = time.perf_counter()
+        save(CONFIG)
+        durations.append(time.perf_counter() - start)
+        time.sleep(interval)
+    return durations
+
+
+def summary(name, durations, writes, total):
+    return {
+        'method': name,
+        'calls': len(durations),
+        'disk_writes': writes,
+        'call_p50_us': round(percentile(durations, 50) * 1e6, 1),
+        'call_p99_us': round(percentile(durations, 99) * 1e6, 1),
+        'call_max_us': round(max(durations) * 1e6, 1),
+        'ui_blocked_ms': round(sum(durations) * 1000, 2),
+        'total_ms': round(total * 1000, 1),
+    }
+
+
+def run(interval=1 / 60):
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'config.json')
+        start = time.perf_counter()
+        durations = drag(lambda config: legacy_save(path, config), interval)
+        results.append(summary('synchrone', durations, len(durations), time.perf_counter() - start))
+
+        store = ConfigStore(os.path.join(directory, 'store.json'))
+        start = time.perf_counter()
+        durations = drag(store.save, interval)
+        store.close()
+        results.append(summary('config_store', durations, store.stats()['writes'], time.perf_counter() - start))
+        if store.load() != CONFIG:
+            raise AssertionError("La configuration relue ne correspond pas à la dernière sauvegarde")
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--json', action='store_true', help="résultats au format JSON sur la sortie standard")
+    parser.add_argument('--interval', type=float, default=1 / 60, help="secondes entre deux valeurs du curseur")
+    args = parser.parse_args()
+    results = run(args.interval)
+    if args.json:
+        print(json.dumps(results, indent=1, ensure_ascii=False))
+    else:
+        for result in results:
+            print(f"{result['method']:<13} {result['calls']} appels  {result['disk_writes']:3d} écritures  "
+                  f"appel p50 {result['call_p50_us']} µs p99 {result['call_p99_us']} µs max {result['call_max_us']} µs  "
+                  f"interface bloquée {result['ui_blocked_ms']} ms")
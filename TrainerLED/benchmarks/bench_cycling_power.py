@@ -0,0 +1,72 @@
+import json
+import math
+import os
+import sys
+import timeit
+from cycling_power import parse_cycling_power, CyclingPowerDecoder, PowerMeasurement
+
+# Banc d'essai du décodeur 0x2A63 sur un corpus de trames synthétiques. Chaque trame est d'abord
+# décodée et comparée aux valeurs attendues du corpus (champs présents, absents, cadence et
+# vitesse) : le banc d'essai échoue avant toute mesure si le décodeur se trompe.
+# Lancer depuis le dossier TrainerLED : python -m benchmarks.bench_cycling_power [--json]
+
+CORPUS_FILE = os.path.join(os.path.dirname(__file__), 'cycling_power_corpus.json')
+
+
+def load_corpus():
+    with open(CORPUS_FILE, 'r', encoding='utf-8') as f:
+        return json.load(f)['packets']
+
+
+def same(value, expected):
+    if value is None or expected is None:
+        return value is expected
+    return math.isclose(value, expected, rel_tol=1e-9)
+
+
+# Décode tout le corpus, source par source, et compare chaque trame aux valeurs attendues.
+# Renvoie les décodeurs (cadence et vitesse finales de chaque source).
+def verify(packets):
+    decoders = {}
+    errors = []
+    for packet in packets:
+        decoder = decoders.setdefault(packet['source'], CyclingPowerDecoder())
+        measurement = decoder.decode(bytearray.fromhex(packet['hex']), packet['time'])
+        decoded = dict(measurement._asdict(), cadence=decoder.cadence, speed=decoder.speed)
+        expected = packet['expected']
+        for field in PowerMeasurement._fields[1:] + ('cadence', 'speed'):
+            if not same(decoded[field], expected.get(field)):
+                errors.append(f"{packet['source']} t={packet['time']} {field} : {decoded[field]!r}, attendu {expected.get(field)!r}")
+    if errors:
+        raise AssertionError("Décodage incorrect :\n" + '\n'.join(errors))
+    return decoders
+
+
+def run(iterations=100000):
+    packets = load_corpus()
+    results = []
+    decoders = verify(packets)
+
+    for source in decoders:
+        data = bytearray.fromhex(next(p['hex'] for p in packets if p['source'] == source))
+        parse_time = timeit.timeit(lambda: parse_cycling_power(data), number=iterations)
+        legacy_time = timeit.timeit(lambda: int.from_bytes(data[2:4], byteorder='little'), number=iterations)
+        results.append({
+            'source': source,
+            'flags': f"0x{int.from_bytes(data[:2], 'little'):04x}",
+            'parse_ns': parse_time / iterations * 1e9,
+            'legacy_ns': legacy_time / iterations * 1e9,
+            'cadence': decoders[source].cadence,
+            'speed': decoders[source].speed,
+        })
+    return results
+
+
+if __name__ == '__main__':
+    results = run()
+    if '--json' in sys.argv:
+        print(json.dumps(results, indent=1, ensure_ascii=False))
+    else:
+        for result in results:
+            print(f"{result['source']:<24} flags {result['flags']}  décodage complet {result['parse_ns']:7.0f} ns"
+                  f"  (puissance seule {result['legacy_ns']:5.0f} ns)")
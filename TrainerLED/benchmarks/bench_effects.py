@@ -0,0 +1,124 @@
+import json
+import math
+import struct
+import sys
+import time
+import timeit
+
+# Banc d'essai des effets par LED.
+# 1. Coût d'une trame par cible : effets précalculés (led_effects) contre un calcul LED par LED
+#    à chaque trame (zone de chaque LED, couleur empaquetée).
+# 2. De bout en bout avec le faux serveur OpenRGB : une puissance à 20 Hz pendant quelques
+#    secondes (montée jusqu'au-delà du dernier seuil) rendue en "fade", puis en "bar" et
+#    "gradient" avec pouls ; mesure des trames et octets envoyés par seconde et du temps CPU du rendu.
+# Lancer depuis le dossier TrainerLED : python -m benchmarks.bench_effects [--json] [--seconds N]
+
+THRESHOLDS = [137, 187, 225, 262, 300, 375]
+COLORS = [(255, 255, 255), (0, 0, 255), (0, 255, 0), (255, 255, 0), (255, 165, 0), (255, 0, 0), (128, 0, 128)]
+COLOR = struct.Struct('<BBBx')
+
+
+# Référence : chaque LED reclassée en zone et empaquetée à chaque trame
+def naive_bar(num_leds, value, bar_max):
+    frame = bytearray()
+    lit = round(value / bar_max * num_leds)
+    for i in range(num_leds):
+        if i >= lit:
+            frame += COLOR.pack(0, 0, 0)
+            continue
+        watts = (i + 0.5) / num_leds * bar_max
+        zone = sum(watts > threshold for threshold in THRESHOLDS)
+        frame += COLOR.pack(*COLORS[zone])
+    return bytes(frame)
+
+
+def micro(num_leds=144, frames=2000):
+    from led_effects import LedEffects
+    from zones import ZoneIndex
+
+    class Target:
+        pass
+
+    zones = ZoneIndex(THRESHOLDS, COLORS)
+    values = [100 + (i * 7) % 300 for i in range(frames)]
+    results = []
+    for effect in ('bar', 'gradient'):
+        effects = LedEffects(effect, pulse=True)
+        target = Target()
+        target.num_leds = num_leds
+        values_iter = iter(values * 6)
+        duration = timeit.timeit(lambda: effects.render(target, next(values_iter), zones, (0, 0, 0), 0.0),
+                                 number=frames * 5) / (frames * 5)
+        results.append({'method': effect, 'leds': num_leds, 'us_per_frame': duration * 1e6})
+    values_iter = iter(values * 6)
+    duration = timeit.timeit(lambda: naive_bar(num_leds, next(values_iter), THRESHOLDS[-1] * 1.2),
+                             number=frames) / frames
+    results.append({'method': 'naive_float', 'leds': num_leds, 'us_per_frame': duration * 1e6})
+    return results
+
+
+def end_to_end(effect, seconds=3.0, rate=20, pulse=True):
+    from fake_openrgb_server import FakeDevice, FakeOpenRGBServer
+    from led_output import LedOutputService
+    from led_renderer import LedRenderWorker
+    from zones import ZoneIndex
+
+    server = FakeOpenRGBServer(devices=[FakeDevice('Bande LED 1', (('Strip', 144),)),
+                                        FakeDevice('Bande LED 2', (('Strip', 60),))]).start()
+    output = LedOutputService(port=server.port)
+    renderer = LedRenderWorker(output)
+    renderer.configure_effect(effect, 30, pulse)
+    renderer.start()
+    output.connect()
+    del server.frames[:]
+    zones = ZoneIndex(THRESHOLDS, COLORS)
+
+    start = time.perf_counter()
+    process_start = time.process_time()
+    count = int(seconds * rate)
+    zone = None
+    for i in range(count):
+        # Montée de 100 W à 450 W puis descente, pour traverser toutes les zones et le pouls
+        value = 100 + 350 * math.sin(math.pi * i / count)
+        new_zone = zones.zone(value)
+        if effect == 'fade' and new_zone != zone:
+            renderer.submit(*COLORS[new_zone])
+        zone = new_zone
+        renderer.submit_power(value, zones)
+        time.sleep(max(0.0, start + (i + 1) / rate - time.perf_counter()))
+    time.sleep(0.2)
+    elapsed = time.perf_counter() - start
+    cpu = time.process_time() - process_start
+    renderer.stop()
+    output.close()
+    frames = list(server.frames)
+    server.stop()
+    return {
+        'effect': effect,
+        'pulse': pulse,
+        'packets_per_s': len(frames) / elapsed,
+        'kbytes_per_s': sum(len(frame.payload) for frame in frames) / elapsed / 1024,
+        'cpu_ms_per_s': cpu / elapsed * 1000,
+        'renderer': renderer.stats(),
+    }
+
+
+def run(seconds=3.0):
+    return {
+        'micro': micro(),
+        # Le pouls ne s'applique pas à "fade"
+        'end_to_end': [end_to_end(effect, seconds, pulse=effect != 'fade') for effect in ('fade', 'bar', 'gradient')],
+    }
+
+
+if __name__ == '__main__':
+    seconds = float(sys.argv[sys.argv.index('--seconds') + 1]) if '--seconds' in sys.argv else 3.0
+    results = run(seconds)
+    if '--json' in sys.argv:
+        print(json.dumps(results, indent=1))
+    else:
+        for result in results['micro']:
+            print(f"{result['method']:<12} {result['leds']} LED  {result['us_per_frame']:8.2f} µs/trame")
+        for result in results['end_to_end']:
+            print(f"{result['effect']:<9} pouls {'oui' if result['pulse'] else 'non'}  {result['packets_per_s']:6.1f} paquets/s  "
+                  f"{result['kbytes_per_s']:6.2f} Ko/s  CPU {result['cpu_ms_per_s']:5.1f} ms/s")
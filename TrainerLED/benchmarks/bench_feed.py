@@ -0,0 +1,129 @@
+import json
+import multiprocessing
+import socket
+import sys
+import time
+
+# Banc d'essai de la diffusion locale des échantillons (sample_feed) : des abonnés dans des
+# processus séparés (UDP, WebSocket rapide et WebSocket qui ne lit jamais) reçoivent
+# 1. une rafale d'échantillons publiés aussi vite que possible (débit, trames perdues) ;
+# 2. un flux cadencé à 1 kHz (latence publication -> abonné, p50/p99).
+# Mesure le coût de chaque publication côté pipeline : il ne doit pas dépendre de l'abonné lent,
+# qui perd des trames puis est déconnecté.
+# Lancer depuis le dossier TrainerLED : python -m benchmarks.bench_feed [--json] [--frames N]
+
+GROUP = '239.255.76.84'
+RATE = 1000
+
+
+def free_port(kind=socket.SOCK_STREAM):
+    with socket.socket(socket.AF_INET, kind) as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def percentile(values, p):
+    return values[min(len(values) - 1, int(len(values) * p))] if values else None
+
+
+# Abonné dans son propre processus : compte les trames et la latence jusqu'à une seconde de silence
+def subscriber(kind, address, ready, results):
+    from feed_client import UdpSubscriber, WebSocketSubscriber
+    feed = UdpSubscriber(address, timeout=1.0) if kind == 'udp' else WebSocketSubscriber(address, timeout=1.0)
+    ready.put(kind)
+    if kind == 'slow':
+        # Connecté mais ne lit jamais : le pipeline ne doit pas l'attendre
+        time.sleep(30)
+        return
+    latencies = []
+    first = last = None
+    for sample in feed:
+        now = time.time()
+        latencies.append(now - sample.time)
+        first = first or now
+        last = now
+    feed.close()
+    latencies.sort()
+    results.put({
+        'subscriber': kind,
+        'received': feed.received,
+        'lost': feed.lost,
+        'frames_per_s': feed.received / (last - first) if last and last > first else None,
+        'latency_p50_ms': percentile(latencies, 0.5) * 1000 if latencies else None,
+        'latency_p99_ms': percentile(latencies, 0.99) * 1000 if latencies else None,
+    })
+
+
+def scenario(name, frames, rate=None, slow=True):
+    from sample_feed import SampleFeed
+
+    context = multiprocessing.get_context('spawn')
+    udp_address = f'{GROUP}:{free_port(socket.SOCK_DGRAM)}'
+    port = free_port()
+    feed = SampleFeed(udp_address, port, drop_after=0.5).start()
+    ready = context.Queue()
+    results = context.Queue()
+    kinds = ['udp', 'ws'] + (['slow'] if slow else [])
+    processes = [context.Process(target=subscriber, args=(kind, udp_address if kind == 'udp' else port, ready, results),
+                                 daemon=True) for kind in kinds]
+    for process in processes:
+        process.start()
+    for _ in processes:
+        ready.get(timeout=30)
+    time.sleep(0.3)
+
+    durations = [0.0] * frames
+    clock = time.perf_counter
+    publish = feed.publish
+    start = clock()
+    for i in range(frames):
+        if rate:
+            while clock() < start + i / rate:
+                pass
+        begin = clock()
+        publish(b'Alice', 150 + i % 250, 90.0, 32.5, 140, 1 + i % 7)
+        durations[i] = clock() - begin
+    elapsed = clock() - start
+
+    subscribers = [results.get(timeout=60) for kind in kinds if kind != 'slow']
+    stats = feed.stats()
+    feed.close()
+    for process in processes:
+        process.terminate()
+        process.join()
+    durations.sort()
+    return {
+        'scenario': name,
+        'frames': frames,
+        'publish_per_s': frames / elapsed,
+        'publish_p50_us': percentile(durations, 0.5) * 1e6,
+        'publish_p99_us': percentile(durations, 0.99) * 1e6,
+        'publish_max_us': durations[-1] * 1e6,
+        'feed': stats,
+        'subscribers': sorted(subscribers, key=lambda result: result['subscriber']),
+    }
+
+
+def run(frames=100000):
+    return [
+        scenario('rafale', frames),
+        scenario('rafale sans abonné lent', frames, slow=False),
+        scenario(f'{RATE} Hz', min(frames, 5 * RATE), rate=RATE),
+    ]
+
+
+if __name__ == '__main__':
+    frames = int(sys.argv[sys.argv.index('--frames') + 1]) if '--frames' in sys.argv else 100000
+    results = run(frames)
+    if '--json' in sys.argv:
+        print(json.dumps(results, indent=1))
+    else:
+        for result in results:
+            feed = result['feed']
+            print(f"{result['scenario']:<24} {result['frames']} trames  {result['publish_per_s']:9.0f} publications/s  "
+                  f"publication p50 {result['publish_p50_us']:.1f} µs p99 {result['publish_p99_us']:.1f} µs "
+                  f"max {result['publish_max_us']:.0f} µs  sautées {feed['skipped']}  "
+                  f"abonnés déconnectés {feed['dropped_clients']}")
+            for received in result['subscribers']:
+                print(f"    {received['subscriber']:<4} reçues {received['received']}  perdues {received['lost']}  "
+                      f"latence p50 {received['latency_p50_ms']:.3f} ms p99 {received['latency_p99_ms']:.3f} ms")
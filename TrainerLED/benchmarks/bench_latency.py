@@ -0,0 +1,181 @@
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+# Banc d'essai de bout en bout, sans matériel ni interface : des notifications Cycling Power
+# synthétiques sont rejouées dans la boucle BLE du pipeline (trainer_pipeline : main, TrainerPipeline)
+# et les trames LED sont horodatées par le faux serveur OpenRGB.
+# Mesure la latence notification -> première trame LED et notification -> couleur finale
+# (p50/p99), le débit, le nombre de threads et le temps CPU par échantillon.
+# Le pipeline lit une configuration par défaut dans un dossier temporaire, pas le config.json local.
+# Lancer depuis le dossier TrainerLED : python -m benchmarks.bench_latency [--json] [--steps N]
+
+# (nom, fréquence en Hz (0 : aussi vite que possible), nombre de paquets, changement de zone tous les N paquets)
+SCENARIOS = (
+    ('1hz', 1, 5, 1),
+    ('10hz', 10, 50, 5),
+    ('100hz', 100, 500, 25),
+    ('flood', 0, 5000, 100),
+)
+
+# Position de la première couleur dans le contenu des paquets de mise à jour des LED
+COLOR_OFFSETS = {1050: 6, 1051: 10, 1052: 4}
+
+
+def percentile(values, p):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, round(p / 100 * (len(values) - 1)))]
+
+
+def ms(value):
+    return None if value is None else round(value * 1000, 3)
+
+
+def zone_powers(thresholds):
+    bounds = [0] + list(thresholds) + [thresholds[-1] + 100]
+    return [(low + high) // 2 for low, high in zip(bounds, bounds[1:])]
+
+
+def run_scenario(P, server, config_path, name, rate, count, change_every, steps):
+    from config_store import ConfigStore
+    from input_sources import ReplayBleClient, synthetic_power_packets
+    from led_output import LedOutputService
+    from led_renderer import LedRenderWorker
+    from smoothing import make_filter
+
+    # Sortie LED et rendu neufs, reliés au faux serveur
+    led_output = LedOutputService(port=server.port)
+    led_renderer = LedRenderWorker(led_output, steps=steps)
+    led_renderer.start()
+    handler = P.TrainerPipeline(ConfigStore(config_path), led_output, led_renderer)
+    handler.led_filter = make_filter('sma:1')
+    handler.label_filter = make_filter('sma:1')
+    handler.reset_smoothing()
+    led_output.connect()
+    del server.frames[:]
+
+    notify_times = []
+    changes = []
+    handler_cpu = 0.0
+    current = None
+    original = handler.handle_notification
+
+    def timed_notification(sender, data, source=None):
+        nonlocal current, handler_cpu
+        current = time.perf_counter()
+        notify_times.append(current)
+        cpu = time.thread_time()
+        original(sender, data, source=source)
+        handler_cpu += time.thread_time() - cpu
+
+    handler.handle_notification = timed_notification
+    handler.subscribe('color', lambda color, zone: changes.append((current, tuple(color))))
+
+    packets = synthetic_power_packets(count, rate, zone_powers(handler.zone_thresholds), change_every)
+    threads = threading.active_count()
+    supervisors = P.create_supervisors(handler, {'SYNTHETIC': [handler.trainer_source]},
+                                       lambda address, **kwargs: ReplayBleClient(address, packets, **kwargs))
+
+    async def stopper():
+        nonlocal threads
+        duration = count / rate if rate else 0
+        deadline = time.monotonic() + duration + 0.5
+        while time.monotonic() < deadline or len(notify_times) < count:
+            threads = max(threads, threading.active_count())
+            await asyncio.sleep(0.05)
+        for supervisor in supervisors:
+            supervisor.stop()
+
+    async def run():
+        await asyncio.gather(P.main(supervisors), stopper())
+
+    cpu_start = time.process_time()
+    asyncio.run(run())
+    process_cpu = time.process_time() - cpu_start
+    led_renderer.stop()
+    led_output.close()
+
+    # Pour chaque changement de zone : première trame reçue ensuite, puis première trame
+    # à la couleur cible avant le changement suivant (sinon la transition a été interrompue)
+    frames = [(frame.timestamp, tuple(frame.payload[COLOR_OFFSETS[frame.packet_type]:
+                                                    COLOR_OFFSETS[frame.packet_type] + 3]))
+              for frame in server.color_frames()]
+    first_latencies = []
+    settle_latencies = []
+    preempted = 0
+    for i, (changed_at, color) in enumerate(changes):
+        next_change = changes[i + 1][0] if i + 1 < len(changes) else float('inf')
+        first = next((timestamp for timestamp, _ in frames if timestamp >= changed_at), None)
+        settled = next((timestamp for timestamp, frame_color in frames
+                        if changed_at <= timestamp < next_change and frame_color == color), None)
+        if first is not None:
+            first_latencies.append(first - changed_at)
+        if settled is not None:
+            settle_latencies.append(settled - changed_at)
+        else:
+            preempted += 1
+
+    elapsed = notify_times[-1] - notify_times[0] if len(notify_times) > 1 else 0
+    samples = len(notify_times)
+    return {
+        'scenario': name,
+        'rate_hz': rate,
+        'samples': samples,
+        'zone_changes': len(changes),
+        'led_frames': len(frames),
+        'first_frame_p50_ms': ms(percentile(first_latencies, 50)),
+        'first_frame_p99_ms': ms(percentile(first_latencies, 99)),
+        'settle_p50_ms': ms(percentile(settle_latencies, 50)),
+        'settle_p99_ms': ms(percentile(settle_latencies, 99)),
+        'preempted': preempted,
+        'throughput_per_s': round((samples - 1) / elapsed, 1) if elapsed else None,
+        'handler_cpu_us_per_sample': round(handler_cpu / samples * 1e6, 2) if samples else None,
+        'process_cpu_us_per_sample': round(process_cpu / samples * 1e6, 2) if samples else None,
+        'max_threads': threads,
+        'renderer': led_renderer.stats(),
+    }
+
+
+def run(steps=10, scenarios=SCENARIOS):
+    from fake_openrgb_server import FakeOpenRGBServer
+    import trainer_pipeline as P
+
+    results = []
+    with tempfile.TemporaryDirectory() as folder, FakeOpenRGBServer() as server:
+        config_path = os.path.join(folder, 'config.json')
+        with open(config_path, 'w', encoding='utf-8') as f:
+            json.dump(dict(P.DEFAULT_SETTINGS, thresholds=P.DEFAULT_ZONE_THRESHOLDS, colors=P.DEFAULT_ZONE_COLORS), f)
+        for scenario in scenarios:
+            results.append(run_scenario(P, server, config_path, *scenario, steps))
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--json', action='store_true', help="résultats au format JSON sur la sortie standard")
+    parser.add_argument('--steps', type=int, default=10, help="nombre d'étapes des transitions de couleur")
+    parser.add_argument('--scenario', action='append', choices=[scenario[0] for scenario in SCENARIOS])
+    args = parser.parse_args()
+    scenarios = [scenario for scenario in SCENARIOS if not args.scenario or scenario[0] in args.scenario]
+
+    # Les messages de l'application vont sur la sortie d'erreur pour garder une sortie JSON propre
+    with contextlib.redirect_stdout(sys.stderr):
+        results = run(args.steps, scenarios)
+    if args.json:
+        print(json.dumps(results, indent=1, ensure_ascii=False))
+    else:
+        for result in results:
+            print(f"{result['scenario']:<6} {result['samples']:5d} échantillons  {result['zone_changes']:4d} changements  "
+                  f"première trame p50 {result['first_frame_p50_ms']} ms p99 {result['first_frame_p99_ms']} ms  "
+                  f"couleur finale p50 {result['settle_p50_ms']} ms p99 {result['settle_p99_ms']} ms  "
+                  f"interrompues {result['preempted']}  débit {result['throughput_per_s']}/s  "
+                  f"CPU {result['handler_cpu_us_per_sample']} µs/éch. (processus {result['process_cpu_us_per_sample']})  "
+                  f"threads {result['max_threads']}")
@@ -0,0 +1,120 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+# Banc d'essai du démarrage à froid : chaque mesure lance un nouvel interpréteur dans un
+# dossier vide (sans config.json) et mesure l'import de TrainerLED, la construction de la
+# fenêtre, le premier affichage et la fin du démarrage différé (graphique prêt), ainsi que
+# les bibliothèques lourdes déjà chargées au premier affichage.
+# Lancer depuis le dossier TrainerLED : python -m benchmarks.bench_startup [--json] [--runs N]
+
+HEAVY_MODULES = ('matplotlib', 'numpy', 'bleak', 'openrgb')
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, round(p / 100 * (len(values) - 1)))]
+
+
+def ms(value):
+    return None if value is None else round(value * 1000, 1)
+
+
+# Exécuté dans le processus enfant, qui écrit ses horodatages dans `path`
+# (la sortie standard reçoit aussi les messages de l'application)
+def child(path):
+    start = time.time()
+    from PyQt5.QtCore import QEvent, QObject, QTimer
+    from PyQt5.QtWidgets import QApplication
+    import TrainerLED as T
+    imported = time.time()
+
+    app = QApplication(sys.argv)
+    result = {'import': imported, 'loaded_at_paint': None, 'paint': None, 'ready': None}
+
+    class PaintWatcher(QObject):
+        def eventFilter(self, obj, event):
+            if event.type() == QEvent.Paint and result['paint'] is None:
+                result['paint'] = time.time()
+                result['loaded_at_paint'] = [name for name in HEAVY_MODULES if name in sys.modules]
+            return False
+
+    finish_startup = T.MainWindow.finish_startup
+
+    def timed_finish_startup(window):
+        finish_startup(window)
+        result['ready'] = time.time()
+        QTimer.singleShot(0, app.quit)
+
+    T.MainWindow.finish_startup = timed_finish_startup
+    watcher = PaintWatcher()
+    window = T.MainWindow()
+    result['window'] = time.time()
+    window.installEventFilter(watcher)
+    window.show()
+    QTimer.singleShot(10000, app.quit)
+    app.exec_()
+    result['start'] = start
+    with open(path, 'w') as f:
+        json.dump(result, f)
+
+
+def run_once():
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [os.getcwd(), env.get('PYTHONPATH')]))
+    if sys.platform.startswith('linux') and not env.get('DISPLAY'):
+        env.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, 'startup.json')
+        launched = time.time()
+        subprocess.run([sys.executable, '-m', 'benchmarks.bench_startup', '--child', path], cwd=folder, env=env,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        with open(path) as f:
+            result = json.load(f)
+
+    def since_launch(key):
+        return None if result[key] is None else result[key] - launched
+
+    return {
+        'interpreter_s': result['start'] - launched,
+        'import_s': result['import'] - result['start'],
+        'window_s': since_launch('window'),
+        'first_paint_s': since_launch('paint'),
+        'ready_s': since_launch('ready'),
+        'loaded_at_paint': result['loaded_at_paint'],
+    }
+
+
+def run(runs=5):
+    samples = [run_once() for _ in range(runs)]
+    summary = {'runs': runs, 'loaded_at_paint': samples[-1]['loaded_at_paint']}
+    for key in ('interpreter_s', 'import_s', 'window_s', 'first_paint_s', 'ready_s'):
+        values = [sample[key] for sample in samples if sample[key] is not None]
+        name = key[:-2]
+        summary[f'{name}_p50_ms'] = ms(percentile(values, 50)) if values else None
+        summary[f'{name}_max_ms'] = ms(max(values)) if values else None
+    return summary
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--json', action='store_true', help="résultats au format JSON sur la sortie standard")
+    parser.add_argument('--runs', type=int, default=5, help="nombre de démarrages mesurés")
+    parser.add_argument('--child', metavar='PATH', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child)
+        sys.exit()
+    summary = run(args.runs)
+    if args.json:
+        print(json.dumps(summary, indent=1, ensure_ascii=False))
+    else:
+        print(f"{summary['runs']} démarrages  import p50 {summary['import_p50_ms']} ms  "
+              f"fenêtre {summary['window_p50_ms']} ms  premier affichage p50 {summary['first_paint_p50_ms']} ms "
+              f"(max {summary['first_paint_max_ms']})  prêt p50 {summary['ready_p50_ms']} ms  "
+              f"chargés au premier affichage : {', '.join(summary['loaded_at_paint']) or 'aucun'}")
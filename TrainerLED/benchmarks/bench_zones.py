@@ -0,0 +1,52 @@
+import json
+import random
+import sys
+import timeit
+from zones import ZoneIndex, classify_zone
+
+# Micro-banc d'essai de la recherche de zone et de couleur par échantillon :
+# ancien parcours linéaire des seuils (et liste de couleurs 0-1 recréée à chaque appel)
+# contre l'index précalculé ZoneIndex.
+# Lancer depuis le dossier TrainerLED : python -m benchmarks.bench_zones [--json]
+
+THRESHOLDS = [106, 146, 175, 205, 234, 293]
+COLORS = [(255, 255, 255), (0, 0, 255), (0, 255, 0), (255, 255, 0), (255, 165, 0), (255, 0, 0), (128, 0, 128)]
+
+
+def legacy_color(power):
+    for i, threshold in enumerate(THRESHOLDS):
+        if power <= threshold:
+            return [c / 255 for c in COLORS[i]]
+    return [c / 255 for c in COLORS[-1]]
+
+
+def run(samples=100000):
+    rng = random.Random(1)
+    powers = [rng.uniform(0, 500) for _ in range(samples)] + [rng.randint(0, 500) for _ in range(samples)]
+    index = ZoneIndex(THRESHOLDS, COLORS)
+    index.gradient_color(0)  # Construction de la table hors mesure
+
+    mismatches = sum(classify_zone(power, THRESHOLDS) != index.zone(power) for power in powers)
+    if mismatches:
+        raise AssertionError(f"{mismatches} zones différentes entre le parcours linéaire et l'index")
+
+    def measure(function):
+        return timeit.timeit(lambda: [function(power) for power in powers], number=5) / (5 * len(powers)) * 1e9
+
+    zone = index.zone
+    return [
+        {'method': 'zone_scan', 'ns_per_sample': measure(lambda power: classify_zone(power, THRESHOLDS))},
+        {'method': 'zone_index', 'ns_per_sample': measure(zone)},
+        {'method': 'color_scan', 'ns_per_sample': measure(legacy_color)},
+        {'method': 'color_index', 'ns_per_sample': measure(index.chart_color)},
+        {'method': 'color_gradient', 'ns_per_sample': measure(index.gradient_color)},
+    ]
+
+
+if __name__ == '__main__':
+    results = run()
+    if '--json' in sys.argv:
+        print(json.dumps(results, indent=1))
+    else:
+        for result in results:
+            print(f"{result['method']:<16} {result['ns_per_sample']:7.0f} ns/échantillon")
@@ -0,0 +1,91 @@
+import asyncio
+import logging
+import time
+from config_store import ConfigStore
+
+# Recherche des périphériques en continu : chaque annonce reçue est transmise aussitôt
+# (nouveau périphérique, nom découvert ou variation du RSSI) au lieu d'attendre la fin du scan.
+# Seuls les périphériques qui annoncent un des services recherchés sont gardés
+# (service_uuids vide ou None : tous les périphériques).
+# bleak n'est importé qu'à la première recherche, dans le thread Bluetooth.
+
+RSSI_CHANGE = 3  # Variation minimale du RSSI (dBm) pour signaler à nouveau un périphérique
+
+
+async def stream_discovery(on_device, service_uuids=None, timeout=10.0):
+    from bleak import BleakScanner
+    wanted = {uuid.lower() for uuid in service_uuids or ()}
+    seen = {}
+
+    def detection(device, advertisement):
+        advertised = {uuid.lower() for uuid in advertisement.service_uuids}
+        if wanted and not wanted & advertised and device.address not in seen:
+            return
+        name = device.name or advertisement.local_name or ''
+        previous = seen.get(device.address)
+        if previous is not None and previous[0] == name and abs(previous[1] - advertisement.rssi) < RSSI_CHANGE:
+            return
+        seen[device.address] = (name, advertisement.rssi)
+        on_device(device.address, name, advertisement.rssi, sorted(advertised))
+
+    async with BleakScanner(detection_callback=detection):
+        await asyncio.sleep(timeout)
+    return len(seen)
+
+
+# Carte GATT d'un client connecté : {service: [[caractéristique, [propriétés]], ...]}
+def gatt_map(client):
+    services = getattr(client, 'services', None)
+    if not services:
+        return None
+    return {service.uuid: [[characteristic.uuid, list(characteristic.properties)]
+                           for characteristic in service.characteristics]
+            for service in services}
+
+
+# Cache persistant des cartes GATT par adresse, écrit comme config.json (atomique, en tâche de fond).
+# Il évite de se connecter une seconde fois pour lister les services et permet de limiter
+# la découverte des services aux seuls services utilisés lors des connexions suivantes.
+class GattCache:
+    def __init__(self, path):
+        self.store = ConfigStore(path)
+        try:
+            self.devices = self.store.load()
+        except (FileNotFoundError, ValueError):
+            self.devices = {}
+
+    def get(self, address):
+        entry = self.devices.get(address)
+        return entry['services'] if entry else None
+
+    # Les services lus sont fusionnés avec ceux déjà connus : une connexion limitée à
+    # quelques services n'efface pas le reste de la carte
+    def update(self, address, services, name=''):
+        if not services:
+            return
+        entry = self.devices.get(address)
+        if entry is not None:
+            services = dict(entry['services'], **services)
+            if entry['services'] == services:
+                return
+        self.devices = dict(self.devices)
+        self.devices[address] = {'name': name or (entry or {}).get('name', ''), 'services': services,
+                                 'updated': time.time()}
+        self.store.save(self.devices)
+        logging.info(f"Carte GATT de {address} enregistrée ({len(services)} services)")
+
+    def update_from_client(self, address, client):
+        self.update(address, gatt_map(client))
+
+    # Services connus à découvrir pour ces sources, ou None si le cache ne les connaît pas tous
+    def required_services(self, address, sources):
+        services = self.get(address)
+        if services is None:
+            return None
+        wanted = {source.service_uuid for source in sources}
+        if not wanted <= set(services):
+            return None
+        return sorted(wanted)
+
+    def close(self):
+        self.store.close()
@@ -0,0 +1,82 @@
+import asyncio
+import logging
+import threading
+
+# Exécuteur Bluetooth : un seul thread et une seule boucle asyncio pour tout le travail BLE
+# (recherche, découverte des services, sessions de réception), pour éviter un thread et une
+# boucle par action et les accès concurrents à l'adaptateur.
+# submit() renvoie un concurrent.futures.Future. Une tâche soumise avec la même clé qu'une
+# tâche en cours remplace celle-ci (la précédente est annulée). Les tâches courtes sont
+# limitées à `max_concurrency` en parallèle ; les sessions longues passent limited=False.
+class BleExecutor:
+    def __init__(self, max_concurrency=1):
+        self.max_concurrency = max_concurrency
+        self.loop = None
+        self.semaphore = None
+        self.thread = None
+        self.ready = threading.Event()
+        self.lock = threading.Lock()
+        self.tasks = {}
+
+    @property
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        self.ready.clear()
+        self.thread = threading.Thread(target=self.run, name='BleExecutor', daemon=True)
+        self.thread.start()
+        self.ready.wait()
+
+    def run(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.semaphore = asyncio.Semaphore(self.max_concurrency)
+        self.ready.set()
+        try:
+            self.loop.run_forever()
+            # Laisse les tâches annulées à l'arrêt se terminer proprement
+            pending = asyncio.all_tasks(self.loop)
+            for task in pending:
+                task.cancel()
+            self.loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+        finally:
+            self.loop.close()
+
+    # `coro_factory` : fonction sans argument qui renvoie la coroutine à exécuter
+    def submit(self, coro_factory, key=None, limited=True):
+        self.start()
+        with self.lock:
+            previous = self.tasks.pop(key, None) if key is not None else None
+            if previous is not None and previous.cancel():
+                logging.info(f"Tâche Bluetooth {key!r} remplacée par une nouvelle demande")
+            future = asyncio.run_coroutine_threadsafe(self.execute(coro_factory, limited), self.loop)
+            if key is not None:
+                self.tasks[key] = future
+                future.add_done_callback(lambda done: self.forget(key, done))
+        return future
+
+    async def execute(self, coro_factory, limited):
+        if not limited:
+            return await coro_factory()
+        async with self.semaphore:
+            return await coro_factory()
+
+    def forget(self, key, future):
+        with self.lock:
+            if self.tasks.get(key) is future:
+                del self.tasks[key]
+
+    def cancel(self, key):
+        with self.lock:
+            future = self.tasks.pop(key, None)
+        if future is not None:
+            future.cancel()
+
+    def stop(self, timeout=2.0):
+        if not self.running:
+            return
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout)
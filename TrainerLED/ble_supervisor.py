@@ -0,0 +1,157 @@
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+
+# États de connexion d'un périphérique, transmis à l'interface
+STATE_CONNECTING = 'connecting'
+STATE_CONNECTED = 'connected'
+STATE_RECONNECTING = 'reconnecting'
+STATE_STOPPED = 'stopped'
+
+
+# Superviseur de connexion d'un périphérique Bluetooth : connexion, abonnement aux
+# notifications de ses sources, puis attente d'un évènement (déconnexion signalée par Bleak,
+# arrêt demandé) sans boucle de scrutation. Après une perte de connexion, reconnexion sans
+# limite de tentatives avec un délai exponentiel aléatoire (jitter) entre min_backoff et max_backoff.
+# on_state(address, state, info) est appelé à chaque changement d'état depuis la boucle asyncio.
+class BleSupervisor:
+    def __init__(self, address, sources, handle_notification, client_factory, on_state=None,
+                 min_backoff=0.5, max_backoff=30.0, stale_timeout=10.0, gatt_cache=None, client_kwargs=None):
+        self.address = address
+        self.sources = sources
+        self.handle_notification = handle_notification
+        self.client_factory = client_factory
+        self.on_state = on_state
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.stale_timeout = stale_timeout
+        # Cache des cartes GATT alimenté à chaque connexion, arguments supplémentaires du client
+        self.gatt_cache = gatt_cache
+        self.client_kwargs = client_kwargs or {}
+        self.state = None
+        self.loop = None
+        self.task = None
+        self.wake = None
+        self.stopping = False
+        self.last_data = 0.0
+        # Mesures pour l'interface : temps de reconnexion après une perte de connexion
+        self.connect_count = 0
+        self.disconnect_count = 0
+        self.lost_at = None
+        self.reconnect_times = deque(maxlen=64)
+
+    def set_state(self, state, **info):
+        self.state = state
+        if self.on_state is not None:
+            self.on_state(self.address, state, info)
+
+    def notification_callback(self, source):
+        def callback(sender, data):
+            self.last_data = time.monotonic()
+            self.handle_notification(sender, data, source=source)
+        return callback
+
+    def disconnected(self, client):
+        # Appelé par Bleak, éventuellement depuis un autre thread
+        if self.loop is not None and not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self.wake.set)
+
+    async def run(self):
+        self.loop = asyncio.get_running_loop()
+        self.task = asyncio.current_task()
+        self.wake = asyncio.Event()
+        attempt = 0
+        try:
+            while not self.stopping:
+                self.set_state(self.retry_state(), attempt=attempt + 1)
+                try:
+                    await self.stream()
+                    attempt = 0
+                except asyncio.CancelledError:
+                    raise
+                except Exception:
+                    logging.error(f"Connexion à {self.address} échouée (tentative {attempt + 1})", exc_info=True)
+                if self.stopping:
+                    break
+                delay = min(self.max_backoff, self.min_backoff * 2 ** attempt)
+                delay *= random.uniform(0.5, 1.0)
+                attempt += 1
+                self.set_state(self.retry_state(), attempt=attempt, retry_in=delay)
+                await self.wait(delay)
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self.set_state(STATE_STOPPED)
+
+    # Avant la première connexion on se connecte, après une perte de connexion on se reconnecte
+    def retry_state(self):
+        return STATE_CONNECTING if self.lost_at is None else STATE_RECONNECTING
+
+    # Connexion et réception des notifications jusqu'à la déconnexion ou l'arrêt
+    async def stream(self):
+        self.wake.clear()
+        async with self.client_factory(self.address, disconnected_callback=self.disconnected,
+                                       **self.client_kwargs) as client:
+            for source in self.sources:
+                await client.start_notify(source.characteristic_uuid, self.notification_callback(source))
+            if self.gatt_cache is not None:
+                self.gatt_cache.update_from_client(self.address, client)
+            self.connect_count += 1
+            info = {}
+            if self.lost_at is not None:
+                info['reconnect_time'] = time.monotonic() - self.lost_at
+                self.reconnect_times.append(info['reconnect_time'])
+                self.lost_at = None
+            self.last_data = time.monotonic()
+            self.set_state(STATE_CONNECTED, **info)
+            try:
+                while not self.stopping and client.is_connected:
+                    # Réveil à la déconnexion, à l'arrêt ou quand les données tardent
+                    if await self.wait(self.last_data + self.stale_timeout - time.monotonic()):
+                        continue
+                    if time.monotonic() - self.last_data >= self.stale_timeout:
+                        logging.warning(f"Aucune donnée reçue de {self.address} depuis {self.stale_timeout:.0f} secondes")
+                        self.last_data = time.monotonic()
+            finally:
+                if client.is_connected:
+                    for source in self.sources:
+                        try:
+                            await client.stop_notify(source.characteristic_uuid)
+                        except Exception:
+                            logging.debug(f"Arrêt des notifications de {self.address} impossible", exc_info=True)
+        if not self.stopping:
+            self.disconnect_count += 1
+            self.lost_at = time.monotonic()
+            logging.warning(f"Périphérique {self.address} déconnecté")
+
+    # Attend un réveil (déconnexion, arrêt) pendant au plus `timeout` secondes ; True si réveillé
+    async def wait(self, timeout):
+        try:
+            await asyncio.wait_for(self.wake.wait(), max(0.0, timeout))
+        except asyncio.TimeoutError:
+            return False
+        self.wake.clear()
+        return True
+
+    # Arrêt depuis n'importe quel thread : la connexion en cours est fermée proprement
+    def stop(self):
+        self.stopping = True
+        if self.loop is not None and not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self._cancel)
+
+    def _cancel(self):
+        self.wake.set()
+        if self.task is not None and self.state in (STATE_CONNECTING, STATE_RECONNECTING):
+            self.task.cancel()
+
+    def metrics(self):
+        times = list(self.reconnect_times)
+        return {
+            'state': self.state,
+            'connects': self.connect_count,
+            'disconnects': self.disconnect_count,
+            'last_reconnect_s': times[-1] if times else None,
+            'max_reconnect_s': max(times) if times else None,
+        }
@@ -0,0 +1,145 @@
+import json
+import logging
+import os
+import threading
+import time
+
+# Stockage de la configuration : l'état est gardé en mémoire, les modifications rapprochées
+# (curseur déplacé, par exemple) sont regroupées en une seule écriture faite par un thread
+# dédié `delay` secondes après la dernière modification.
+# L'écriture est atomique (fichier temporaire, fsync puis renommage) et l'ancienne version
+# valide est conservée dans `<fichier>.bak`, relue si le fichier principal est illisible.
+class ConfigStore:
+    def __init__(self, path, delay=0.5):
+        self.path = path
+        self.backup_path = path + '.bak'
+        self.temp_path = path + '.tmp'
+        self.delay = delay
+        self.condition = threading.Condition()
+        self.pending = None
+        self.last_change = 0.0
+        self.running = True
+        self.thread = None
+        # Dernier contenu lu ou écrit par l'application, pour ignorer nos propres écritures
+        self.last_text = None
+        # Compteurs pour vérifier le regroupement des écritures
+        self.saves = 0
+        self.writes = 0
+        self.last_write_ms = None
+
+    def load(self):
+        try:
+            return self.read(self.path)
+        except FileNotFoundError:
+            if not os.path.exists(self.backup_path):
+                raise
+            logging.warning(f"{self.path} introuvable, utilisation de la sauvegarde {self.backup_path}")
+        except ValueError:
+            if not os.path.exists(self.backup_path):
+                raise
+            logging.warning(f"{self.path} illisible, utilisation de la sauvegarde {self.backup_path}", exc_info=True)
+        return self.read(self.backup_path)
+
+    def read(self, path):
+        with open(path, 'r') as f:
+            text = f.read()
+        config = json.loads(text)
+        self.last_text = text
+        return config
+
+    # Configuration relue si le fichier a été modifié par un autre programme depuis la
+    # dernière lecture ou écriture, sinon None (fichier inchangé, absent ou en cours d'écriture)
+    def reload_if_changed(self):
+        try:
+            with open(self.path, 'r') as f:
+                text = f.read()
+        except OSError:
+            return None
+        with self.condition:
+            if text == self.last_text or text == self.pending:
+                return None
+        try:
+            config = json.loads(text)
+        except ValueError:
+            return None
+        self.last_text = text
+        return config
+
+    # Appelé depuis l'interface : ne touche jamais au disque
+    def save(self, config):
+        data = json.dumps(config)
+        with self.condition:
+            self.saves += 1
+            waiting = self.pending is not None
+            self.pending = data
+            self.last_change = time.monotonic()
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name='ConfigStore', daemon=True)
+                self.thread.start()
+            # Si une écriture est déjà programmée, le thread repousse lui-même l'échéance à son réveil
+            if not waiting:
+                self.condition.notify()
+
+    def run(self):
+        while True:
+            with self.condition:
+                while self.running and self.pending is None:
+                    self.condition.wait()
+                if not self.running:
+                    return
+                # Attendre que les modifications cessent pendant `delay` secondes
+                remaining = self.last_change + self.delay - time.monotonic()
+                if remaining > 0:
+                    self.condition.wait(remaining)
+                    continue
+                data, self.pending = self.pending, None
+            self.write(data)
+
+    def write(self, data):
+        start = time.perf_counter()
+        with self.condition:
+            self.last_text = data
+        try:
+            with open(self.temp_path, 'w') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            if os.path.exists(self.path):
+                os.replace(self.path, self.backup_path)
+            os.replace(self.temp_path, self.path)
+            self.sync_directory()
+        except OSError:
+            logging.error("Erreur lors de la sauvegarde de la configuration", exc_info=True)
+            return
+        with self.condition:
+            self.writes += 1
+            self.last_write_ms = (time.perf_counter() - start) * 1000
+
+    # Rend le renommage durable (impossible sous Windows, où il n'y a rien à faire)
+    def sync_directory(self):
+        if os.name != 'posix':
+            return
+        fd = os.open(os.path.dirname(os.path.abspath(self.path)), os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    # Écrit immédiatement la dernière modification en attente
+    def flush(self):
+        with self.condition:
+            data, self.pending = self.pending, None
+        if data is not None:
+            self.write(data)
+
+    def stats(self):
+        with self.condition:
+            return {'saves': self.saves, 'writes': self.writes, 'last_write_ms': self.last_write_ms}
+
+    def close(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+        if self.thread is not None:
+            self.thread.join()
+        self.flush()
@@ -0,0 +1,135 @@
+import struct
+from collections import namedtuple
+from operator import itemgetter
+
+# Décodage de la caractéristique Cycling Power Measurement (0x2A63).
+# Le format dépend du champ flags : la liste des champs présents et le struct correspondant
+# sont compilés une seule fois par valeur de flags puis gardés en cache.
+
+PowerMeasurement = namedtuple('PowerMeasurement', [
+    'flags', 'power', 'pedal_balance', 'accumulated_torque',
+    'wheel_revolutions', 'wheel_event_time', 'crank_revolutions', 'crank_event_time',
+    'max_force', 'min_force', 'max_torque', 'min_torque', 'max_angle', 'min_angle',
+    'top_dead_spot', 'bottom_dead_spot', 'accumulated_energy',
+])
+
+# Champs optionnels dans l'ordre de la trame : (bit de flags, format struct, noms des champs)
+OPTIONAL_FIELDS = (
+    (0, 'B', ('pedal_balance',)),
+    (2, 'H', ('accumulated_torque',)),
+    (4, 'IH', ('wheel_revolutions', 'wheel_event_time')),
+    (5, 'HH', ('crank_revolutions', 'crank_event_time')),
+    (6, 'hh', ('max_force', 'min_force')),
+    (7, 'hh', ('max_torque', 'min_torque')),
+    (8, '3B', ('extreme_angles',)),
+    (9, 'H', ('top_dead_spot',)),
+    (10, 'H', ('bottom_dead_spot',)),
+    (11, 'H', ('accumulated_energy',)),
+)
+
+FLAGS = struct.Struct('<H')
+# Bits dont les champs doivent être convertis : équilibre, couple cumulé, couples extrêmes, angles
+CONVERTED_FLAGS = (1 << 0) | (1 << 2) | (1 << 7) | (1 << 8)
+_MISSING = (None,)
+_layouts = {}
+
+
+# Struct et sélection des champs pour une valeur de flags donnée
+def _layout(flags):
+    layout = _layouts.get(flags)
+    if layout is None:
+        fmt = '<Hh'
+        names = ['flags', 'power']
+        for bit, field_format, field_names in OPTIONAL_FIELDS:
+            if flags & (1 << bit):
+                fmt += field_format
+                names.extend(field_names if field_format != '3B' else ('angle_0', 'angle_1', 'angle_2'))
+        # Les champs absents pointent sur le None ajouté à la fin des valeurs décodées
+        getter = itemgetter(*(names.index(field) if field in names else len(names)
+                              for field in PowerMeasurement._fields))
+        angles = names.index('angle_0') if 'angle_0' in names else None
+        layout = _layouts[flags] = (struct.Struct(fmt), getter, angles)
+    return layout
+
+
+# Décode une notification 0x2A63 sans copier le tampon (bytes, bytearray ou memoryview)
+def parse_cycling_power(data):
+    flags = FLAGS.unpack_from(data)[0]
+    layout, getter, angles = _layout(flags)
+    values = layout.unpack_from(data) + _MISSING
+    if not flags & CONVERTED_FLAGS:
+        return PowerMeasurement._make(getter(values))
+
+    fields = list(getter(values))
+    if angles is not None:
+        # Deux angles de 12 bits dans 3 octets : maximum puis minimum
+        b0, b1, b2 = values[angles:angles + 3]
+        fields[12] = b0 | (b1 & 0x0F) << 8
+        fields[13] = b1 >> 4 | b2 << 4
+    # Conversion en unités usuelles : équilibre en %, couples en N.m
+    if fields[2] is not None:
+        fields[2] /= 2
+    if fields[3] is not None:
+        fields[3] /= 32
+    if fields[10] is not None:
+        fields[10] /= 32
+        fields[11] /= 32
+    return PowerMeasurement._make(fields)
+
+
+# Fréquence de rotation (tours par minute) calculée à partir des compteurs cumulés de tours
+# et de l'heure du dernier évènement, avec gestion du rebouclage des compteurs.
+# Sans nouvel évènement pendant `timeout` secondes, la fréquence retombe à 0.
+class RevolutionRate:
+    def __init__(self, revolution_bits, time_resolution, timeout=3.0):
+        self.revolution_mask = (1 << revolution_bits) - 1
+        self.time_resolution = time_resolution
+        self.timeout = timeout
+        self.reset()
+
+    def reset(self):
+        self.last_revolutions = None
+        self.last_event_time = None
+        self.last_change = None
+        self.rpm = None
+
+    def update(self, revolutions, event_time, now):
+        if self.last_revolutions is not None:
+            delta_revolutions = (revolutions - self.last_revolutions) & self.revolution_mask
+            delta_time = ((event_time - self.last_event_time) & 0xFFFF) / self.time_resolution
+            if delta_revolutions and delta_time:
+                self.rpm = delta_revolutions * 60.0 / delta_time
+                self.last_change = now
+            elif self.last_change is not None and now - self.last_change > self.timeout:
+                self.rpm = 0.0
+        else:
+            self.last_change = now
+        self.last_revolutions = revolutions
+        self.last_event_time = event_time
+        return self.rpm
+
+
+# Cadence (tr/min) et vitesse (km/h) dérivées des données de tours de pédalier et de roue
+class CyclingPowerDecoder:
+    def __init__(self, wheel_circumference=2.105):
+        self.wheel_circumference = wheel_circumference
+        self.crank = RevolutionRate(16, 1024)
+        self.wheel = RevolutionRate(32, 2048)
+        self.cadence = None
+        self.speed = None
+
+    def reset(self):
+        self.crank.reset()
+        self.wheel.reset()
+        self.cadence = None
+        self.speed = None
+
+    def decode(self, data, now):
+        measurement = parse_cycling_power(data)
+        if measurement.crank_revolutions is not None:
+            self.cadence = self.crank.update(measurement.crank_revolutions, measurement.crank_event_time, now)
+        if measurement.wheel_revolutions is not None:
+            wheel_rpm = self.wheel.update(measurement.wheel_revolutions, measurement.wheel_event_time, now)
+            if wheel_rpm is not None:
+                self.speed = wheel_rpm * self.wheel_circumference * 60 / 1000
+        return measurement
@@ -0,0 +1,206 @@
+import socket
+import socketserver
+import struct
+import sys
+import threading
+import time
+from collections import namedtuple
+
+# Faux serveur SDK OpenRGB (protocole version 0) pour tester la sortie LED sans matériel.
+# Il répond aux requêtes d'énumération des périphériques et horodate chaque trame reçue.
+
+HEADER = struct.Struct('<4sIII')
+MAGIC = b'ORGB'
+
+REQUEST_CONTROLLER_COUNT = 0
+REQUEST_CONTROLLER_DATA = 1
+REQUEST_PROTOCOL_VERSION = 40
+SET_CLIENT_NAME = 50
+RGBCONTROLLER_UPDATELEDS = 1050
+RGBCONTROLLER_UPDATEZONELEDS = 1051
+RGBCONTROLLER_UPDATESINGLELED = 1052
+RGBCONTROLLER_SETCUSTOMMODE = 1100
+RGBCONTROLLER_UPDATEMODE = 1101
+
+PROTOCOL_VERSION = 0
+
+# Trame reçue : horodatage (time.perf_counter), périphérique, type de paquet et contenu brut
+ReceivedFrame = namedtuple('ReceivedFrame', ['timestamp', 'device_id', 'packet_type', 'payload'])
+
+
+def pack_string(value):
+    raw = value.encode('utf-8') + b'\x00'
+    return struct.pack('<H', len(raw)) + raw
+
+
+def unpack_colors(payload, offset, count):
+    return [tuple(payload[offset + 4 * i:offset + 4 * i + 3]) for i in range(count)]
+
+
+# Périphérique simulé : une ou plusieurs zones linéaires et un mode "Direct"
+class FakeDevice:
+    def __init__(self, name, zones=(('Strip', 8),)):
+        self.name = name
+        self.zones = list(zones)
+        self.num_leds = sum(count for _, count in self.zones)
+        self.colors = [(0, 0, 0)] * self.num_leds
+
+    def zone_start(self, zone_index):
+        return sum(count for _, count in self.zones[:zone_index])
+
+    def pack(self):
+        data = struct.pack('<i', 4)  # Type de périphérique : bande LED
+        data += pack_string(self.name)
+        for field in ('Faux périphérique TrainerLED', '1.0', '', 'fake'):
+            data += pack_string(field)
+        # Un seul mode "Direct", couleurs par LED
+        data += struct.pack('<Hi', 1, 0)
+        data += pack_string('Direct')
+        data += struct.pack('<iIIIIIIIIH', 0, 1 << 5, 0, 0, 0, 0, 0, 0, 1, 0)
+        data += struct.pack('<H', len(self.zones))
+        for zone_name, count in self.zones:
+            data += pack_string(zone_name)
+            data += struct.pack('<iIIIH', 1, count, count, count, 0)
+        data += struct.pack('<H', self.num_leds)
+        for i in range(self.num_leds):
+            data += pack_string(f'LED {i + 1}') + struct.pack('<I', i)
+        data += struct.pack('<H', self.num_leds)
+        for r, g, b in self.colors:
+            data += struct.pack('<BBBx', r, g, b)
+        return struct.pack('<I', len(data) + 4) + data
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    def recv_exact(self, size):
+        data = b''
+        while len(data) < size:
+            chunk = self.request.recv(size - len(data))
+            if not chunk:
+                raise ConnectionError()
+            data += chunk
+        return data
+
+    def send_packet(self, device_id, packet_type, payload):
+        self.request.sendall(HEADER.pack(MAGIC, device_id, packet_type, len(payload)) + payload)
+
+    def handle(self):
+        server = self.server.owner
+        server.register(self.request)
+        try:
+            while True:
+                magic, device_id, packet_type, size = HEADER.unpack(self.recv_exact(HEADER.size))
+                if magic != MAGIC:
+                    break
+                payload = self.recv_exact(size) if size else b''
+                server.record(device_id, packet_type, payload)
+
+                if packet_type == REQUEST_PROTOCOL_VERSION:
+                    self.send_packet(0, REQUEST_PROTOCOL_VERSION, struct.pack('<I', PROTOCOL_VERSION))
+                elif packet_type == REQUEST_CONTROLLER_COUNT:
+                    self.send_packet(0, REQUEST_CONTROLLER_COUNT, struct.pack('<I', len(server.devices)))
+                elif packet_type == REQUEST_CONTROLLER_DATA:
+                    self.send_packet(device_id, REQUEST_CONTROLLER_DATA, server.devices[device_id].pack())
+                elif packet_type in (RGBCONTROLLER_UPDATELEDS, RGBCONTROLLER_UPDATEZONELEDS,
+                                     RGBCONTROLLER_UPDATESINGLELED):
+                    server.apply_colors(device_id, packet_type, payload)
+        except (ConnectionError, OSError, struct.error):
+            pass
+        finally:
+            server.unregister(self.request)
+
+
+class _TCPServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+class FakeOpenRGBServer:
+    def __init__(self, host='127.0.0.1', port=0, devices=None):
+        self.host = host
+        self.port = port
+        self.devices = devices if devices is not None else [FakeDevice('Bande LED 1'), FakeDevice('Bande LED 2')]
+        self.frames = []
+        self.connection_count = 0
+        self.lock = threading.Lock()
+        self.server = None
+        self.thread = None
+        self.sockets = set()
+
+    def start(self):
+        self.server = _TCPServer((self.host, self.port), _Handler)
+        self.server.owner = self
+        self.port = self.server.server_address[1]
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    # Arrête le serveur et coupe toutes les connexions clientes, comme un redémarrage d'OpenRGB
+    def stop(self):
+        if self.server is None:
+            return
+        self.server.shutdown()
+        self.server.server_close()
+        with self.lock:
+            sockets = list(self.sockets)
+        for sock in sockets:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        self.thread.join()
+        self.server = None
+
+    def restart(self):
+        self.stop()
+        self.start()
+
+    def register(self, sock):
+        with self.lock:
+            self.sockets.add(sock)
+            self.connection_count += 1
+
+    def unregister(self, sock):
+        with self.lock:
+            self.sockets.discard(sock)
+
+    def record(self, device_id, packet_type, payload):
+        frame = ReceivedFrame(time.perf_counter(), device_id, packet_type, payload)
+        with self.lock:
+            self.frames.append(frame)
+
+    def color_frames(self):
+        with self.lock:
+            return [frame for frame in self.frames
+                    if frame.packet_type in (RGBCONTROLLER_UPDATELEDS, RGBCONTROLLER_UPDATEZONELEDS,
+                                             RGBCONTROLLER_UPDATESINGLELED)]
+
+    def apply_colors(self, device_id, packet_type, payload):
+        device = self.devices[device_id]
+        with self.lock:
+            if packet_type == RGBCONTROLLER_UPDATELEDS:
+                count = struct.unpack_from('<H', payload, 4)[0]
+                device.colors[:count] = unpack_colors(payload, 6, count)
+            elif packet_type == RGBCONTROLLER_UPDATEZONELEDS:
+                zone, count = struct.unpack_from('<iH', payload, 4)
+                start = device.zone_start(zone)
+                device.colors[start:start + count] = unpack_colors(payload, 10, count)
+            else:
+                led = struct.unpack_from('<i', payload, 0)[0]
+                device.colors[led] = unpack_colors(payload, 4, 1)[0]
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == '__main__':
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 6742
+    server = FakeOpenRGBServer(port=port).start()
+    print(f"Faux serveur OpenRGB en écoute sur {server.host}:{server.port}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.stop()
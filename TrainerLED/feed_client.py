@@ -0,0 +1,148 @@
+import base64
+import os
+import socket
+import struct
+from sample_feed import DEFAULT_FEED_GROUP, DEFAULT_FEED_UDP_PORT, decode, parse_address, websocket_accept
+
+# Abonnés à la diffusion des échantillons de TrainerLED (voir sample_feed), sans autre
+# dépendance que la bibliothèque standard :
+#   with UdpSubscriber('239.255.76.84:5084') as feed:
+#       for sample in feed:
+#           print(sample.rider, sample.power, sample.zone)
+# ou WebSocketSubscriber(port) pour la diffusion WebSocket. receive() renvoie un FeedSample,
+# ou None si rien n'arrive avant `timeout` secondes. `lost` compte les trames manquantes
+# d'après les numéros de séquence (trames sautées pour un abonné lent, datagrammes perdus).
+
+
+class _Subscriber:
+    def __init__(self):
+        self.sock = None
+        self.last_sequence = None
+        self.received = 0
+        self.lost = 0
+
+    def count(self, sample):
+        if self.last_sequence is not None and sample.sequence > self.last_sequence + 1:
+            self.lost += sample.sequence - self.last_sequence - 1
+        self.last_sequence = sample.sequence
+        self.received += 1
+        return sample
+
+    def __iter__(self):
+        while True:
+            sample = self.receive()
+            if sample is None:
+                return
+            yield sample
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+
+
+class UdpSubscriber(_Subscriber):
+    def __init__(self, address=f'{DEFAULT_FEED_GROUP}:{DEFAULT_FEED_UDP_PORT}', timeout=None):
+        super().__init__()
+        host, port = parse_address(address)
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if socket.inet_aton(host)[0] & 0xF0 == 0xE0:
+            # Groupe de multidiffusion : plusieurs abonnés sur la même machine
+            self.sock.bind(('', port))
+            membership = struct.pack('4s4s', socket.inet_aton(host), socket.inet_aton('0.0.0.0'))
+            self.sock.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, membership)
+        else:
+            self.sock.bind((host, port))
+        self.sock.settimeout(timeout)
+
+    def receive(self):
+        while True:
+            try:
+                data = self.sock.recv(2048)
+            except socket.timeout:
+                return None
+            try:
+                return self.count(decode(data))
+            except ValueError:
+                continue  # Datagramme étranger sur le même port
+
+
+class WebSocketSubscriber(_Subscriber):
+    def __init__(self, port, host='127.0.0.1', timeout=None):
+        super().__init__()
+        self.sock = socket.create_connection((host, port), timeout=5)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        key = base64.b64encode(os.urandom(16)).decode('ascii')
+        self.sock.sendall((f'GET / HTTP/1.1\r\nHost: {host}:{port}\r\nUpgrade: websocket\r\n'
+                           f'Connection: Upgrade\r\nSec-WebSocket-Key: {key}\r\n'
+                           'Sec-WebSocket-Version: 13\r\n\r\n').encode('ascii'))
+        self.buffer = bytearray()
+        while b'\r\n\r\n' not in self.buffer:
+            data = self.sock.recv(4096)
+            if not data:
+                raise ConnectionError("connexion fermée pendant l'ouverture WebSocket")
+            self.buffer += data
+        response, _, rest = bytes(self.buffer).partition(b'\r\n\r\n')
+        status = response.split(b'\r\n')[0]
+        if b' 101 ' not in status or websocket_accept(key).encode('ascii') not in response:
+            raise ConnectionError(f"ouverture WebSocket refusée : {status!r}")
+        self.buffer = bytearray(rest)
+        self.sock.settimeout(timeout)
+
+    # Message suivant du serveur : (code, charge), None à la fin de la connexion
+    def read_message(self):
+        while True:
+            message = self.parse_message()
+            if message is not None:
+                return message
+            data = self.sock.recv(65536)
+            if not data:
+                return None
+            self.buffer += data
+
+    # En-tête non masqué de 2 à 10 octets ; None si le message n'est pas encore complet
+    def parse_message(self):
+        if len(self.buffer) < 2:
+            return None
+        length = self.buffer[1] & 0x7F
+        offset = 2
+        if length == 126:
+            if len(self.buffer) < 4:
+                return None
+            length, offset = struct.unpack_from('!H', self.buffer, 2)[0], 4
+        elif length == 127:
+            if len(self.buffer) < 10:
+                return None
+            length, offset = struct.unpack_from('!Q', self.buffer, 2)[0], 10
+        if len(self.buffer) < offset + length:
+            return None
+        message = self.buffer[0] & 0x0F, bytes(self.buffer[offset:offset + length])
+        del self.buffer[:offset + length]
+        return message
+
+    def receive(self):
+        while True:
+            try:
+                message = self.read_message()
+            except socket.timeout:
+                return None
+            if message is None or message[0] == 0x8:
+                return None
+            if message[0] == 0x2:
+                return self.count(decode(message[1]))
+
+    def close(self):
+        if self.sock is not None:
+            try:
+                # Trame de fermeture masquée (client -> serveur), sans charge
+                self.sock.send(bytes((0x88, 0x80)) + os.urandom(4))
+            except OSError:
+                pass
+        super().close()
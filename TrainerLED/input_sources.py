@@ -0,0 +1,208 @@
+import asyncio
+import json
+import struct
+import time
+from collections import namedtuple
+from cycling_power import CyclingPowerDecoder
+
+# Sources d'entrée Bluetooth : chaque profil BLE a son propre décodeur qui transforme une
+# notification en échantillon commun. Les champs non fournis par le profil valent None.
+Sample = namedtuple('Sample', ['time', 'source', 'power', 'cadence', 'speed', 'heart_rate'])
+
+
+def uuid16(value):
+    return f'0000{value:04x}-0000-1000-8000-00805f9b34fb'
+
+
+# Cycling Power Service (0x1818), Cycling Power Measurement (0x2A63)
+class CyclingPowerSource:
+    profile = 'cycling_power'
+
+    def __init__(self, service_uuid=uuid16(0x1818), characteristic_uuid=uuid16(0x2A63), wheel_circumference=2.105):
+        self.service_uuid = service_uuid
+        self.characteristic_uuid = characteristic_uuid
+        self.decoder = CyclingPowerDecoder(wheel_circumference)
+        self.last_measurement = None
+
+    def reset(self):
+        self.decoder.reset()
+
+    def decode(self, data, now):
+        self.last_measurement = self.decoder.decode(data, now)
+        return Sample(now, self.profile, self.last_measurement.power,
+                      self.decoder.cadence, self.decoder.speed, None)
+
+
+# Fitness Machine Service (0x1826), Indoor Bike Data (0x2AD2)
+class FitnessMachineSource:
+    profile = 'ftms'
+
+    # Champs de Indoor Bike Data après les flags : (bit, format, nom du champ ou None si ignoré)
+    FIELDS = (
+        (1, 'H', None),            # Vitesse moyenne
+        (2, 'H', 'cadence'),       # Cadence instantanée (0,5 tr/min)
+        (3, 'H', None),            # Cadence moyenne
+        (4, '3s', None),           # Distance totale (uint24)
+        (5, 'h', None),            # Niveau de résistance
+        (6, 'h', 'power'),         # Puissance instantanée (W)
+        (7, 'h', None),            # Puissance moyenne
+        (8, 'HHB', None),          # Énergie dépensée
+        (9, 'B', 'heart_rate'),    # Fréquence cardiaque
+        (10, 'B', None),           # Équivalent métabolique
+        (11, 'H', None),           # Temps écoulé
+        (12, 'H', None),           # Temps restant
+    )
+
+    def __init__(self, service_uuid=uuid16(0x1826), characteristic_uuid=uuid16(0x2AD2)):
+        self.service_uuid = service_uuid
+        self.characteristic_uuid = characteristic_uuid
+        self.layouts = {}
+
+    def reset(self):
+        pass
+
+    def layout(self, flags):
+        layout = self.layouts.get(flags)
+        if layout is None:
+            fmt = '<H'
+            names = ['flags']
+            # Bit 0 "More Data" inversé : la vitesse instantanée est présente quand il vaut 0
+            if not flags & 1:
+                fmt += 'H'
+                names.append('speed')
+            for bit, field_format, name in self.FIELDS:
+                if flags & (1 << bit):
+                    fmt += field_format
+                    names.extend([name] + [None] * (len(field_format) - 1) if field_format != '3s' else [name])
+            positions = tuple(names.index(field) if field in names else None
+                              for field in ('power', 'cadence', 'speed', 'heart_rate'))
+            layout = self.layouts[flags] = (struct.Struct(fmt), positions)
+        return layout
+
+    def decode(self, data, now):
+        flags = struct.unpack_from('<H', data)[0]
+        layout, (power, cadence, speed, heart_rate) = self.layout(flags)
+        values = layout.unpack_from(data)
+        return Sample(now, self.profile,
+                      values[power] if power is not None else None,
+                      values[cadence] / 2 if cadence is not None else None,
+                      values[speed] / 100 if speed is not None else None,
+                      values[heart_rate] if heart_rate is not None else None)
+
+
+# Heart Rate Service (0x180D), Heart Rate Measurement (0x2A37)
+class HeartRateSource:
+    profile = 'heart_rate'
+
+    def __init__(self, service_uuid=uuid16(0x180D), characteristic_uuid=uuid16(0x2A37)):
+        self.service_uuid = service_uuid
+        self.characteristic_uuid = characteristic_uuid
+
+    def reset(self):
+        pass
+
+    def decode(self, data, now):
+        # Bit 0 des flags : fréquence cardiaque sur 16 bits au lieu de 8
+        if data[0] & 1:
+            heart_rate = struct.unpack_from('<H', data, 1)[0]
+        else:
+            heart_rate = data[1]
+        return Sample(now, self.profile, None, None, None, heart_rate)
+
+
+SOURCES = {
+    CyclingPowerSource.profile: CyclingPowerSource,
+    FitnessMachineSource.profile: FitnessMachineSource,
+    HeartRateSource.profile: HeartRateSource,
+}
+
+
+def make_source(profile, **kwargs):
+    if profile not in SOURCES:
+        raise ValueError(f"Profil d'entrée inconnu : {profile}")
+    return SOURCES[profile](**kwargs)
+
+
+# Notifications Cycling Power synthétiques pour ReplayBleClient : `count` paquets à `rate`
+# paquets par seconde (0 : tous d'un coup), la puissance passant à la valeur suivante
+# de `powers` tous les `change_every` paquets
+def synthetic_power_packets(count, rate, powers, change_every=1, characteristic_uuid=uuid16(0x2A63)):
+    return [{'time': i / rate if rate else 0.0,
+             'characteristic': characteristic_uuid,
+             'hex': struct.pack('<Hh', 0, powers[(i // change_every) % len(powers)]).hex()}
+            for i in range(count)]
+
+
+# Durée minimale d'un passage du rejeu en boucle : un fichier dont tous les paquets ont le même
+# horodatage (un seul paquet, paquets synthétiques à rate=0) est rejoué au plus 4 fois par seconde
+# au lieu d'occuper la boucle asyncio partagée sans jamais rendre la main
+REPLAY_MIN_PASS = 0.25
+
+
+# Faux client BLE qui rejoue des notifications enregistrées, avec la même interface que
+# BleakClient (async with, start_notify, stop_notify). Chaque paquet est un dictionnaire
+# {"time": secondes, "characteristic": uuid (facultatif), "hex": données}.
+class ReplayBleClient:
+    def __init__(self, address, packets, speed=1.0, loop=False, disconnected_callback=None):
+        self.address = address
+        self.packets = packets
+        self.speed = speed
+        self.loop = loop
+        self.disconnected_callback = disconnected_callback
+        self.tasks = {}
+        self.is_connected = False
+
+    # Fichier JSON de paquets ou enregistrement de sortie (.tled)
+    @classmethod
+    def from_file(cls, address, path, **kwargs):
+        if path.endswith('.tled'):
+            from session_recorder import iter_packets
+            packets = [{'time': timestamp, 'characteristic': characteristic, 'hex': data.hex()}
+                       for timestamp, _, characteristic, _, data in iter_packets(path)]
+            return cls(address, packets, **kwargs)
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(address, json.load(f)['packets'], **kwargs)
+
+    async def __aenter__(self):
+        self.is_connected = True
+        return self
+
+    async def __aexit__(self, *exc):
+        for task in self.tasks.values():
+            task.cancel()
+        self.tasks.clear()
+        self.is_connected = False
+
+    # Simule une perte de connexion du périphérique
+    def disconnect(self):
+        for task in self.tasks.values():
+            task.cancel()
+        self.tasks.clear()
+        self.is_connected = False
+        if self.disconnected_callback is not None:
+            self.disconnected_callback(self)
+
+    async def start_notify(self, characteristic_uuid, callback):
+        self.tasks[characteristic_uuid] = asyncio.ensure_future(self.replay(characteristic_uuid, callback))
+
+    async def stop_notify(self, characteristic_uuid):
+        task = self.tasks.pop(characteristic_uuid, None)
+        if task is not None:
+            task.cancel()
+
+    async def replay(self, characteristic_uuid, callback):
+        packets = [packet for packet in self.packets
+                   if packet.get('characteristic', characteristic_uuid) == characteristic_uuid]
+        if not packets:
+            return
+        while True:
+            start = time.monotonic()
+            first = packets[0]['time']
+            for packet in packets:
+                delay = (packet['time'] - first) / self.speed - (time.monotonic() - start)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                callback(characteristic_uuid, bytearray.fromhex(packet['hex']))
+            if not self.loop:
+                return
+            await asyncio.sleep(max(0.0, REPLAY_MIN_PASS / self.speed - (time.monotonic() - start)))
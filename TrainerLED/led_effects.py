@@ -0,0 +1,140 @@
+import math
+import struct
+import weakref
+
+# Effets par LED : la valeur lissée (puissance ou fréquence cardiaque) est dessinée sur chaque
+# cible OpenRGB au lieu d'une couleur unie.
+#   bar      : barre qui remplit la bande en proportion de la valeur, chaque LED à la couleur
+#              de la zone qu'elle représente
+#   gradient : toute la cible à la couleur du dégradé entre les zones
+# Avec le pouls (pulse), la cible pulse à la couleur de la dernière zone au-delà du dernier seuil.
+# Les palettes sont calculées une fois par profil de zones et les trames sont écrites dans un
+# tampon préalloué par cible ; une trame identique à la précédente n'est pas renvoyée.
+
+EFFECTS = ('fade', 'bar', 'gradient')
+
+# La barre pleine correspond au dernier seuil plus cette marge (20 %)
+BAR_HEADROOM = 1.2
+
+# Fréquence du pouls (Hz), niveaux de luminosité précalculés et luminosité minimale
+PULSE_HZ = 1.5
+PULSE_LEVELS = 16
+PULSE_FLOOR = 0.15
+
+COLOR = struct.Struct('<BBBx')
+BLACK = COLOR.pack(0, 0, 0)
+
+
+# Remplit `view` avec la couleur `packed` par copies doublées (log2(n) copies en C)
+def fill(view, packed):
+    size = len(view)
+    if not size:
+        return
+    view[:4] = packed
+    filled = 4
+    while filled < size:
+        count = min(filled, size - filled)
+        view[filled:filled + count] = view[:count]
+        filled += count
+
+
+# Palettes d'un profil de zones : dégradé par unité (watt ou bpm) et niveaux du pouls
+class ZonePalette:
+    def __init__(self, zones):
+        self.thresholds = zones.thresholds
+        self.top = zones.thresholds[-1] if zones.thresholds else 0
+        self.bar_max = max(1.0, self.top * BAR_HEADROOM)
+        self.colors = tuple(COLOR.pack(*color) for color in zones.colors)
+        self.zone = zones.zone
+        zones.gradient_color(0)  # Construit la table du dégradé
+        self.gradient = tuple(COLOR.pack(*(round(component * 255) for component in color))
+                              for color in zones.gradient)
+        top_color = zones.colors[-1]
+        self.pulse = tuple(COLOR.pack(*(round(component * level) for component in top_color))
+                           for level in (PULSE_FLOOR + (1 - PULSE_FLOOR) * i / (PULSE_LEVELS - 1)
+                                         for i in range(PULSE_LEVELS)))
+
+
+# Tampon préalloué d'une cible, avec la rampe de la barre pour la palette en cours.
+# `key` décrit la trame contenue dans le tampon.
+class TargetFrame:
+    def __init__(self, num_leds):
+        self.num_leds = num_leds
+        self.buffer = bytearray(4 * num_leds)
+        self.view = memoryview(self.buffer)
+        self.dark = BLACK * num_leds
+        self.palette = None
+        self.ramp = b''
+        self.key = None
+
+    def use_palette(self, palette):
+        if palette is self.palette:
+            return
+        self.palette = palette
+        # LED i : couleur de la zone au milieu de son intervalle de la barre
+        self.ramp = b''.join(palette.colors[palette.zone((i + 0.5) / self.num_leds * palette.bar_max)]
+                             for i in range(self.num_leds))
+        self.key = None
+
+
+class LedEffects:
+    def __init__(self, effect='bar', pulse=False):
+        self.effect = effect
+        self.pulse = pulse
+        self.palettes = weakref.WeakKeyDictionary()
+        self.frames = weakref.WeakKeyDictionary()
+        self.rendered = 0
+        self.unchanged = 0
+
+    def palette(self, zones):
+        palette = self.palettes.get(zones)
+        if palette is None:
+            palette = self.palettes[zones] = ZonePalette(zones)
+        return palette
+
+    # Le pouls est actif au-delà du dernier seuil
+    def pulsing(self, value, zones):
+        return self.pulse and value is not None and zones is not None and zones.thresholds \
+            and value > zones.thresholds[-1]
+
+    # Trame d'une cible pour l'état d'un canal (valeur, zones, couleur unie), None si inchangée
+    def render(self, target, value, zones, color, now):
+        if value is None or zones is None:
+            key = ('solid', color)
+            frame = self.frame(target)
+            if key != frame.key:
+                fill(frame.view, COLOR.pack(*color))
+        else:
+            palette = self.palette(zones)
+            frame = self.frame(target)
+            frame.use_palette(palette)
+            if self.pulsing(value, zones):
+                phase = 0.5 + 0.5 * math.cos(2 * math.pi * PULSE_HZ * now)
+                level = round(phase * (PULSE_LEVELS - 1))
+                key = ('pulse', level)
+                if key != frame.key:
+                    fill(frame.view, palette.pulse[level])
+            elif self.effect == 'bar':
+                lit = min(frame.num_leds, max(0, round(value / palette.bar_max * frame.num_leds)))
+                key = ('bar', lit)
+                if key != frame.key:
+                    frame.view[:4 * lit] = frame.ramp[:4 * lit]
+                    frame.view[4 * lit:] = frame.dark[4 * lit:]
+            else:
+                packed = palette.gradient[min(len(palette.gradient) - 1, max(0, int(value)))]
+                key = ('gradient', packed)
+                if key != frame.key:
+                    fill(frame.view, packed)
+        if key == frame.key:
+            self.unchanged += 1
+            return None
+        frame.key = key
+        self.rendered += 1
+        return frame.buffer
+
+    # Les cibles sont recréées à chaque connexion OpenRGB : leurs tampons disparaissent avec elles
+    def frame(self, target):
+        frame = self.frames.get(target)
+        if frame is None:
+            frame = self.frames[target] = TargetFrame(target.num_leds)
+        return frame
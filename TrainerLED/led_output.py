@@ -0,0 +1,318 @@
+import select
+import socket
+import struct
+import threading
+import time
+import logging
+from collections import deque
+from metrics import registry
+
+# openrgb n'est importé qu'à la première connexion, depuis le thread de rendu des LED
+
+# Adresse par défaut du serveur SDK OpenRGB
+OPENRGB_HOST = 'localhost'
+OPENRGB_PORT = 6742
+
+# Paquets du protocole SDK OpenRGB envoyés directement par l'écriture groupée
+HEADER = struct.Struct('<4sIII')
+COLOR = struct.Struct('<BBBx')
+RGBCONTROLLER_UPDATELEDS = 1050
+RGBCONTROLLER_UPDATEZONELEDS = 1051
+
+
+# Cible LED : un périphérique entier ou une seule de ses zones
+class LedTarget:
+    def __init__(self, device, zone=None):
+        self.device = device
+        self.zone = zone
+        self.num_leds = len(zone.leds) if zone is not None else len(device.leds)
+        self.name = device.name if zone is None else f"{device.name}/{zone.name}"
+        # L'écriture groupée n'est possible que si le mode actif accepte des couleurs par LED
+        from openrgb.utils import ModeColors
+        active_mode = device.modes[device.active_mode] if device.modes else None
+        self.batched = zone is not None or (active_mode is not None and active_mode.color_mode == ModeColors.PER_LED)
+
+    # Paquet complet (en-tête compris) qui applique les couleurs de la trame
+    def packet(self, frame):
+        if self.zone is None:
+            body = struct.pack('<H', self.num_leds) + frame
+            packet_type = RGBCONTROLLER_UPDATELEDS
+        else:
+            body = struct.pack('<iH', self.zone.id, self.num_leds) + frame
+            packet_type = RGBCONTROLLER_UPDATEZONELEDS
+        body = struct.pack('<I', len(body) + 4) + body
+        return HEADER.pack(b'ORGB', self.device.id, packet_type, len(body)) + body
+
+    # Écriture via l'API du SDK, un aller-retour par cible
+    def write(self, frame, fast):
+        from openrgb.utils import RGBColor
+        colors = [RGBColor(*frame[i:i + 3]) for i in range(0, len(frame), 4)]
+        if self.zone is not None:
+            self.zone.set_colors(colors, fast)
+        elif self.batched:
+            self.device.set_colors(colors, fast)
+        else:
+            self.device.set_color(colors[0], fast)
+
+
+# Service de sortie LED : une seule connexion OpenRGB partagée par toute l'application.
+# La liste des périphériques est mise en cache à la connexion et la connexion est
+# rétablie avec un délai croissant (backoff) si le serveur OpenRGB redémarre.
+# Chaque étape de transition est envoyée à toutes les cibles en une seule écriture.
+# Les écritures renvoient False si rien n'a pu être envoyé : l'appelant réessaie à partir de
+# `next_attempt` et renvoie ses couleurs quand `connect_count` change (nouvelle connexion).
+# Les cibles sont réparties en groupes, un par canal de rendu (un cycliste) : None quand
+# un seul cycliste utilise toutes les cibles.
+class LedOutputService:
+    def __init__(self, host=OPENRGB_HOST, port=OPENRGB_PORT, client_name='TrainerLED',
+                 min_backoff=0.5, max_backoff=30.0):
+        self.host = host
+        self.port = port
+        self.client_name = client_name
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.lock = threading.RLock()
+        self.client = None
+        self.devices = []
+        self.targets = []
+        self.groups = {}
+        self.group_specs = {None: []}
+        self.batch = True
+        self.backoff = min_backoff
+        self.next_attempt = 0.0
+        self.connect_count = 0
+        self.flush_times = deque(maxlen=256)
+        self.flush_count = 0
+        self.flush_time = registry.histogram('led.flush_s')
+        self.flush_errors = registry.counter('led.flush_errors')
+        self.connect_failures = registry.counter('led.connect_failures')
+
+    @property
+    def connected(self):
+        return self.client is not None
+
+    # target_specs : liste de {"device": nom ou indice, "zone": nom ou indice (facultatif)},
+    # vide pour piloter tous les périphériques. batch=False revient à un envoi par périphérique.
+    def configure(self, target_specs=None, batch=True):
+        self.configure_groups({None: target_specs}, batch)
+
+    # groups : {canal: liste de cibles}. Un canal sans cible reçoit tous les périphériques
+    # qui ne sont attribués à aucun autre canal.
+    def configure_groups(self, groups, batch=True):
+        with self.lock:
+            self.group_specs = {channel: list(specs or []) for channel, specs in groups.items()}
+            self.batch = batch
+            if self.client is not None:
+                self.targets = self.resolve_targets()
+
+    # Résout les groupes de cibles et renvoie toutes les cibles, chacune une seule fois
+    def resolve_targets(self):
+        groups = {}
+        claimed = set()
+        for channel, specs in self.group_specs.items():
+            if specs:
+                groups[channel] = [target for target in map(self.resolve_target, specs) if target is not None]
+                claimed.update(target.device.id for target in groups[channel])
+        remaining = [LedTarget(device) for device in self.devices if device.id not in claimed]
+        for channel, specs in self.group_specs.items():
+            if not specs:
+                groups[channel] = remaining
+        self.groups = groups
+        targets = []
+        for group in groups.values():
+            targets.extend(target for target in group if target not in targets)
+        return targets
+
+    def resolve_target(self, spec):
+        device = find_by_name_or_index(self.devices, spec.get('device'))
+        if device is None:
+            logging.warning(f"Périphérique OpenRGB introuvable : {spec.get('device')}")
+            return None
+        if spec.get('zone') is None:
+            return LedTarget(device)
+        zone = find_by_name_or_index(device.zones, spec['zone'])
+        if zone is None:
+            logging.warning(f"Zone OpenRGB introuvable : {device.name}/{spec['zone']}")
+            return None
+        return LedTarget(device, zone)
+
+    def connect(self):
+        with self.lock:
+            if self.client is not None:
+                return True
+            now = time.monotonic()
+            if now < self.next_attempt:
+                return False
+            try:
+                from openrgb import OpenRGBClient
+                self.client = OpenRGBClient(self.host, self.port, self.client_name)
+                self.devices = list(self.client.devices)
+                self.targets = self.resolve_targets()
+            except Exception:
+                self.client = None
+                self.devices = []
+                self.targets = []
+                self.groups = {}
+                self.next_attempt = now + self.backoff
+                # Pile d'appels pour le premier échec seulement, les suivants tiennent en une ligne
+                logging.error(f"Connexion à OpenRGB impossible, nouvelle tentative dans {self.backoff:.1f} s",
+                              exc_info=self.backoff == self.min_backoff)
+                self.connect_failures.inc()
+                self.backoff = min(self.backoff * 2, self.max_backoff)
+                return False
+            # Les paquets sont petits : on évite l'attente de l'algorithme de Nagle
+            try:
+                self.client.comms.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            except (AttributeError, OSError):
+                pass
+            self.backoff = self.min_backoff
+            self.next_attempt = 0.0
+            self.connect_count += 1
+            logging.info(f"Connecté à OpenRGB ({len(self.devices)} périphérique(s), {len(self.targets)} cible(s))")
+            return True
+
+    def disconnect(self):
+        with self.lock:
+            if self.client is not None:
+                try:
+                    self.client.disconnect()
+                except Exception:
+                    pass
+            self.client = None
+            self.devices = []
+            self.targets = []
+            self.groups = {}
+
+    # Appelé après une erreur d'écriture : la prochaine tentative attend le délai de backoff
+    def connection_lost(self):
+        with self.lock:
+            self.disconnect()
+            self.next_attempt = time.monotonic() + self.backoff
+            self.backoff = min(self.backoff * 2, self.max_backoff)
+
+    def set_color(self, r, g, b):
+        with self.lock:
+            if not self.connect():
+                return False
+            color = COLOR.pack(r, g, b)
+            return self.flush([color * target.num_leds for target in self.targets])
+
+    # Une couleur par canal ({canal: (r, g, b)}), appliquée aux cibles du groupe du canal
+    def set_colors(self, colors):
+        with self.lock:
+            if not self.connect():
+                return False
+            targets = []
+            frames = []
+            for channel, color in colors.items():
+                packed = COLOR.pack(*color)
+                for target in self.groups.get(channel, ()):
+                    targets.append(target)
+                    frames.append(packed * target.num_leds)
+            if not targets:
+                return True
+            return self.flush(frames, targets)
+
+    # Trames par LED : render(cible, état) renvoie la trame de la cible pour l'état de son canal
+    # ({canal: état}), ou None si elle n'a pas changé. Les trames changées partent en une écriture.
+    def render(self, states, render):
+        with self.lock:
+            if not self.connect():
+                return False
+            targets = []
+            frames = []
+            for channel, state in states.items():
+                for target in self.groups.get(channel, ()):
+                    frame = render(target, state)
+                    if frame is not None:
+                        targets.append(target)
+                        frames.append(frame)
+            if not targets:
+                return True
+            return self.flush(frames, targets)
+
+    # Envoie une trame (4 octets par LED) à chaque cible, dans l'ordre de `targets`
+    # (self.targets par défaut)
+    def flush(self, frames, targets=None):
+        with self.lock:
+            if not self.connect():
+                return False
+            if not self.peer_alive():
+                # Serveur redémarré : le premier envoi sur l'ancienne socket réussirait sans rien
+                # livrer. On se reconnecte tout de suite ; les trames préparées pour les anciennes
+                # cibles sont abandonnées et l'appelant les refait pour la nouvelle connexion.
+                logging.warning("Connexion fermée par le serveur OpenRGB, reconnexion")
+                self.disconnect()
+                self.connect()
+                return False
+            if targets is None:
+                targets = self.targets
+            start = time.perf_counter()
+            try:
+                if self.batch:
+                    self.send_batch(frames, targets)
+                else:
+                    for target, frame in zip(targets, frames):
+                        target.write(frame, fast=False)
+            except Exception:
+                logging.error("Connexion à OpenRGB perdue", exc_info=True)
+                self.flush_errors.inc()
+                self.connection_lost()
+                return False
+            elapsed = time.perf_counter() - start
+            self.flush_times.append(elapsed)
+            self.flush_time.observe(elapsed)
+            self.flush_count += 1
+            return True
+
+    # La socket du client est lisible sans donnée en attente : le serveur l'a fermée
+    def peer_alive(self):
+        try:
+            sock = self.client.comms.sock
+        except AttributeError:
+            return True
+        try:
+            readable, _, _ = select.select([sock], [], [], 0)
+            return not readable or sock.recv(1, socket.MSG_PEEK) != b''
+        except (OSError, ValueError):
+            return False
+
+    # Tous les paquets de l'étape partent en un seul envoi sur le socket du client OpenRGB.
+    # Les cibles dont le mode n'accepte pas de couleurs par LED passent par l'API du SDK.
+    def send_batch(self, frames, targets):
+        comms = self.client.comms
+        data = b''.join(target.packet(frame) for target, frame in zip(targets, frames) if target.batched)
+        if data:
+            if not comms.lock.acquire(timeout=10):
+                raise ConnectionError("Le serveur OpenRGB ne répond pas")
+            try:
+                comms.sock.sendall(data)
+            finally:
+                comms.lock.release()
+        for target, frame in zip(targets, frames):
+            if not target.batched:
+                target.write(frame, fast=True)
+
+    def flush_stats(self):
+        with self.lock:
+            times = list(self.flush_times)
+        if not times:
+            return {'flushes': self.flush_count, 'last_ms': None, 'mean_ms': None, 'max_ms': None}
+        return {
+            'flushes': self.flush_count,
+            'last_ms': times[-1] * 1000,
+            'mean_ms': sum(times) / len(times) * 1000,
+            'max_ms': max(times) * 1000,
+        }
+
+    def close(self):
+        self.disconnect()
+
+
+def find_by_name_or_index(items, key):
+    if isinstance(key, int):
+        return items[key] if 0 <= key < len(items) else None
+    for item in items:
+        if item.name == key:
+            return item
+    return None
@@ -0,0 +1,249 @@
+import threading
+import time
+from led_effects import LedEffects
+
+
+# État de rendu d'un canal (un cycliste et ses cibles LED)
+class RenderChannel:
+    def __init__(self):
+        self.pending = None
+        self.target = None
+        self.current_color = (0, 0, 0)
+        self.start_color = (0, 0, 0)
+        self.step = 0
+        self.fading = False
+        self.next_step = 0.0
+        # Effets par LED : dernière valeur lissée et profil de zones, None pour une couleur unie
+        self.value = None
+        self.zones = None
+        self.dirty = False
+
+
+# Thread unique de rendu des LED avec une boîte aux lettres "dernière cible gagnante" par canal.
+# Une nouvelle couleur interrompt la transition en cours du canal et repart de la couleur
+# affichée ; les cibles en double ne provoquent aucune écriture vers les périphériques.
+# Les canaux (un par cycliste, None pour un seul cycliste) avancent chacun à leur rythme ;
+# les étapes dues au même moment partent dans une seule écriture vers OpenRGB.
+# Avec un effet par LED (voir led_effects), les trames sont dessinées à partir de la dernière
+# valeur de chaque canal, au plus `fps` fois par seconde et seulement si elles changent.
+# Une écriture refusée (OpenRGB arrêté ou redémarré) est retentée à la prochaine tentative de
+# connexion de la sortie, et chaque nouvelle connexion reçoit l'état actuel de tous les canaux.
+class LedRenderWorker(threading.Thread):
+    def __init__(self, output, steps=10, delay=0.01):
+        super().__init__(name='LedRenderWorker', daemon=True)
+        self.output = output
+        self.steps = steps
+        self.delay = delay
+        self.condition = threading.Condition()
+        self.channels = {}
+        self.running = True
+        self.effect = 'fade'
+        self.effects = None
+        self.frame_interval = 1 / 30
+        self.next_frame = 0.0
+        # Canaux dont l'état affiché n'a pas atteint OpenRGB, retentés à partir de retry_at
+        self.unsent = set()
+        self.retry_at = 0.0
+        self.connection = output.connect_count
+        # Compteurs pour vérifier que le rendu suit le rythme des notifications
+        self.submitted = 0
+        self.coalesced = 0
+        self.duplicates = 0
+        self.preempted = 0
+        self.frames_written = 0
+        self.write_failures = 0
+
+    # effect : "fade" (couleur unie avec transition) ou un effet de led_effects ("bar", "gradient").
+    # pulse : pouls au-delà du dernier seuil ; fps : plafond de trames par seconde des effets
+    def configure_effect(self, effect='fade', fps=30, pulse=False):
+        with self.condition:
+            self.effect = effect
+            self.effects = None if effect == 'fade' else LedEffects(effect, pulse)
+            self.frame_interval = 1 / max(1, fps)
+            self.condition.notify()
+
+    # Valeur lissée d'un canal pour les effets par LED, ignorée en mode "fade"
+    def submit_power(self, value, zones, channel=None):
+        if self.effects is None:
+            return
+        with self.condition:
+            state = self.channel(channel)
+            if value != state.value or zones is not state.zones:
+                state.value = value
+                state.zones = zones
+                state.dirty = True
+                self.condition.notify()
+
+    def channel(self, channel):
+        state = self.channels.get(channel)
+        if state is None:
+            state = self.channels[channel] = RenderChannel()
+        return state
+
+    def submit(self, r, g, b, channel=None):
+        color = (r, g, b)
+        with self.condition:
+            self.submitted += 1
+            state = self.channel(channel)
+            if self.effects is not None:
+                # Couleur unie (début et fin de sortie) jusqu'à la prochaine valeur
+                state.target = state.current_color = color
+                state.value = state.zones = None
+                state.dirty = True
+                self.condition.notify()
+                return
+            if state.pending is not None:
+                # La cible en attente n'a jamais été affichée : elle est écrasée
+                self.coalesced += 1
+                if color == state.target:
+                    state.pending = None
+                    return
+            elif color == state.target:
+                self.duplicates += 1
+                return
+            state.pending = color
+            self.condition.notify()
+
+    # Couleur affichée sur un canal
+    def current_color(self, channel=None):
+        with self.condition:
+            state = self.channels.get(channel)
+            return state.current_color if state is not None else (0, 0, 0)
+
+    @property
+    def queue_depth(self):
+        with self.condition:
+            return sum(state.pending is not None for state in self.channels.values())
+
+    def stats(self):
+        with self.condition:
+            stats = {
+                'channels': len(self.channels),
+                'queue_depth': sum(state.pending is not None for state in self.channels.values()),
+                'submitted': self.submitted,
+                'coalesced': self.coalesced,
+                'duplicates': self.duplicates,
+                'preempted': self.preempted,
+                'frames_written': self.frames_written,
+                'write_failures': self.write_failures,
+                'unsent': len(self.unsent),
+            }
+            if self.effects is not None:
+                stats['effect_frames'] = self.effects.rendered
+                stats['effect_unchanged'] = self.effects.unchanged
+            return stats
+
+    def stop(self, timeout=1.0):
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+        if self.is_alive():
+            self.join(timeout)
+
+    def run(self):
+        while True:
+            with self.condition:
+                while True:
+                    if not self.running:
+                        return
+                    now = time.monotonic()
+                    self.check_connection()
+                    if self.effects is not None:
+                        states = self.next_frame_states(now)
+                        if states:
+                            break
+                        self.condition.wait(self.time_to_next_frame(now))
+                        continue
+                    colors = self.next_colors(now)
+                    if colors:
+                        break
+                    self.condition.wait(self.time_to_next_step(now))
+            if self.effects is not None:
+                self.write_frame(states, now)
+            else:
+                self.write(colors)
+
+    # Nouvelle connexion OpenRGB (premier démarrage ou redémarrage du serveur) : les
+    # périphériques ont perdu l'état affiché, tous les canaux sont renvoyés (verrou tenu)
+    def check_connection(self):
+        connection = self.output.connect_count
+        if connection != self.connection:
+            self.connection = connection
+            self.unsent.update(self.channels)
+
+    # Écriture terminée : les canaux refusés sont retentés à la prochaine tentative de connexion
+    def written(self, channels, ok):
+        with self.condition:
+            if ok:
+                self.frames_written += 1
+                self.unsent.difference_update(channels)
+            else:
+                self.write_failures += 1
+                self.unsent.update(channels)
+                self.retry_at = max(self.output.next_attempt, time.monotonic() + self.delay)
+
+    def retry_due(self, channel, now):
+        return channel in self.unsent and now >= self.retry_at
+
+    # Canaux à redessiner quand la trame suivante est due : valeur changée, pouls en cours ou
+    # trame à renvoyer (verrou tenu)
+    def next_frame_states(self, now):
+        if now < self.next_frame:
+            return None
+        states = {channel: (state.value, state.zones, state.target or (0, 0, 0))
+                  for channel, state in self.channels.items()
+                  if state.dirty or self.effects.pulsing(state.value, state.zones) or self.retry_due(channel, now)}
+        if states:
+            for state in self.channels.values():
+                state.dirty = False
+            self.next_frame = now + self.frame_interval
+        return states
+
+    # Délai avant la prochaine trame si un canal attend, None sinon
+    def time_to_next_frame(self, now):
+        if any(state.dirty or self.effects.pulsing(state.value, state.zones) for state in self.channels.values()):
+            return max(0.0, self.next_frame - now)
+        if self.unsent:
+            return max(0.0, self.next_frame - now, self.retry_at - now)
+        return None
+
+    def write_frame(self, states, now):
+        effects = self.effects
+        ok = self.output.render(states, lambda target, state: effects.render(target, *state, now))
+        self.written(states, ok)
+
+    # Démarre les nouvelles transitions et renvoie {canal: couleur} des étapes dues (verrou tenu)
+    def next_colors(self, now):
+        colors = {}
+        for channel, state in self.channels.items():
+            if state.pending is not None:
+                if state.fading:
+                    # Nouvelle cible : on repart de la couleur actuellement affichée
+                    self.preempted += 1
+                state.target = state.pending
+                state.pending = None
+                state.start_color = state.current_color
+                state.step = 0
+                state.fading = state.start_color != state.target
+                state.next_step = now
+            if state.fading and state.next_step <= now:
+                state.step += 1
+                ratio = state.step / self.steps
+                state.current_color = tuple(round(s + (t - s) * ratio)
+                                            for s, t in zip(state.start_color, state.target))
+                state.fading = state.step < self.steps
+                state.next_step = now + self.delay
+                colors[channel] = state.current_color
+            elif self.retry_due(channel, now):
+                colors[channel] = state.current_color
+        return colors
+
+    # Délai avant la prochaine étape d'une transition en cours ou le prochain renvoi, None si aucun
+    def time_to_next_step(self, now):
+        steps = [state.next_step for state in self.channels.values() if state.fading]
+        if self.unsent:
+            steps.append(self.retry_at)
+        return max(0.0, min(steps) - now) if steps else None
+
+    def write(self, colors):
+        self.written(colors, self.output.set_colors(colors))
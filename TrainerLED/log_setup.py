@@ -0,0 +1,78 @@
+import atexit
+import logging
+import queue
+import sys
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from metrics import registry
+
+# Intervalle minimal (s) entre deux avertissements identiques
+RATE_LIMIT_INTERVAL = 10.0
+
+# Au-delà de ce nombre de messages différents retenus, les plus anciens sont oubliés
+RATE_LIMIT_MAX_MESSAGES = 1000
+
+
+# Limite les avertissements et erreurs répétés : un même message (texte et arguments) n'est
+# émis qu'une fois par intervalle ; deux messages différents du même endroit du code (deux
+# périphériques déconnectés, deux cibles LED introuvables) passent tous les deux. Le nombre
+# de messages supprimés est ajouté au message suivant. Le filtre est appliqué avant la mise
+# en file, donc avant le formatage de la pile d'appels.
+class RateLimitFilter(logging.Filter):
+    def __init__(self, interval=RATE_LIMIT_INTERVAL, level=logging.WARNING):
+        super().__init__()
+        self.interval = interval
+        self.level = level
+        self.lock = threading.Lock()
+        self.sites = {}
+        self.suppressed = registry.counter('log.suppressed')
+
+    def filter(self, record):
+        if record.levelno < self.level:
+            return True
+        try:
+            key = (record.msg, record.args)
+            hash(key)
+        except TypeError:
+            key = (record.msg, repr(record.args))
+        now = time.monotonic()
+        with self.lock:
+            if len(self.sites) >= RATE_LIMIT_MAX_MESSAGES and key not in self.sites:
+                self.sites = {other: site for other, site in self.sites.items()
+                              if now - site[0] < self.interval}
+            site = self.sites.get(key)
+            if site is not None and now - site[0] < self.interval:
+                site[1] += 1
+                self.suppressed.inc()
+                return False
+            suppressed = site[1] if site is not None else 0
+            self.sites[key] = [now, 0]
+        if suppressed:
+            record.msg = f"{record.msg} ({suppressed} message(s) identique(s) supprimé(s))"
+        return True
+
+
+# Journalisation non bloquante : les threads de l'application (Bluetooth, LED, interface) ne font
+# que déposer les messages dans une file ; un thread dédié écrit le fichier tournant et la console.
+# Renvoie le QueueListener, arrêté (file vidée) à la sortie du programme.
+def setup_logging(path, level=logging.INFO, max_bytes=200 * 1024, backup_count=5, interval=RATE_LIMIT_INTERVAL):
+    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+    file_handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count)
+    file_handler.setFormatter(formatter)
+    console_handler = logging.StreamHandler(sys.stdout)
+    console_handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = QueueHandler(log_queue)
+    queue_handler.addFilter(RateLimitFilter(interval))
+    listener = QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
@@ -0,0 +1,158 @@
+import json
+import logging
+import threading
+import time
+from bisect import bisect_left
+
+# Bornes des histogrammes de latence, en secondes (de 1 µs à 10 s)
+LATENCY_BUCKETS = tuple(float(f'{base}e{exponent}') for exponent in range(-6, 1) for base in (1, 2, 5)) + (10.0,)
+
+
+# Compteur incrémenté depuis n'importe quel thread
+class Counter:
+    def __init__(self):
+        self.value = 0
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self.lock:
+            self.value += amount
+
+
+# Histogramme à bornes fixes : observe() ne fait qu'une recherche dichotomique et quelques
+# additions, les percentiles sont estimés par la borne haute du seau qui les contient.
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        i = bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[i] += 1
+            self.count += 1
+            self.total += value
+            if value > self.max:
+                self.max = value
+
+    def percentile(self, p, counts=None, count=None):
+        counts = self.counts if counts is None else counts
+        count = self.count if count is None else count
+        if not count:
+            return None
+        rank = p / 100 * count
+        seen = 0
+        for i, bucket_count in enumerate(counts):
+            seen += bucket_count
+            if seen >= rank and bucket_count:
+                return self.buckets[i] if i < len(self.buckets) else self.max
+        return self.max
+
+    def snapshot(self):
+        with self.lock:
+            counts = list(self.counts)
+            count, total, maximum = self.count, self.total, self.max
+        return {
+            'count': count,
+            'mean': total / count if count else None,
+            'p50': self.percentile(50, counts, count),
+            'p99': self.percentile(99, counts, count),
+            'max': maximum if count else None,
+            'buckets': {str(bound): n for bound, n in zip(self.buckets + ('+Inf',), counts) if n},
+        }
+
+
+# Registre des mesures de l'application : compteurs et histogrammes nommés ("ble.parse_s"...),
+# créés au premier appel. Les chemins critiques gardent une référence sur leur mesure.
+class MetricsRegistry:
+    def __init__(self):
+        self.counters = {}
+        self.histograms = {}
+        self.lock = threading.Lock()
+        self.started = time.time()
+
+    def counter(self, name):
+        with self.lock:
+            return self.counters.setdefault(name, Counter())
+
+    def histogram(self, name, buckets=LATENCY_BUCKETS):
+        with self.lock:
+            return self.histograms.setdefault(name, Histogram(buckets))
+
+    def snapshot(self):
+        with self.lock:
+            counters = dict(self.counters)
+            histograms = dict(self.histograms)
+        return {
+            'uptime_s': time.time() - self.started,
+            'counters': {name: counter.value for name, counter in sorted(counters.items())},
+            'histograms': {name: histogram.snapshot() for name, histogram in sorted(histograms.items())},
+        }
+
+    def dump(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(), f, indent=1)
+
+    # Format texte de Prometheus, pour une collecte locale
+    def to_text(self):
+        snapshot = self.snapshot()
+        lines = []
+        for name, value in snapshot['counters'].items():
+            metric = prometheus_name(name)
+            lines += [f'# TYPE {metric} counter', f'{metric} {value}']
+        with self.lock:
+            histograms = sorted(self.histograms.items())
+        for name, histogram in histograms:
+            metric = prometheus_name(name)
+            with histogram.lock:
+                counts = list(histogram.counts)
+                count, total = histogram.count, histogram.total
+            lines.append(f'# TYPE {metric} histogram')
+            cumulative = 0
+            for bound, n in zip(histogram.buckets + ('+Inf',), counts):
+                cumulative += n
+                lines.append(f'{metric}_bucket{{le="{bound}"}} {cumulative}')
+            lines += [f'{metric}_sum {total}', f'{metric}_count {count}']
+        return '\n'.join(lines) + '\n'
+
+
+def prometheus_name(name):
+    return 'trainerled_' + name.replace('.', '_')
+
+
+# Serveur HTTP local en lecture seule : /metrics (texte Prometheus) et /metrics.json
+def serve(registry, port, host='127.0.0.1'):
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == '/metrics':
+                body, content_type = registry.to_text(), 'text/plain; version=0.0.4'
+            elif self.path == '/metrics.json':
+                body, content_type = json.dumps(registry.snapshot()), 'application/json'
+            else:
+                self.send_error(404)
+                return
+            data = body.encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='MetricsServer', daemon=True).start()
+    logging.info(f"Mesures disponibles sur http://{host}:{server.server_port}/metrics")
+    return server
+
+
+# Registre partagé par tous les modules
+registry = MetricsRegistry()
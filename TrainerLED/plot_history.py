@@ -0,0 +1,162 @@
+from collections import deque
+import numpy as np
+
+
+# Tampon circulaire de taille fixe sur un tableau NumPy
+class RingBuffer:
+    def __init__(self, capacity, dtype=float, shape=()):
+        self.capacity = capacity
+        self.data = np.zeros((capacity,) + tuple(shape), dtype=dtype)
+        self.start = 0
+        self.length = 0
+
+    def __len__(self):
+        return self.length
+
+    def append(self, value):
+        end = (self.start + self.length) % self.capacity
+        self.data[end] = value
+        if self.length < self.capacity:
+            self.length += 1
+        else:
+            self.start = (self.start + 1) % self.capacity
+
+    # Copie des valeurs dans l'ordre chronologique
+    def values(self):
+        end = self.start + self.length
+        if end <= self.capacity:
+            return self.data[self.start:end].copy()
+        return np.concatenate((self.data[self.start:], self.data[:end - self.capacity]))
+
+    def clear(self):
+        self.start = 0
+        self.length = 0
+
+
+# Minimum et maximum glissants sur les `window` dernières valeurs, en O(1) amorti
+# (deux files monotones d'indices)
+class SlidingMinMax:
+    def __init__(self, window):
+        self.window = window
+        self.count = 0
+        self.min_queue = deque()
+        self.max_queue = deque()
+
+    def append(self, value):
+        index = self.count
+        self.count += 1
+        while self.min_queue and self.min_queue[-1][1] >= value:
+            self.min_queue.pop()
+        self.min_queue.append((index, value))
+        while self.max_queue and self.max_queue[-1][1] <= value:
+            self.max_queue.pop()
+        self.max_queue.append((index, value))
+        oldest = self.count - self.window
+        if self.min_queue[0][0] < oldest:
+            self.min_queue.popleft()
+        if self.max_queue[0][0] < oldest:
+            self.max_queue.popleft()
+
+    @property
+    def min(self):
+        return self.min_queue[0][1] if self.min_queue else None
+
+    @property
+    def max(self):
+        return self.max_queue[0][1] if self.max_queue else None
+
+
+# Un niveau de l'historique : min/max par paquet de `bucket` échantillons.
+# Les niveaux fins gardent les `capacity` derniers paquets ; le niveau le plus grossier
+# fusionne ses paquets deux à deux quand il est plein et couvre donc toujours toute la sortie.
+class _MinMaxLevel:
+    def __init__(self, bucket, capacity, compacting=False):
+        self.bucket = bucket
+        self.capacity = capacity + capacity % 2
+        self.compacting = compacting
+        self.starts = RingBuffer(self.capacity, dtype=np.int64)
+        self.lows = RingBuffer(self.capacity, dtype=np.float32)
+        self.highs = RingBuffer(self.capacity, dtype=np.float32)
+        self.pending_start = None
+        self.pending_count = 0
+        self.pending_low = 0.0
+        self.pending_high = 0.0
+
+    def add(self, index, value):
+        if self.pending_start is None:
+            self.pending_start = index
+            self.pending_low = self.pending_high = value
+        else:
+            self.pending_low = min(self.pending_low, value)
+            self.pending_high = max(self.pending_high, value)
+        self.pending_count += 1
+        if self.pending_count == self.bucket:
+            if self.compacting and len(self.starts) == self.capacity:
+                # Le paquet en cours continue de se remplir jusqu'à la nouvelle taille
+                self.compact()
+                return
+            self.starts.append(self.pending_start)
+            self.lows.append(self.pending_low)
+            self.highs.append(self.pending_high)
+            self.pending_start = None
+            self.pending_count = 0
+
+    def compact(self):
+        starts, lows, highs = self.starts.values(), self.lows.values(), self.highs.values()
+        pairs = len(starts) // 2
+        merged = (starts[0:2 * pairs:2],
+                  np.minimum(lows[0:2 * pairs:2], lows[1:2 * pairs:2]),
+                  np.maximum(highs[0:2 * pairs:2], highs[1:2 * pairs:2]))
+        for buffer, values in zip((self.starts, self.lows, self.highs), merged):
+            buffer.data[:pairs] = values
+            buffer.start = 0
+            buffer.length = pairs
+        self.bucket *= 2
+
+    # Premier échantillon encore couvert par ce niveau
+    def first_index(self):
+        if len(self.starts):
+            return int(self.starts.data[self.starts.start])
+        return self.pending_start
+
+    def arrays(self):
+        starts, lows, highs = self.starts.values(), self.lows.values(), self.highs.values()
+        if self.pending_start is not None:
+            starts = np.append(starts, self.pending_start)
+            lows = np.append(lows, self.pending_low)
+            highs = np.append(highs, self.pending_high)
+        return starts, lows, highs
+
+
+# Historique complet de la sortie décimé en min/max sur plusieurs niveaux (facteur `factor`
+# entre deux niveaux). La mémoire est bornée quelle que soit la durée de la sortie.
+class DecimatedHistory:
+    def __init__(self, capacity=2048, factor=8, levels=4):
+        self.levels = [_MinMaxLevel(factor ** i, capacity, compacting=(i == levels - 1))
+                       for i in range(levels)]
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def append(self, value):
+        index = self.count
+        self.count += 1
+        for level in self.levels:
+            level.add(index, value)
+
+    # Enveloppe min/max entre les échantillons `start` et `end`, prise sur le niveau le plus
+    # fin qui couvre tout l'intervalle avec au plus `max_points` paquets.
+    # Renvoie (indices de début de paquet, minimums, maximums).
+    def envelope(self, start=0, end=None, max_points=1000):
+        end = self.count if end is None else end
+        for level in self.levels:
+            first = level.first_index()
+            if first is None or first > start:
+                continue
+            if (end - start) / level.bucket > max_points and level is not self.levels[-1]:
+                continue
+            starts, lows, highs = level.arrays()
+            mask = (starts + level.bucket > start) & (starts < end)
+            return starts[mask], lows[mask], highs[mask]
+        return np.array([], dtype=np.int64), np.array([]), np.array([])
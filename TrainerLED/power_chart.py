@@ -0,0 +1,103 @@
+import time
+import numpy as np
+from matplotlib.figure import Figure
+from matplotlib.collections import LineCollection
+from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg
+from metrics import registry
+from plot_history import RingBuffer, SlidingMinMax, DecimatedHistory
+
+# Mise à jour des données du graphique (append) et dessin effectif par Qt (draw)
+update_time = registry.histogram('plot.update_s')
+draw_time = registry.histogram('plot.draw_s')
+
+
+# Canevas qui mesure chaque dessin : draw_idle ne fait que le programmer
+class TimedCanvas(FigureCanvasQTAgg):
+    def draw(self):
+        start = time.perf_counter()
+        super().draw()
+        draw_time.observe(time.perf_counter() - start)
+
+
+# Graphique de puissance en temps réel : un seul LineCollection mis à jour sur place,
+# limité à la fenêtre visible, et redessiné avec draw_idle. Le coût d'un rafraîchissement
+# ne dépend plus de la durée de la sortie.
+# append ne fait qu'ajouter le point ; refresh redessine une fois par image de l'interface,
+# quel que soit le nombre de points arrivés entre deux images.
+# Les points visibles sont dans des tampons circulaires NumPy ; toute la sortie est gardée
+# sous forme d'enveloppe min/max décimée pour la vue "toute la sortie".
+class PowerChart:
+    def __init__(self, window=50):
+        self.window = window
+        self.figure = Figure()
+        self.ax = self.figure.add_subplot()
+        self.canvas = TimedCanvas(self.figure)
+        self.xdata = RingBuffer(window + 1, dtype=np.int64)
+        self.ydata = RingBuffer(window + 1)
+        self.colors = RingBuffer(window + 1, shape=(3,))
+        self.y_range = SlidingMinMax(window + 1)
+        self.history = DecimatedHistory()
+        self.count = 0
+        self.full_ride = False
+        self.dirty = False
+
+        self.segments = LineCollection([], linewidths=2)
+        self.ax.add_collection(self.segments)
+        self.envelope, = self.ax.plot([], [], lw=1, color='tab:blue')
+        self.ax.set_ylim(0, 300)
+        self.ax.set_xlim(0, window)
+        self.ax.grid()
+
+    def append(self, power, color):
+        start = time.perf_counter()
+        self.count += 1
+        self.xdata.append(self.count)
+        self.ydata.append(power)
+        self.colors.append(color)
+        self.y_range.append(power)
+        self.history.append(power)
+        self.dirty = True
+        update_time.observe(time.perf_counter() - start)
+
+    # Redessine si des points sont arrivés depuis la dernière image
+    def refresh(self):
+        if not self.dirty:
+            return
+        if self.full_ride:
+            self.draw_full_ride()
+        else:
+            self.draw_window()
+
+    def set_full_ride(self, enabled):
+        self.full_ride = enabled
+        self.segments.set_visible(not enabled)
+        self.envelope.set_visible(enabled)
+        if enabled:
+            self.draw_full_ride()
+        else:
+            self.draw_window()
+
+    def draw_window(self):
+        self.dirty = False
+        # Un segment par paire de points visibles, coloré selon la zone du premier point
+        if len(self.xdata) >= 2:
+            points = np.column_stack((self.xdata.values(), self.ydata.values()))
+            self.segments.set_segments(np.stack((points[:-1], points[1:]), axis=1))
+            self.segments.set_color(self.colors.values()[:-1])
+
+        self.ax.set_xlim(max(0, self.count - self.window), self.count)
+        if self.count:
+            self.ax.set_ylim(self.y_range.min - 10, self.y_range.max + 10)
+        self.canvas.draw_idle()
+
+    def draw_full_ride(self, max_points=1000):
+        self.dirty = False
+        starts, lows, highs = self.history.envelope(0, self.count, max_points)
+        if len(starts):
+            # Tracé en zigzag min/max : chaque paquet garde ses extrêmes visibles
+            x = np.repeat(starts + 1, 2)
+            y = np.column_stack((lows, highs)).ravel()
+            self.envelope.set_data(x, y)
+            self.ax.set_xlim(0, max(self.count, 1))
+            self.ax.set_ylim(float(lows.min()) - 10, float(highs.max()) + 10)
+        self.canvas.draw_idle()
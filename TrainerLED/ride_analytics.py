@@ -0,0 +1,140 @@
+import threading
+
+# Analyse de la sortie en continu, échantillon par échantillon : puissance normalisée (NP),
+# IF et TSS par rapport à la FTP, temps passé dans chaque zone et meilleures puissances
+# sur 5 s, 1 min, 5 min et 20 min. Travail O(1) amorti par échantillon et mémoire bornée
+# (les 20 dernières minutes au plus), quelle que soit la durée de la sortie.
+
+# Durées de la courbe puissance-durée (s)
+DEFAULT_DURATIONS = (5, 60, 300, 1200)
+
+# Fenêtre de la moyenne glissante de la puissance normalisée (s)
+NP_WINDOW = 30
+
+# Au-delà de cet intervalle sans échantillon (s), la sortie est considérée en pause :
+# le temps écoulé n'est compté ni dans les moyennes ni dans les zones
+MAX_GAP = 5.0
+
+
+# Tampon circulaire des dernières valeurs à la seconde, avec une somme glissante par durée
+class _RollingSums:
+    def __init__(self, durations):
+        self.durations = tuple(durations)
+        self.capacity = max(self.durations)
+        self.values = [0.0] * self.capacity
+        self.count = 0
+        self.sums = [0.0] * len(self.durations)
+
+    def append(self, value):
+        for i, duration in enumerate(self.durations):
+            self.sums[i] += value
+            if self.count >= duration:
+                self.sums[i] -= self.values[(self.count - duration) % self.capacity]
+        self.values[self.count % self.capacity] = value
+        self.count += 1
+
+    # Moyennes des fenêtres déjà pleines (None pour les autres)
+    def averages(self):
+        return [total / duration if self.count >= duration else None
+                for duration, total in zip(self.durations, self.sums)]
+
+
+class RideAnalytics:
+    def __init__(self, durations=DEFAULT_DURATIONS, np_window=NP_WINDOW, max_gap=MAX_GAP):
+        self.durations = tuple(sorted(durations))
+        self.np_window = np_window
+        self.max_gap = max_gap
+        # Le thread Bluetooth écrit, l'interface ou un programme appelant lit le résumé
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.rolling = _RollingSums(self.durations + (self.np_window,))
+            self.best = [None] * len(self.durations)
+            self.last_time = None
+            self.power = None
+            self.zone_value = None
+            self.zone_index = None
+            self.second_start = None
+            self.second_energy = 0.0
+            self.elapsed = 0.0
+            self.energy = 0.0
+            self.max_power = None
+            self.np_total = 0.0
+            self.np_count = 0
+            self.time_in_zone = []
+
+    # Un échantillon : puissance (W, None si absente) et valeur qui détermine la zone
+    # (puissance ou fréquence cardiaque) avec l'index de zones du profil actif.
+    # Chaque valeur est tenue jusqu'à l'échantillon suivant.
+    def update(self, now, power=None, zone_value=None, zone_index=None):
+        with self.lock:
+            if self.last_time is not None:
+                elapsed = now - self.last_time
+                if 0 < elapsed <= self.max_gap:
+                    self.accumulate(self.last_time, now)
+                elif elapsed != 0:
+                    # Pause (ou horloge qui recule) : la seconde en cours est abandonnée
+                    self.second_start = now
+                    self.second_energy = 0.0
+            if self.second_start is None:
+                self.second_start = now
+            self.last_time = now
+            if power is not None:
+                self.power = power
+                if self.max_power is None or power > self.max_power:
+                    self.max_power = power
+            if zone_value is not None:
+                self.zone_value = zone_value
+                if zone_index is not self.zone_index:
+                    self.zone_index = zone_index
+                    zones = len(zone_index.thresholds) + 1
+                    if len(self.time_in_zone) < zones:
+                        self.time_in_zone.extend([0.0] * (zones - len(self.time_in_zone)))
+
+    # Intègre les valeurs tenues entre `start` et `end` (verrou tenu)
+    def accumulate(self, start, end):
+        elapsed = end - start
+        self.elapsed += elapsed
+        if self.zone_value is not None:
+            self.time_in_zone[self.zone_index.zone(self.zone_value)] += elapsed
+        if self.power is None:
+            return
+        self.energy += self.power * elapsed
+        # Découpage en secondes pour les moyennes glissantes
+        while end - self.second_start >= 1.0:
+            second_end = self.second_start + 1.0
+            self.second_energy += self.power * (second_end - max(start, self.second_start))
+            self.add_second(self.second_energy)
+            start = self.second_start = second_end
+            self.second_energy = 0.0
+        self.second_energy += self.power * (end - max(start, self.second_start))
+
+    def add_second(self, power):
+        self.rolling.append(power)
+        averages = self.rolling.averages()
+        for i, average in enumerate(averages[:-1]):
+            if average is not None and (self.best[i] is None or average > self.best[i]):
+                self.best[i] = average
+        if averages[-1] is not None:
+            self.np_total += averages[-1] ** 4
+            self.np_count += 1
+
+    # Résumé de la sortie ; IF et TSS seulement si la FTP est connue
+    def summary(self, ftp=None):
+        with self.lock:
+            normalized = (self.np_total / self.np_count) ** 0.25 if self.np_count else None
+            intensity = normalized / ftp if normalized is not None and ftp else None
+            tss = self.elapsed * normalized * intensity / (ftp * 3600) * 100 if intensity is not None else None
+            return {
+                'elapsed_s': self.elapsed,
+                'average_power': self.energy / self.elapsed if self.elapsed else None,
+                'max_power': self.max_power,
+                'normalized_power': normalized,
+                'intensity_factor': intensity,
+                'tss': tss,
+                'work_kj': self.energy / 1000,
+                'time_in_zone_s': list(self.time_in_zone),
+                'best_power': dict(zip(self.durations, self.best)),
+            }
@@ -0,0 +1,403 @@
+import base64
+import hashlib
+import logging
+import selectors
+import socket
+import struct
+import threading
+import time
+from collections import namedtuple
+from metrics import registry
+
+# Diffusion locale des échantillons décodés, pour les autres programmes de la machine
+# (incrustation pour un stream, second écran, journal...) sans seconde connexion Bluetooth :
+#   - UDP : un datagramme par échantillon, en multidiffusion (239.x.x.x, limitée à la machine
+#     par défaut) ou vers une adresse simple ;
+#   - WebSocket sur 127.0.0.1 : un message binaire par échantillon.
+# Chaque échantillon est une trame binaire de 25 octets suivie du nom du cycliste (voir FRAME).
+# L'envoi se fait depuis le thread Bluetooth, sur des sockets non bloquantes : un abonné trop
+# lent perd des trames puis est déconnecté, il ne bloque jamais le pipeline.
+# Les abonnés utilisent feed_client.
+
+# Trame : "TL", version, champs présents (FIELD_*), numéro de séquence, heure d'émission
+# (time.time()), puissance (W), cadence (1/10 tr/min), vitesse (1/100 km/h), fréquence
+# cardiaque (bpm), zone (1 à 7, 0 si inconnue), longueur du nom puis nom UTF-8 du cycliste
+FRAME = struct.Struct('<2sBBIdHHHBBB')
+MAGIC = b'TL'
+VERSION = 1
+FIELD_POWER = 1
+FIELD_CADENCE = 2
+FIELD_SPEED = 4
+FIELD_HEART_RATE = 8
+FIELD_ZONE = 16
+MAX_NAME = 32
+
+# Groupe et port UDP proposés (feed_udp) ; TTL 0 : les datagrammes ne quittent pas la machine
+DEFAULT_FEED_GROUP = '239.255.76.84'
+DEFAULT_FEED_UDP_PORT = 5084
+DEFAULT_FEED_TTL = 0
+
+# Abonné WebSocket lent : trames en attente au plus (octets), puis trames sautées ;
+# déconnecté après ce temps (s) sans avoir rattrapé son retard
+MAX_PENDING = 64 * 1024
+DROP_AFTER = 2.0
+
+WEBSOCKET_GUID = '258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+MAX_HANDSHAKE = 8192
+HANDSHAKE_TIMEOUT = 5.0
+
+FeedSample = namedtuple('FeedSample', ['rider', 'sequence', 'time', 'power', 'cadence', 'speed',
+                                       'heart_rate', 'zone'])
+
+published_frames = registry.counter('feed.frames')
+skipped_frames = registry.counter('feed.skipped')
+dropped_clients = registry.counter('feed.clients_dropped')
+publish_time = registry.histogram('feed.publish_s')
+
+
+def encode(sequence, sent, name, power=None, cadence=None, speed=None, heart_rate=None, zone=None):
+    flags = 0
+    if power is not None:
+        flags |= FIELD_POWER
+        power = min(0xFFFF, max(0, round(power)))
+    if cadence is not None:
+        flags |= FIELD_CADENCE
+        cadence = min(0xFFFF, max(0, round(cadence * 10)))
+    if speed is not None:
+        flags |= FIELD_SPEED
+        speed = min(0xFFFF, max(0, round(speed * 100)))
+    if heart_rate is not None:
+        flags |= FIELD_HEART_RATE
+        heart_rate = min(0xFF, max(0, round(heart_rate)))
+    if zone is not None:
+        flags |= FIELD_ZONE
+    return FRAME.pack(MAGIC, VERSION, flags, sequence & 0xFFFFFFFF, sent, power or 0, cadence or 0,
+                      speed or 0, heart_rate or 0, zone or 0, len(name)) + name
+
+
+# Trame -> FeedSample (champs absents à None) ; ValueError si la trame n'en est pas une
+def decode(data):
+    if len(data) < FRAME.size:
+        raise ValueError(f"trame trop courte ({len(data)} octets)")
+    magic, version, flags, sequence, sent, power, cadence, speed, heart_rate, zone, name_length = \
+        FRAME.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"trame inconnue : {bytes(data[:3])!r}")
+    name = bytes(data[FRAME.size:FRAME.size + name_length]).decode('utf-8', 'replace')
+    return FeedSample(name, sequence, sent,
+                      power if flags & FIELD_POWER else None,
+                      cadence / 10 if flags & FIELD_CADENCE else None,
+                      speed / 100 if flags & FIELD_SPEED else None,
+                      heart_rate if flags & FIELD_HEART_RATE else None,
+                      zone if flags & FIELD_ZONE else None)
+
+
+# Adresse "hôte:port" ou "port" (groupe par défaut)
+def parse_address(text, default_host=DEFAULT_FEED_GROUP):
+    host, _, port = text.rpartition(':')
+    return host or default_host, int(port)
+
+
+# En-tête d'un message WebSocket binaire non masqué (serveur -> client)
+def websocket_header(length):
+    if length < 126:
+        return bytes((0x82, length))
+    if length < 0x10000:
+        return struct.pack('!BBH', 0x82, 126, length)
+    return struct.pack('!BBQ', 0x82, 127, length)
+
+
+def websocket_accept(key):
+    return base64.b64encode(hashlib.sha1((key + WEBSOCKET_GUID).encode('ascii')).digest()).decode('ascii')
+
+
+# Nom et zone d'un cycliste diffusé (zone reçue par l'évènement 'color')
+class _Rider:
+    def __init__(self, name):
+        self.name = name.encode('utf-8')[:MAX_NAME]
+        self.zone = None
+
+    def set_zone(self, color, zone):
+        self.zone = zone
+
+
+# Abonné WebSocket : trames en attente quand la socket est pleine
+class _Client:
+    def __init__(self, sock, address):
+        self.sock = sock
+        self.address = address
+        self.pending = bytearray()
+        self.stalled_since = None
+        self.skipped = 0
+        self.received = bytearray()
+        self.closed = False
+
+
+# Attente de la requête d'ouverture WebSocket d'une connexion acceptée
+class _Handshake:
+    def __init__(self, sock, address):
+        self.sock = sock
+        self.address = address
+        self.request = bytearray()
+        self.started = time.monotonic()
+
+
+class SampleFeed:
+    def __init__(self, udp='', port=0, host='127.0.0.1', ttl=DEFAULT_FEED_TTL,
+                 max_pending=MAX_PENDING, drop_after=DROP_AFTER):
+        self.udp_address = parse_address(udp) if udp else None
+        self.port = port
+        self.host = host
+        self.ttl = ttl
+        self.max_pending = max_pending
+        self.drop_after = drop_after
+        self.udp_socket = None
+        self.server = None
+        self.selector = None
+        self.thread = None
+        self.running = False
+        # Les abonnés sont ajoutés par le thread du serveur et lus par le thread Bluetooth sans verrou
+        self.clients = ()
+        self.lock = threading.Lock()
+        # Tenu par publish() pendant les envois : une socket n'est fermée qu'une fois hors
+        # de portée de tout envoi (voir forget)
+        self.send_lock = threading.Lock()
+        self.sequence = 0
+        self.published = 0
+        self.udp_skipped = 0
+        self.skipped = 0
+        self.dropped = 0
+        self.accepted = 0
+
+    # Une erreur (port déjà utilisé...) ferme ce qui a déjà été ouvert avant d'être propagée
+    def start(self):
+        try:
+            if self.udp_address is not None:
+                self.udp_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+                self.udp_socket.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, self.ttl)
+                self.udp_socket.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_LOOP, 1)
+                self.udp_socket.setblocking(False)
+                logging.info(f"Diffusion des échantillons en UDP sur {self.udp_address[0]}:{self.udp_address[1]}")
+            if self.port:
+                self.server = socket.create_server((self.host, self.port))
+                self.server.setblocking(False)
+                self.port = self.server.getsockname()[1]
+                self.selector = selectors.DefaultSelector()
+                self.selector.register(self.server, selectors.EVENT_READ)
+                self.running = True
+                self.thread = threading.Thread(target=self.serve, name='SampleFeed', daemon=True)
+                self.thread.start()
+                logging.info(f"Diffusion des échantillons sur ws://{self.host}:{self.port}/")
+        except OSError:
+            self.close()
+            raise
+        return self
+
+    # Diffuse les échantillons d'un pipeline (un appel par cycliste)
+    def attach(self, pipeline):
+        rider = _Rider(pipeline.name)
+        pipeline.subscribe('color', rider.set_zone)
+        pipeline.subscribe('sample', lambda sample: self.publish(rider.name, sample.power, sample.cadence,
+                                                                 sample.speed, sample.heart_rate, rider.zone))
+
+    # Appelé depuis le thread Bluetooth : ne bloque jamais
+    def publish(self, name, power=None, cadence=None, speed=None, heart_rate=None, zone=None):
+        start = time.perf_counter()
+        self.sequence += 1
+        frame = encode(self.sequence, time.time(), name, power, cadence, speed, heart_rate, zone)
+        if self.udp_socket is not None:
+            try:
+                self.udp_socket.sendto(frame, self.udp_address)
+            except (BlockingIOError, InterruptedError):
+                self.udp_skipped += 1
+                skipped_frames.inc()
+            except OSError:
+                self.udp_skipped += 1
+                skipped_frames.inc()
+                logging.warning("Envoi UDP des échantillons impossible", exc_info=True)
+        if self.clients:
+            message = websocket_header(len(frame)) + frame
+            with self.send_lock:
+                for client in self.clients:
+                    self.send(client, message, start)
+        self.published += 1
+        published_frames.inc()
+        publish_time.observe(time.perf_counter() - start)
+
+    def send(self, client, message, now):
+        try:
+            if client.pending:
+                sent = client.sock.send(client.pending)
+                del client.pending[:sent]
+            if not client.pending:
+                sent = client.sock.send(message)
+                if sent < len(message):
+                    client.pending += message[sent:]
+                client.stalled_since = None
+                return
+        except (BlockingIOError, InterruptedError):
+            pass
+        except OSError:
+            self.remove(client)
+            return
+        # Abonné en retard : la trame attend si la place le permet, sinon elle est sautée
+        if len(client.pending) + len(message) <= self.max_pending:
+            client.pending += message
+            return
+        client.skipped += 1
+        self.skipped += 1
+        skipped_frames.inc()
+        if client.stalled_since is None:
+            client.stalled_since = now
+        elif now - client.stalled_since > self.drop_after:
+            logging.warning(f"Abonné {client.address[0]}:{client.address[1]} trop lent, déconnecté "
+                            f"({client.skipped} trames sautées)")
+            self.dropped += 1
+            dropped_clients.inc()
+            self.remove(client)
+
+    # Côté thread Bluetooth : l'abonné est retiré et sa connexion coupée, le thread du serveur
+    # la ferme en voyant la fin de connexion
+    def remove(self, client):
+        with self.lock:
+            if client.closed:
+                return
+            client.closed = True
+            self.clients = tuple(other for other in self.clients if other is not client)
+        try:
+            client.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+    # Côté thread du serveur : l'abonné est retiré de la liste, puis sa socket est fermée quand
+    # aucun envoi en cours ne peut plus l'utiliser (sinon un descripteur réutilisé par une
+    # nouvelle connexion pourrait recevoir ses trames)
+    def forget(self, client):
+        with self.lock:
+            client.closed = True
+            self.clients = tuple(other for other in self.clients if other is not client)
+        self.selector.unregister(client.sock)
+        with self.send_lock:
+            client.sock.close()
+
+    # Thread du serveur WebSocket : connexions, requêtes d'ouverture et fermetures des abonnés
+    def serve(self):
+        while self.running:
+            for key, _ in self.selector.select(timeout=0.5):
+                if key.fileobj is self.server:
+                    self.accept()
+                elif isinstance(key.data, _Handshake):
+                    self.read_handshake(key.data)
+                else:
+                    self.read_client(key.data)
+            # Connexions qui n'ont pas envoyé leur requête d'ouverture à temps
+            now = time.monotonic()
+            for key in list(self.selector.get_map().values()):
+                if isinstance(key.data, _Handshake) and now - key.data.started > HANDSHAKE_TIMEOUT:
+                    self.selector.unregister(key.fileobj)
+                    key.fileobj.close()
+
+    def accept(self):
+        try:
+            sock, address = self.server.accept()
+        except (BlockingIOError, InterruptedError):
+            return
+        sock.setblocking(False)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.selector.register(sock, selectors.EVENT_READ, _Handshake(sock, address))
+
+    def read_handshake(self, handshake):
+        try:
+            data = handshake.sock.recv(4096)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            data = b''
+        handshake.request += data
+        if data and b'\r\n\r\n' not in handshake.request and len(handshake.request) < MAX_HANDSHAKE:
+            return
+        self.selector.unregister(handshake.sock)
+        key = None
+        for line in bytes(handshake.request).decode('latin-1').split('\r\n')[1:]:
+            name, _, value = line.partition(':')
+            if name.strip().lower() == 'sec-websocket-key':
+                key = value.strip()
+        if not data or key is None:
+            handshake.sock.close()
+            return
+        response = ('HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n'
+                    f'Sec-WebSocket-Accept: {websocket_accept(key)}\r\n\r\n').encode('ascii')
+        try:
+            handshake.sock.send(response)
+        except OSError:
+            handshake.sock.close()
+            return
+        client = _Client(handshake.sock, handshake.address)
+        self.selector.register(client.sock, selectors.EVENT_READ, client)
+        with self.lock:
+            self.clients = self.clients + (client,)
+        self.accepted += 1
+        logging.info(f"Abonné {client.address[0]}:{client.address[1]} connecté à la diffusion des échantillons")
+
+    # Les messages des abonnés sont ignorés ; une trame de fermeture ou la fin de la connexion le retire
+    def read_client(self, client):
+        try:
+            data = client.sock.recv(4096)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            data = b''
+        if not data:
+            if not client.closed:
+                logging.info(f"Abonné {client.address[0]}:{client.address[1]} déconnecté")
+            self.forget(client)
+            return
+        client.received += data
+        while len(client.received) >= 2:
+            if client.received[0] & 0x0F == 0x8 or len(client.received) > MAX_PENDING:
+                logging.info(f"Abonné {client.address[0]}:{client.address[1]} déconnecté")
+                self.forget(client)
+                return
+            # En-tête de 2 à 14 octets, charge masquée par le client
+            length = client.received[1] & 0x7F
+            offset = 2
+            if length == 126:
+                if len(client.received) < 4:
+                    return
+                length, offset = struct.unpack_from('!H', client.received, 2)[0], 4
+            elif length == 127:
+                if len(client.received) < 10:
+                    return
+                length, offset = struct.unpack_from('!Q', client.received, 2)[0], 10
+            if client.received[1] & 0x80:
+                offset += 4
+            if len(client.received) < offset + length:
+                return
+            del client.received[:offset + length]
+
+    def close(self):
+        self.running = False
+        if self.thread is not None:
+            self.thread.join(timeout=2)
+        with self.lock:
+            self.clients = ()
+        if self.selector is not None:
+            with self.send_lock:
+                for key in list(self.selector.get_map().values()):
+                    if key.fileobj is not self.server:
+                        key.fileobj.close()
+            self.selector.close()
+        if self.server is not None:
+            self.server.close()
+        if self.udp_socket is not None:
+            self.udp_socket.close()
+
+    def stats(self):
+        return {
+            'published': self.published,
+            'clients': len(self.clients),
+            'accepted': self.accepted,
+            'skipped': self.skipped,
+            'udp_skipped': self.udp_skipped,
+            'dropped_clients': self.dropped,
+        }
@@ -0,0 +1,156 @@
+import csv
+import struct
+from session_recorder import iter_samples
+
+# Export d'un enregistrement de sortie en CSV et en FIT. Les deux exports lisent le journal
+# en flux et écrivent au fur et à mesure : la mémoire utilisée ne dépend pas de la durée.
+
+
+def export_csv(log_path, csv_path):
+    count = 0
+    with open(csv_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['time', 'source', 'power', 'cadence', 'speed', 'heart_rate'])
+        for timestamp, source, power, cadence, speed, heart_rate in iter_samples(log_path):
+            writer.writerow([f'{timestamp:.3f}', source, _csv(power), _csv(cadence), _csv(speed), _csv(heart_rate)])
+            count += 1
+    return count
+
+
+def _csv(value):
+    return '' if value is None else f'{value:g}'
+
+
+# --- FIT ---
+
+FIT_EPOCH = 631065600  # 31/12/1989 00:00:00 UTC en secondes Unix
+
+# CRC-16 du format FIT (polynôme 0xA001), calculé octet par octet avec une table
+_CRC_TABLE = []
+for _byte in range(256):
+    _crc = _byte
+    for _ in range(8):
+        _crc = (_crc >> 1) ^ 0xA001 if _crc & 1 else _crc >> 1
+    _CRC_TABLE.append(_crc)
+
+
+def fit_crc(data, crc=0):
+    for byte in data:
+        crc = (crc >> 8) ^ _CRC_TABLE[(crc ^ byte) & 0xFF]
+    return crc
+
+
+# Messages FIT utilisés : (numéro de message local, numéro global, champs (numéro, format struct, type de base))
+FILE_ID = (0, 0, ((0, 'B', 0x00), (1, 'H', 0x84), (2, 'H', 0x84), (4, 'I', 0x86)))
+RECORD = (1, 20, ((253, 'I', 0x86), (7, 'H', 0x84), (4, 'B', 0x02), (6, 'H', 0x84), (3, 'B', 0x02)))
+LAP = (2, 19, ((253, 'I', 0x86), (2, 'I', 0x86), (7, 'I', 0x86), (8, 'I', 0x86)))
+SESSION = (3, 18, ((253, 'I', 0x86), (2, 'I', 0x86), (7, 'I', 0x86), (8, 'I', 0x86), (5, 'B', 0x00),
+                   (6, 'B', 0x00), (20, 'H', 0x84), (21, 'H', 0x84)))
+ACTIVITY = (4, 34, ((253, 'I', 0x86), (0, 'I', 0x86), (1, 'H', 0x84), (2, 'B', 0x00), (3, 'B', 0x00),
+                    (4, 'B', 0x00)))
+
+INVALID_UINT8 = 0xFF
+INVALID_UINT16 = 0xFFFF
+
+
+class FitWriter:
+    def __init__(self, f):
+        self.f = f
+        self.size = 0
+        self.structs = {}
+        # En-tête provisoire : la taille des données est réécrite à la fin
+        f.write(b'\x00' * 14)
+
+    def write(self, data):
+        self.f.write(data)
+        self.size += len(data)
+
+    def define(self, message):
+        local, global_number, fields = message
+        data = struct.pack('<BBBHB', 0x40 | local, 0, 0, global_number, len(fields))
+        for number, fmt, base_type in fields:
+            data += struct.pack('<BBB', number, struct.calcsize(fmt), base_type)
+        self.write(data)
+        self.structs[local] = struct.Struct('<B' + ''.join(fmt for _, fmt, _ in fields))
+
+    def message(self, message, *values):
+        local = message[0]
+        self.write(self.structs[local].pack(local, *values))
+
+    # Écrit l'en-tête définitif puis le CRC du fichier, calculé en relisant le fichier par blocs
+    def close(self):
+        header = struct.pack('<BBHI4s', 14, 0x20, 2132, self.size, b'.FIT')
+        self.f.seek(0)
+        self.f.write(header + struct.pack('<H', fit_crc(header)))
+        self.f.flush()
+        self.f.seek(0)
+        crc = 0
+        for block in iter(lambda: self.f.read(65536), b''):
+            crc = fit_crc(block, crc)
+        self.f.write(struct.pack('<H', crc))
+
+
+# Export FIT (activité vélo en intérieur) : un enregistrement par seconde avec la puissance
+# moyenne de la seconde et les dernières valeurs connues de cadence, vitesse et fréquence cardiaque
+def export_fit(log_path, fit_path):
+    count = 0
+    start = None
+    second = None
+    power_total = power_count = 0
+    max_power = 0
+    ride_power_total = ride_power_count = 0
+    last = {'cadence': None, 'speed': None, 'heart_rate': None}
+
+    with open(fit_path, 'w+b') as f:
+        fit = FitWriter(f)
+
+        def write_record():
+            nonlocal count
+            power = _fit(power_total / power_count if power_count else None, 1, INVALID_UINT16)
+            fit.message(RECORD, second - FIT_EPOCH, power,
+                        _fit(last['cadence'], 1, INVALID_UINT8), _fit(last['speed'], 1000 / 3.6, INVALID_UINT16),
+                        _fit(last['heart_rate'], 1, INVALID_UINT8))
+            count += 1
+
+        for timestamp, source, power, cadence, speed, heart_rate in iter_samples(log_path):
+            current = int(timestamp)
+            if start is None:
+                start = current
+                fit.define(FILE_ID)
+                fit.message(FILE_ID, 4, 255, 0, start - FIT_EPOCH)
+                fit.define(RECORD)
+            elif current != second:
+                write_record()
+                power_total = power_count = 0
+            second = current
+            if power is not None:
+                power_total += power
+                power_count += 1
+                ride_power_total += power
+                ride_power_count += 1
+                max_power = max(max_power, power)
+            for name, value in (('cadence', cadence), ('speed', speed), ('heart_rate', heart_rate)):
+                if value is not None:
+                    last[name] = value
+
+        if start is not None:
+            write_record()
+            end = second - FIT_EPOCH
+            elapsed = (second - start) * 1000
+            average_power = _fit(ride_power_total / ride_power_count if ride_power_count else None, 1, INVALID_UINT16)
+            fit.define(LAP)
+            fit.message(LAP, end, start - FIT_EPOCH, elapsed, elapsed)
+            fit.define(SESSION)
+            # Sport 2 : vélo, sous-sport 6 : home trainer
+            fit.message(SESSION, end, start - FIT_EPOCH, elapsed, elapsed, 2, 6, average_power, _fit(max_power, 1, INVALID_UINT16))
+            fit.define(ACTIVITY)
+            # Type 0 : manuel, évènement 26 : activité, type d'évènement 1 : arrêt
+            fit.message(ACTIVITY, end, elapsed, 1, 0, 26, 1)
+        fit.close()
+    return count
+
+
+def _fit(value, scale, invalid):
+    if value is None:
+        return invalid
+    return max(0, min(invalid - 1, round(value * scale)))
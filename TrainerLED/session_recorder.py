@@ -0,0 +1,160 @@
+import math
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+import logging
+from datetime import datetime
+
+# Enregistrement d'une sortie dans un journal binaire en ajout seul.
+# Fichier : en-tête MAGIC puis une suite d'enregistrements
+#   type (uint8), taille du contenu (uint16), heure (float64, secondes Unix), contenu, CRC32
+# Un enregistrement tronqué ou corrompu (arrêt brutal) marque simplement la fin du journal.
+
+MAGIC = b'TLEDLOG1'
+RECORD_HEADER = struct.Struct('<BHd')
+RECORD_CRC = struct.Struct('<I')
+
+RECORD_CHANNEL = 1  # canal (uint8) + "profil|caractéristique|adresse"
+RECORD_PACKET = 2   # canal (uint8) + notification brute
+RECORD_SAMPLE = 3   # canal (uint8) + puissance, cadence, vitesse, fréquence cardiaque (float32, NaN si absent)
+
+SAMPLE = struct.Struct('<Bffff')
+NAN = float('nan')
+
+
+def pack_record(record_type, timestamp, payload):
+    header = RECORD_HEADER.pack(record_type, len(payload), timestamp)
+    return header + payload + RECORD_CRC.pack(zlib.crc32(payload, zlib.crc32(header)))
+
+
+def _value(value):
+    return NAN if value is None else value
+
+
+# Écriture en tâche de fond : les appels depuis la boucle BLE ne font qu'ajouter des octets
+# à un tampon, un thread dédié écrit sur disque toutes les `flush_interval` secondes
+# et force l'écriture physique (fsync) toutes les `sync_interval` secondes.
+class SessionRecorder:
+    def __init__(self, path, flush_interval=1.0, sync_interval=5.0):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.sync_interval = sync_interval
+        self.file = open(path, 'ab')
+        if self.file.tell() == 0:
+            self.file.write(MAGIC)
+        self.buffer = []
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.channels = {}
+        self.bytes_written = 0
+        self.thread = threading.Thread(target=self.run, name='SessionRecorder', daemon=True)
+        self.thread.start()
+
+    # Nouveau journal horodaté dans `directory`
+    @classmethod
+    def create(cls, directory, **kwargs):
+        os.makedirs(directory, exist_ok=True)
+        name = datetime.now().strftime('ride-%Y%m%d-%H%M%S.tled')
+        return cls(os.path.join(directory, name), **kwargs)
+
+    def append(self, record_type, payload, timestamp=None):
+        record = pack_record(record_type, time.time() if timestamp is None else timestamp, payload)
+        with self.lock:
+            self.buffer.append(record)
+
+    # Numéro de canal d'une source, déclaré dans le journal à sa première utilisation
+    def channel(self, source, address=''):
+        channel = self.channels.get(id(source))
+        if channel is None:
+            channel = self.channels[id(source)] = len(self.channels)
+            description = f"{source.profile}|{source.characteristic_uuid}|{address}"
+            self.append(RECORD_CHANNEL, bytes([channel]) + description.encode('utf-8'))
+        return channel
+
+    def record_packet(self, source, data):
+        self.append(RECORD_PACKET, bytes([self.channel(source)]) + bytes(data))
+
+    def record_sample(self, source, sample):
+        self.append(RECORD_SAMPLE, SAMPLE.pack(self.channel(source), _value(sample.power), _value(sample.cadence),
+                                               _value(sample.speed), _value(sample.heart_rate)))
+
+    def flush(self, sync=False):
+        with self.lock:
+            records, self.buffer = self.buffer, []
+        if records:
+            data = b''.join(records)
+            self.file.write(data)
+            self.bytes_written += len(data)
+        self.file.flush()
+        if sync:
+            os.fsync(self.file.fileno())
+
+    def run(self):
+        last_sync = time.monotonic()
+        while not self.stop_event.wait(self.flush_interval):
+            try:
+                sync = time.monotonic() - last_sync >= self.sync_interval
+                self.flush(sync)
+                if sync:
+                    last_sync = time.monotonic()
+            except OSError:
+                logging.error("Erreur lors de l'écriture de l'enregistrement de la sortie", exc_info=True)
+
+    def close(self):
+        self.stop_event.set()
+        self.thread.join()
+        try:
+            self.flush(sync=True)
+        finally:
+            self.file.close()
+
+
+# Parcourt les enregistrements d'un journal via mmap, sans le charger en mémoire.
+# Renvoie des tuples (type, heure, contenu) et s'arrête au premier enregistrement incomplet.
+def iter_records(path):
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size <= len(MAGIC):
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            if data[:len(MAGIC)] != MAGIC:
+                raise ValueError(f"{path} n'est pas un enregistrement TrainerLED")
+            offset = len(MAGIC)
+            end = len(data)
+            while offset + RECORD_HEADER.size + RECORD_CRC.size <= end:
+                record_type, size, timestamp = RECORD_HEADER.unpack_from(data, offset)
+                payload_start = offset + RECORD_HEADER.size
+                payload_end = payload_start + size
+                if payload_end + RECORD_CRC.size > end:
+                    break
+                payload = data[payload_start:payload_end]
+                crc = RECORD_CRC.unpack_from(data, payload_end)[0]
+                if crc != zlib.crc32(payload, zlib.crc32(data[offset:payload_start])):
+                    logging.warning(f"Enregistrement corrompu à l'octet {offset} de {path}, fin de lecture")
+                    break
+                yield record_type, timestamp, payload
+                offset = payload_end + RECORD_CRC.size
+
+
+# Notifications brutes : (heure, profil, caractéristique, adresse, données)
+def iter_packets(path):
+    channels = {}
+    for record_type, timestamp, payload in iter_records(path):
+        if record_type == RECORD_CHANNEL:
+            channels[payload[0]] = payload[1:].decode('utf-8').split('|')
+        elif record_type == RECORD_PACKET:
+            profile, characteristic, address = channels[payload[0]]
+            yield timestamp, profile, characteristic, address, payload[1:]
+
+
+# Échantillons décodés : (heure, profil, puissance, cadence, vitesse, fréquence cardiaque)
+def iter_samples(path):
+    channels = {}
+    for record_type, timestamp, payload in iter_records(path):
+        if record_type == RECORD_CHANNEL:
+            channels[payload[0]] = payload[1:].decode('utf-8').split('|')[0]
+        elif record_type == RECORD_SAMPLE:
+            channel, *values = SAMPLE.unpack(payload)
+            yield (timestamp, channels.get(channel, '')) + tuple(None if math.isnan(v) else v for v in values)
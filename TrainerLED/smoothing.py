@@ -0,0 +1,123 @@
+import math
+from bisect import bisect_left, insort
+from collections import deque
+
+# Filtres de lissage de la puissance. Chaque filtre reçoit un échantillon et son horodatage
+# (secondes, time.monotonic) et renvoie la valeur lissée dès le premier échantillon.
+
+
+# Moyenne glissante sur les `size` derniers échantillons (somme courante, O(1))
+class MovingAverage:
+    def __init__(self, size=10):
+        self.size = size
+        self.values = deque()
+        self.total = 0.0
+
+    def reset(self):
+        self.values.clear()
+        self.total = 0.0
+
+    def update(self, value, now):
+        self.values.append(value)
+        self.total += value
+        if len(self.values) > self.size:
+            self.total -= self.values.popleft()
+        return self.total / len(self.values)
+
+
+# Moyenne sur une fenêtre de temps (par exemple 3 s), indépendante de la fréquence des notifications
+class TimeWindowAverage:
+    def __init__(self, seconds=3.0):
+        self.seconds = seconds
+        self.samples = deque()
+        self.total = 0.0
+
+    def reset(self):
+        self.samples.clear()
+        self.total = 0.0
+
+    def update(self, value, now):
+        self.samples.append((now, value))
+        self.total += value
+        while now - self.samples[0][0] > self.seconds:
+            self.total -= self.samples.popleft()[1]
+        return self.total / len(self.samples)
+
+
+# Moyenne exponentielle avec une constante de temps en secondes
+class ExponentialMovingAverage:
+    def __init__(self, time_constant=1.0):
+        self.time_constant = time_constant
+        self.value = None
+        self.last_time = None
+
+    def reset(self):
+        self.value = None
+        self.last_time = None
+
+    def update(self, value, now):
+        if self.value is None or self.time_constant <= 0:
+            self.value = value
+        else:
+            alpha = 1 - math.exp(-max(now - self.last_time, 0.0) / self.time_constant)
+            self.value += alpha * (value - self.value)
+        self.last_time = now
+        return self.value
+
+
+# Médiane glissante : élimine les pics isolés envoyés par certains home trainers
+class MedianFilter:
+    def __init__(self, size=5):
+        self.size = size
+        self.values = deque()
+        self.sorted_values = []
+
+    def reset(self):
+        self.values.clear()
+        self.sorted_values = []
+
+    def update(self, value, now):
+        self.values.append(value)
+        insort(self.sorted_values, value)
+        if len(self.values) > self.size:
+            del self.sorted_values[bisect_left(self.sorted_values, self.values.popleft())]
+        count = len(self.sorted_values)
+        middle = count // 2
+        if count % 2:
+            return self.sorted_values[middle]
+        return (self.sorted_values[middle - 1] + self.sorted_values[middle]) / 2
+
+
+# Enchaînement de filtres, par exemple une médiane suivie d'une moyenne
+class FilterChain:
+    def __init__(self, filters):
+        self.filters = filters
+
+    def reset(self):
+        for smoothing_filter in self.filters:
+            smoothing_filter.reset()
+
+    def update(self, value, now):
+        for smoothing_filter in self.filters:
+            value = smoothing_filter.update(value, now)
+        return value
+
+
+FILTERS = {
+    'sma': lambda arg: MovingAverage(int(arg or 10)),
+    'window': lambda arg: TimeWindowAverage(float(arg or 3)),
+    'ema': lambda arg: ExponentialMovingAverage(float(arg or 1)),
+    'median': lambda arg: MedianFilter(int(arg or 5)),
+}
+
+
+# Construit un filtre depuis la configuration : "sma:10", "window:3", "ema:1.5", "median:5",
+# ou plusieurs filtres séparés par ">" (par exemple "median:5>window:3")
+def make_filter(spec):
+    filters = []
+    for part in spec.split('>'):
+        name, _, arg = part.strip().partition(':')
+        if name not in FILTERS:
+            raise ValueError(f"Filtre de lissage inconnu : {name}")
+        filters.append(FILTERS[name](arg))
+    return filters[0] if len(filters) == 1 else FilterChain(filters)
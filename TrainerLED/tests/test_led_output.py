@@ -0,0 +1,81 @@
+import time
+import unittest
+
+from fake_openrgb_server import REQUEST_CONTROLLER_COUNT, REQUEST_CONTROLLER_DATA, FakeDevice, FakeOpenRGBServer
+from led_output import LedOutputService
+from led_renderer import LedRenderWorker
+
+# Sortie LED face au faux serveur OpenRGB : liste des périphériques gardée entre les écritures,
+# reconnexion et renvoi des couleurs après un redémarrage du serveur.
+# Lancer depuis le dossier TrainerLED : python -m unittest discover tests
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return condition()
+
+
+class LedOutputTest(unittest.TestCase):
+    def setUp(self):
+        self.server = FakeOpenRGBServer(devices=[FakeDevice('A'), FakeDevice('B')]).start()
+        self.output = LedOutputService(port=self.server.port, min_backoff=0.05)
+
+    def tearDown(self):
+        self.output.close()
+        self.server.stop()
+
+    def requests(self, packet_type):
+        with self.server.lock:
+            return sum(1 for frame in self.server.frames if frame.packet_type == packet_type)
+
+    def device_colors(self):
+        with self.server.lock:
+            return [set(device.colors) for device in self.server.devices]
+
+    def test_device_list_cached_between_writes(self):
+        self.assertTrue(self.output.set_colors({None: (255, 0, 0)}))
+        count_requests = self.requests(REQUEST_CONTROLLER_COUNT)
+        data_requests = self.requests(REQUEST_CONTROLLER_DATA)
+        for value in range(50):
+            self.assertTrue(self.output.set_colors({None: (value, 0, 0)}))
+        self.assertTrue(wait_for(lambda: self.device_colors() == [{(49, 0, 0)}] * 2))
+        self.assertEqual(self.requests(REQUEST_CONTROLLER_COUNT), count_requests)
+        self.assertEqual(self.requests(REQUEST_CONTROLLER_DATA), data_requests)
+        self.assertEqual(self.server.connection_count, 1)
+        self.assertEqual(self.output.connect_count, 1)
+
+    def test_reconnects_after_server_restart(self):
+        self.assertTrue(self.output.set_colors({None: (255, 0, 0)}))
+        self.server.restart()
+        # La première écriture découvre la connexion perdue, les suivantes se reconnectent
+        self.assertTrue(wait_for(lambda: self.output.set_colors({None: (0, 255, 0)})))
+        self.assertTrue(wait_for(lambda: self.device_colors() == [{(0, 255, 0)}] * 2))
+        self.assertEqual(self.output.connect_count, 2)
+        self.assertEqual(self.server.connection_count, 2)
+
+    def test_renderer_resends_every_channel_after_server_restart(self):
+        self.output.configure_groups({'x': [{'device': 'A'}], 'y': [{'device': 'B'}]})
+        renderer = LedRenderWorker(self.output, steps=1)
+        renderer.start()
+        try:
+            renderer.submit(255, 0, 0, channel='x')
+            renderer.submit(0, 255, 0, channel='y')
+            self.assertTrue(wait_for(lambda: self.device_colors() == [{(255, 0, 0)}, {(0, 255, 0)}]))
+            self.server.restart()
+            with self.server.lock:
+                for device in self.server.devices:
+                    device.colors = [(0, 0, 0)] * device.num_leds
+            # Seul le canal x change : le canal y est renvoyé à la nouvelle connexion
+            renderer.submit(0, 0, 255, channel='x')
+            self.assertTrue(wait_for(lambda: self.device_colors() == [{(0, 0, 255)}, {(0, 255, 0)}]))
+            self.assertEqual(self.output.connect_count, 2)
+            self.assertFalse(renderer.unsent)
+        finally:
+            renderer.stop()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import unittest
+
+from config_store import ConfigStore
+from fake_openrgb_server import FakeDevice, FakeOpenRGBServer
+from input_sources import synthetic_power_packets
+from session_recorder import iter_packets
+from led_output import LedOutputService
+from led_renderer import LedRenderWorker
+from trainer_pipeline import DEFAULT_ZONE_COLORS, DEFAULT_ZONE_THRESHOLDS, TrainerPipeline, create_supervisors, main as run_supervisors
+from tests.test_led_output import wait_for
+
+# Rejeu d'un fichier de notifications par ReplayBleClient, comme avec "replay_file" dans
+# config.json : chaque paquet passe par handle_notification jusqu'aux changements de zone
+# et aux LED du faux serveur OpenRGB.
+
+class ReplayTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.replay_file = os.path.join(self.folder.name, 'replay.json')
+        config_file = os.path.join(self.folder.name, 'config.json')
+        with open(config_file, 'w', encoding='utf-8') as f:
+            json.dump({'thresholds': DEFAULT_ZONE_THRESHOLDS, 'colors': DEFAULT_ZONE_COLORS,
+                       'hysteresis_watts': 0, 'hysteresis_dwell': 0,
+                       'smoothing': {'led': 'sma:1', 'label': 'sma:1'},
+                       'replay_file': self.replay_file, 'recording_enabled': False}, f)
+        self.server = FakeOpenRGBServer(devices=[FakeDevice('A')]).start()
+        self.output = LedOutputService(port=self.server.port)
+        self.renderer = LedRenderWorker(self.output, steps=1)
+        self.renderer.start()
+        self.config_store = ConfigStore(config_file)
+        self.pipeline = TrainerPipeline(self.config_store, self.output, self.renderer)
+
+    def tearDown(self):
+        self.renderer.stop()
+        self.output.close()
+        self.server.stop()
+        self.config_store.close()
+        self.folder.cleanup()
+
+    def write_replay(self, packets):
+        with open(self.replay_file, 'w', encoding='utf-8') as f:
+            json.dump({'packets': packets}, f)
+
+    def replay(self, seconds, supervisors=None):
+        if supervisors is None:
+            supervisors = create_supervisors(self.pipeline, self.pipeline.device_sources('TRAINER'),
+                                             self.pipeline.client_factory())
+
+        async def stop_later():
+            await asyncio.sleep(seconds)
+            for supervisor in supervisors:
+                supervisor.stop()
+
+        async def run():
+            await asyncio.gather(run_supervisors(supervisors), stop_later())
+
+        asyncio.run(run())
+
+    def test_replay_drives_zone_changes(self):
+        samples = []
+        zones = []
+        self.pipeline.subscribe('sample', samples.append)
+        self.pipeline.subscribe('color', lambda color, zone: zones.append((zone, color)))
+        self.write_replay(synthetic_power_packets(6, 50, [50, 160, 250], change_every=2))
+        self.replay(0.5)
+
+        self.assertGreaterEqual(len(samples), 6)
+        self.assertEqual([sample.power for sample in samples[:6]], [50, 50, 160, 160, 250, 250])
+        # Une seule notification par changement de zone ; le fichier rejoué en boucle revient en zone 1
+        self.assertEqual([zone for zone, _ in zones[:4]], [1, 3, 6, 1])
+        self.assertEqual([color for _, color in zones[:3]], [DEFAULT_ZONE_COLORS[i] for i in (0, 2, 5)])
+        last = zones[-1][1]
+        self.assertTrue(wait_for(lambda: set(self.server.devices[0].colors) == {last}))
+
+    def test_looping_single_packet_replay_can_be_stopped(self):
+        samples = []
+        self.pipeline.subscribe('sample', samples.append)
+        self.write_replay(synthetic_power_packets(1, 0, [200]))
+        # Rejeu en boucle d'un seul paquet : la boucle asyncio doit rester libre pour l'arrêt
+        thread = threading.Thread(target=self.replay, args=(0.5,), daemon=True)
+        thread.start()
+        thread.join(5.0)
+        self.assertFalse(thread.is_alive())
+        self.assertGreaterEqual(len(samples), 1)
+        self.assertLessEqual(len(samples), 4)
+
+    def test_recording_keeps_device_address(self):
+        self.pipeline.recording_enabled = True
+        self.pipeline.recording_dir = os.path.join(self.folder.name, 'sessions')
+        self.write_replay(synthetic_power_packets(3, 50, [150]))
+        self.replay(0.3, self.pipeline.start_session('TRAINER'))
+        path = self.pipeline.recorder.path
+        self.pipeline.stop_recording(wait=True)
+        packets = list(iter_packets(path))
+        self.assertGreaterEqual(len(packets), 3)
+        self.assertEqual({(profile, address) for _, profile, _, address, _ in packets}, {('cycling_power', 'TRAINER')})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,251 @@
+import argparse
+import asyncio
+import json
+import logging
+import signal
+import sys
+from functools import partial
+from ble_discovery import GattCache
+from config_store import ConfigStore
+from led_effects import EFFECTS
+from led_output import OPENRGB_HOST, OPENRGB_PORT, LedOutputService
+from led_renderer import LedRenderWorker
+from log_setup import setup_logging
+from metrics import registry, serve as serve_metrics
+from sample_feed import SampleFeed
+from trainer_pipeline import configure_led_groups, create_riders, main as run_supervisors
+
+# Mode sans interface pour les PC sans écran : le même pipeline que l'interface graphique
+# (Bluetooth -> zones -> LED, enregistrement de la sortie), sans Qt ni matplotlib.
+# Les réglages viennent de config.json ; les options de la ligne de commande les remplacent
+# pour cette exécution seulement, config.json n'est jamais modifié.
+#   python trainer_daemon.py --device XX:XX:XX:XX:XX:XX --profile Alice --led-target "Bande LED/0" --record sessions
+# Plusieurs cyclistes dans le même processus (en plus des "riders" de config.json) :
+#   python trainer_daemon.py --device XX:XX:XX:XX:XX:XX --led-target "Bande LED" \
+#       --rider "name=Bob,device=YY:YY:YY:YY:YY:YY,profile=Bob,led=Clavier+Souris"
+# Comme dans l'interface, les zones et le profil actif modifiés dans config.json par un autre
+# programme sont rechargés en cours de route (sauf le profil imposé par --profile).
+
+# Intervalle de vérification des modifications de config.json (secondes)
+CONFIG_RELOAD_INTERVAL = 1.0
+
+
+# Cible LED "périphérique" ou "périphérique/zone", noms ou indices OpenRGB
+def led_target(text):
+    device, _, zone = text.partition('/')
+    spec = {'device': int(device) if device.isdigit() else device}
+    if zone:
+        spec['zone'] = int(zone) if zone.isdigit() else zone
+    return spec
+
+
+# Serveur OpenRGB "HÔTE:PORT" ou "HÔTE" (port par défaut d'OpenRGB) : (hôte, port)
+def openrgb_server(text):
+    host, separator, port = text.rpartition(':')
+    if not separator:
+        host, port = text, str(OPENRGB_PORT)
+    if not port.isdigit() or not 0 < int(port) < 65536:
+        raise argparse.ArgumentTypeError(f"port OpenRGB invalide : {text!r}")
+    return host or OPENRGB_HOST, int(port)
+
+
+# Cycliste supplémentaire "name=Bob,device=...,profile=...,led=cible+cible,replay=fichier"
+def rider(text):
+    spec = {}
+    for item in text.split(','):
+        key, separator, value = item.partition('=')
+        key = key.strip()
+        if not separator or key not in ('name', 'device', 'profile', 'led', 'replay'):
+            raise argparse.ArgumentTypeError(f"option de cycliste invalide : {item!r}")
+        if key == 'led':
+            spec['led_targets'] = [led_target(target) for target in value.split('+') if target]
+        elif key == 'replay':
+            spec['replay_file'] = value
+        else:
+            spec[key] = value
+    if not spec.get('name'):
+        raise argparse.ArgumentTypeError("le cycliste doit avoir un nom (name=...)")
+    return spec
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="TrainerLED sans interface graphique")
+    parser.add_argument('--device', help="adresse Bluetooth du home trainer (default_device de la configuration par défaut)")
+    parser.add_argument('--profile', help="profil de zones nommé (zone_profiles), '' pour les zones personnalisées")
+    parser.add_argument('--led-target', type=led_target, action='append', metavar='PÉRIPHÉRIQUE[/ZONE]',
+                        help="cible OpenRGB, à répéter pour plusieurs cibles (led_targets de la configuration par défaut)")
+    parser.add_argument('--rider', type=rider, action='append', default=[],
+                        metavar='name=NOM,device=ADRESSE,profile=PROFIL,led=CIBLE+CIBLE',
+                        help="cycliste supplémentaire, à répéter (s'ajoute aux riders de la configuration)")
+    parser.add_argument('--led-effect', choices=EFFECTS, help="effet des LED (led_effect de la configuration par défaut)")
+    parser.add_argument('--led-pulse', action='store_true', help="pouls des LED au-delà du dernier seuil")
+    parser.add_argument('--record', metavar='DOSSIER', help="enregistre la sortie dans ce dossier")
+    parser.add_argument('--no-record', action='store_true', help="n'enregistre pas la sortie")
+    parser.add_argument('--summary', metavar='FICHIER',
+                        help="écrit le résumé de la sortie de chaque cycliste (NP, IF, TSS, temps en zone...) en JSON")
+    parser.add_argument('--replay', metavar='FICHIER', help="rejoue un enregistrement au lieu de se connecter au matériel")
+    parser.add_argument('--duration', type=float, help="s'arrête après ce nombre de secondes")
+    parser.add_argument('--config', default='config.json', help="fichier de configuration (config.json par défaut)")
+    parser.add_argument('--gatt-cache', default='gatt_cache.json', help="cache des services Bluetooth")
+    parser.add_argument('--openrgb', type=openrgb_server, default=(OPENRGB_HOST, OPENRGB_PORT), metavar='HÔTE[:PORT]',
+                        help=f"serveur SDK OpenRGB ({OPENRGB_HOST}:{OPENRGB_PORT} par défaut)")
+    parser.add_argument('--metrics-port', type=int, help="port du serveur local de mesures (metrics_port par défaut)")
+    parser.add_argument('--feed-udp', metavar='GROUPE:PORT',
+                        help="diffuse les échantillons en UDP, par exemple 239.255.76.84:5084 (feed_udp par défaut)")
+    parser.add_argument('--feed-port', type=int, help="port de la diffusion WebSocket sur 127.0.0.1 (feed_port par défaut)")
+    parser.add_argument('--log-file', default='trainer_led.log', help="journal (trainer_led.log par défaut)")
+    parser.add_argument('--verbose', action='store_true', help="journalise aussi chaque changement de puissance")
+    return parser.parse_args(argv)
+
+
+# Applique les options de la ligne de commande au pipeline du cycliste principal, sans les enregistrer
+def apply_args(pipeline, args):
+    if args.profile is not None:
+        if args.profile not in pipeline.zone_profiles:
+            raise SystemExit(f"Profil de zones inconnu : {args.profile!r} "
+                             f"(disponibles : {', '.join(repr(name) for name in pipeline.zone_profiles)})")
+        pipeline.select_zone_profile(args.profile, save=False)
+    if args.led_target:
+        pipeline.led_targets = args.led_target
+    if args.led_effect:
+        pipeline.led_effect = args.led_effect
+    if args.led_pulse:
+        pipeline.led_pulse = True
+    if args.led_effect or args.led_pulse:
+        pipeline.led_renderer.configure_effect(pipeline.led_effect, pipeline.led_fps, pipeline.led_pulse)
+    if args.record:
+        pipeline.recording_enabled = True
+        pipeline.recording_dir = args.record
+    if args.no_record:
+        pipeline.recording_enabled = False
+    if args.replay:
+        pipeline.replay_file = args.replay
+    if args.metrics_port is not None:
+        pipeline.metrics_port = args.metrics_port
+    if args.feed_udp is not None:
+        pipeline.feed_udp = args.feed_udp
+    if args.feed_port is not None:
+        pipeline.feed_port = args.feed_port
+
+
+def log_connection_state(name, address, state, info):
+    logging.info(f"{name}Périphérique {address} : {state} {info or ''}".rstrip())
+
+
+def log_zone(name, color, zone):
+    logging.info(f"{name}Zone {zone}, couleur {color}")
+
+
+# Zones modifiées dans config.json par un autre programme, appliquées à tous les cyclistes
+def reload_config(config_store, riders, profile=None):
+    config = config_store.reload_if_changed()
+    if config is None:
+        return
+    if profile is not None:
+        config = dict(config, active_profile=profile)
+    for rider in riders:
+        rider.reload_zones(config)
+
+
+async def watch_config(reload):
+    while True:
+        await asyncio.sleep(CONFIG_RELOAD_INTERVAL)
+        reload()
+
+
+async def run(supervisors, duration=None, reload=None):
+    loop = asyncio.get_running_loop()
+
+    def stop():
+        for supervisor in supervisors:
+            supervisor.stop()
+
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(signum, stop)
+        except (NotImplementedError, AttributeError, ValueError):
+            pass  # Windows : Ctrl+C lève KeyboardInterrupt
+    if duration is not None:
+        loop.call_later(duration, stop)
+    watcher = asyncio.ensure_future(watch_config(reload)) if reload is not None else None
+    try:
+        await run_supervisors(supervisors)
+    finally:
+        if watcher is not None:
+            watcher.cancel()
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    setup_logging(args.log_file)
+
+    config_store = ConfigStore(args.config)
+    gatt_cache = GattCache(args.gatt_cache)
+    led_output = LedOutputService(*args.openrgb)
+    led_renderer = LedRenderWorker(led_output)
+    riders = create_riders(config_store, led_output, led_renderer, gatt_cache, extra=args.rider)
+    pipeline = riders[0]
+    apply_args(pipeline, args)
+    configure_led_groups(riders)
+
+    led_renderer.start()
+    supervisors = []
+    for rider in riders:
+        name = f"{rider.name} : " if rider.name else ''
+        rider.subscribe('connection_state', partial(log_connection_state, name))
+        rider.subscribe('color', partial(log_zone, name))
+        if args.verbose:
+            rider.subscribe('power', lambda power, name=name: logging.info(f"{name}Puissance : {power} W"))
+        rider_supervisors = rider.start_session(args.device if rider is pipeline else None)
+        if rider_supervisors:
+            led_renderer.submit(*rider.zone_colors[0], channel=rider.channel)
+            logging.info(f"TrainerLED sans interface : {name}{rider_supervisors[0].address}, profil {rider.active_profile!r}")
+        supervisors += rider_supervisors
+    if not supervisors:
+        logging.error("Aucun home trainer : indiquez --device ou default_device dans la configuration")
+        led_renderer.stop()
+        led_output.close()
+        return 2
+    metrics_server = serve_metrics(registry, pipeline.metrics_port) if pipeline.metrics_port else None
+    sample_feed = None
+    if pipeline.feed_udp or pipeline.feed_port:
+        try:
+            sample_feed = SampleFeed(pipeline.feed_udp, pipeline.feed_port).start()
+        except (OSError, ValueError):
+            logging.error("Diffusion des échantillons impossible, poursuite sans diffusion", exc_info=True)
+        else:
+            for rider in riders:
+                sample_feed.attach(rider)
+    try:
+        asyncio.run(run(supervisors, args.duration, partial(reload_config, config_store, riders, args.profile)))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for rider in riders:
+            rider.stop_recording(wait=True)
+        led_renderer.stop()
+        led_output.set_colors({rider.channel: (0, 0, 0) for rider in riders})
+        led_output.close()
+        gatt_cache.close()
+        config_store.close()
+        if metrics_server is not None:
+            metrics_server.shutdown()
+        if sample_feed is not None:
+            sample_feed.close()
+            logging.info(f"Diffusion des échantillons : {sample_feed.stats()}")
+        logging.info(f"Connexions Bluetooth : {[supervisor.metrics() for supervisor in supervisors]}")
+        logging.info(f"Statistiques du rendu LED : {led_renderer.stats()}")
+        summaries = {rider.name: rider.ride_summary() for rider in riders}
+        for name, summary in summaries.items():
+            logging.info(f"Résumé de la sortie {name or 'du cycliste principal'} : {summary}")
+        if args.summary:
+            try:
+                with open(args.summary, 'w') as f:
+                    json.dump(summaries, f, indent=1)
+            except OSError:
+                logging.error(f"Écriture du résumé impossible : {args.summary}", exc_info=True)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
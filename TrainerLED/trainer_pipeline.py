@@ -0,0 +1,558 @@
+import asyncio
+import copy
+import logging
+import os
+import threading
+import time
+from functools import partial
+from ble_supervisor import BleSupervisor
+from input_sources import CyclingPowerSource, ReplayBleClient, make_source
+from led_effects import EFFECTS
+from ride_analytics import RideAnalytics
+from metrics import registry
+from session_recorder import SessionRecorder
+from smoothing import make_filter
+from zones import ZoneStateMachine, make_profile
+
+# Cœur de TrainerLED, sans Qt ni matplotlib : utilisé par l'interface graphique (TrainerLED.py)
+# et par le mode sans interface (trainer_daemon.py).
+
+# Zones par défaut : limites hautes des zones 1 à 6 (W) et couleurs des zones 1 à 7
+DEFAULT_ZONE_THRESHOLDS = [106, 146, 175, 205, 234, 293]
+DEFAULT_ZONE_COLORS = [
+    (255, 255, 255),  # Default color for zone 1
+    (0, 0, 255),      # Default color pour zone 2
+    (0, 255, 0),      # Default color pour zone 3
+    (255, 255, 0),    # Default color pour zone 4
+    (255, 165, 0),    # Default color pour la zone 5
+    (255, 0, 0),      # Default color pour la zone 6
+    (128, 0, 128)     # Default color pour la zone 7
+]
+
+# Profil des zones personnalisées (seuils et couleurs en tête de config.json)
+CUSTOM_PROFILE = ''
+
+# Hystérésis par défaut aux limites des zones (bande en watts, temps minimum en secondes)
+DEFAULT_HYSTERESIS_WATTS = 5
+DEFAULT_HYSTERESIS_DWELL = 0.0
+
+# Lissage de la puissance par sortie : "led" pour les zones et les LED, "label" pour l'affichage
+DEFAULT_SMOOTHING = {'led': 'sma:10', 'label': 'sma:10'}
+
+# Circonférence de roue (m) pour calculer la vitesse à partir des tours de roue
+DEFAULT_WHEEL_CIRCUMFERENCE = 2.105
+
+# Profil Bluetooth du home trainer ("cycling_power", "ftms" ou "heart_rate") et grandeur
+# qui détermine la zone ("power" ou "heart_rate")
+DEFAULT_INPUT_PROFILE = 'cycling_power'
+DEFAULT_ZONE_METRIC = 'power'
+
+# Dossier des enregistrements de sortie
+DEFAULT_RECORDING_DIR = 'sessions'
+
+# Fréquence de rafraîchissement de l'interface (images par seconde)
+DEFAULT_GUI_REFRESH_HZ = 10
+
+# Effet des LED ("fade", "bar" ou "gradient", voir led_effects) et plafond de trames par seconde
+DEFAULT_LED_EFFECT = 'fade'
+DEFAULT_LED_FPS = 30
+
+# Diffusion locale des échantillons (voir sample_feed) : groupe UDP "hôte:port" et port
+# WebSocket sur 127.0.0.1, désactivées par défaut
+DEFAULT_FEED_UDP = ''
+DEFAULT_FEED_PORT = 0
+
+# Autres réglages de config.json et leur valeur par défaut (les seuils et couleurs des
+# zones personnalisées, obligatoires, sont lus à part)
+DEFAULT_SETTINGS = {
+    'default_device': '',
+    'default_language': 'fr',
+    'hysteresis_watts': DEFAULT_HYSTERESIS_WATTS,
+    'hysteresis_dwell': DEFAULT_HYSTERESIS_DWELL,
+    'led_targets': [],
+    'led_batch': True,
+    'smoothing': DEFAULT_SMOOTHING,
+    'wheel_circumference': DEFAULT_WHEEL_CIRCUMFERENCE,
+    'input_profile': DEFAULT_INPUT_PROFILE,
+    'extra_sources': [],
+    'zone_metric': DEFAULT_ZONE_METRIC,
+    'replay_file': '',
+    'recording_enabled': True,
+    'recording_dir': DEFAULT_RECORDING_DIR,
+    'zone_profiles': {},
+    'active_profile': CUSTOM_PROFILE,
+    'chart_gradient': False,
+    'scan_all_devices': False,
+    'metrics_port': 0,
+    'riders': [],
+    'gui_refresh_hz': DEFAULT_GUI_REFRESH_HZ,
+    'led_effect': DEFAULT_LED_EFFECT,
+    'led_fps': DEFAULT_LED_FPS,
+    'led_pulse': False,
+    'feed_udp': DEFAULT_FEED_UDP,
+    'feed_port': DEFAULT_FEED_PORT,
+}
+
+# Réglages qu'une fiche de cycliste supplémentaire (riders) peut remplacer ; les autres
+# viennent des réglages généraux de config.json
+RIDER_SETTINGS = ('hysteresis_watts', 'hysteresis_dwell', 'wheel_circumference', 'input_profile',
+                  'zone_metric', 'recording_enabled')
+
+# UUID du service et de la caractéristique pour les notifications de puissance
+SERVICE_UUID = '00001818-0000-1000-8000-00805f9b34fb'
+CHARACTERISTIC_UUID = '00002a63-0000-1000-8000-00805f9b34fb'
+
+# Mesures des chemins critiques : décodage des notifications et classement en zone
+notification_count = registry.counter('ble.notifications')
+notification_errors = registry.counter('ble.notification_errors')
+parse_time = registry.histogram('ble.parse_s')
+classify_time = registry.histogram('zones.classify_s')
+zone_changes = registry.counter('zones.changes')
+
+
+# Pipeline notifications Bluetooth -> zones -> LED, sans interface graphique.
+# Les évènements sont transmis par de simples fonctions de rappel (voir subscribe),
+# appelées depuis le thread Bluetooth :
+#   'sample' (échantillon décodé, après son classement en zone), 'power' (puissance lissée),
+#   'cadence', 'speed', 'heart_rate',
+#   'color' (couleur, numéro de zone) au changement de zone,
+#   'connection_state' (adresse, état (voir ble_supervisor), détails : tentative, délai
+#   avant reconnexion, temps de reconnexion).
+# Un pipeline par cycliste : `rider` est la fiche d'un cycliste supplémentaire de config.json
+# (voir create_riders), None pour le cycliste principal décrit par les réglages généraux.
+class TrainerPipeline:
+    def __init__(self, config_store, led_output, led_renderer, gatt_cache=None, rider=None):
+        logging.info("Initialisation du gestionnaire de notifications de puissance")
+        self.rider = rider
+        self.name = rider['name'] if rider is not None else ''
+        # Canal de rendu des LED : les cibles de ce cycliste dans la sortie partagée
+        self.channel = self.name if rider is not None else None
+        self.config_store = config_store
+        self.led_output = led_output
+        self.led_renderer = led_renderer
+        self.gatt_cache = gatt_cache
+        self.listeners = {}
+        config = self.load_config()
+        self.zone_thresholds = config['thresholds']
+        self.zone_colors = config['colors']
+        self.default_device = config['default_device']
+        self.default_language = config['default_language']
+        self.hysteresis_watts = config['hysteresis_watts']
+        self.hysteresis_dwell = config['hysteresis_dwell']
+        self.led_targets = config['led_targets']
+        self.led_batch = config['led_batch']
+        self.smoothing = config['smoothing']
+        self.wheel_circumference = config['wheel_circumference']
+        self.input_profile = config['input_profile']
+        self.extra_sources = config['extra_sources']
+        self.zone_metric = config['zone_metric']
+        self.replay_file = config['replay_file']
+        self.recording_enabled = config['recording_enabled']
+        self.recording_dir = config['recording_dir']
+        self.chart_gradient = config['chart_gradient']
+        self.scan_all_devices = config['scan_all_devices']
+        self.metrics_port = config['metrics_port']
+        self.riders = config['riders']
+        self.gui_refresh_hz = config['gui_refresh_hz']
+        self.led_effect = config['led_effect']
+        self.led_fps = config['led_fps']
+        self.led_pulse = config['led_pulse']
+        self.feed_udp = config['feed_udp']
+        self.feed_port = config['feed_port']
+        zone_profiles = config['zone_profiles']
+        active_profile = config['active_profile']
+        if rider is not None:
+            active_profile = self.apply_rider(rider, active_profile)
+        self.recorder = None
+        self.set_zone_profiles(self.zone_thresholds, self.zone_colors, zone_profiles, active_profile)
+        self.trainer_source = self.create_source(self.input_profile)
+        self.sources = {}
+        self.zone_state = ZoneStateMachine(self.hysteresis_watts, self.hysteresis_dwell)
+        self.applied_zones = None
+        self.led_filter = self.create_filter('led')
+        self.label_filter = self.create_filter('label')
+        self.analytics = RideAnalytics()
+        if rider is None:
+            led_output.configure(self.led_targets, self.led_batch)
+            led_renderer.configure_effect(self.led_effect, self.led_fps, self.led_pulse)
+        logging.info("Configuration chargée")
+
+    # Fiche d'un cycliste supplémentaire : son matériel (device, extra_sources, replay_file),
+    # ses LED (led_targets), son profil de zones (profile), son lissage et les RIDER_SETTINGS.
+    # Renvoie le profil de zones à activer.
+    def apply_rider(self, rider, active_profile):
+        self.default_device = rider.get('device', '')
+        self.led_targets = rider.get('led_targets', [])
+        self.extra_sources = rider.get('extra_sources', [])
+        self.replay_file = rider.get('replay_file', '')
+        self.smoothing = dict(self.smoothing, **rider.get('smoothing', {}))
+        for key in RIDER_SETTINGS:
+            if key in rider:
+                setattr(self, key, rider[key])
+        self.recording_dir = os.path.join(self.recording_dir, self.name)
+        self.riders = []
+        return rider.get('profile', active_profile)
+
+    # Comme les profils de zones, les listes d'abonnés sont remplacées d'un bloc et jamais
+    # modifiées sur place : le thread Bluetooth peut les parcourir sans verrou
+    def subscribe(self, event, callback):
+        self.listeners[event] = self.listeners.get(event, ()) + (callback,)
+
+    def unsubscribe(self, event, callback):
+        callbacks = list(self.listeners.get(event, ()))
+        callbacks.remove(callback)
+        self.listeners[event] = tuple(callbacks)
+
+    def notify(self, event, *args):
+        for callback in self.listeners.get(event, ()):
+            callback(*args)
+
+    # Réglages de config.json par nom ; valeurs par défaut si le fichier est absent ou invalide
+    def load_config(self):
+        try:
+            config = self.config_store.load()
+            settings = {
+                'thresholds': config['thresholds'],
+                'colors': [tuple(color) for color in config['colors']],
+            }
+        except (FileNotFoundError, KeyError, ValueError):
+            logging.error("Erreur lors du chargement de la configuration", exc_info=True)
+            config = {}
+            settings = {'thresholds': list(DEFAULT_ZONE_THRESHOLDS), 'colors': list(DEFAULT_ZONE_COLORS)}
+        for key, default in DEFAULT_SETTINGS.items():
+            settings[key] = config.get(key, copy.deepcopy(default))
+        settings['smoothing'] = dict(DEFAULT_SMOOTHING, **settings['smoothing'])
+        if settings['led_effect'] not in EFFECTS:
+            logging.error(f"Effet LED inconnu : {settings['led_effect']!r}, utilisation de {DEFAULT_LED_EFFECT!r}")
+            settings['led_effect'] = DEFAULT_LED_EFFECT
+        return settings
+
+    def save_config(self):
+        # Les cyclistes supplémentaires sont décrits dans config.json (riders) et ne l'écrivent pas
+        if self.rider is not None:
+            return
+        custom = self.zone_profiles[CUSTOM_PROFILE]
+        config = {
+            'thresholds': list(custom['thresholds']),
+            'colors': [list(color) for color in custom['colors']],
+            'default_device': self.default_device,
+            'default_language': self.default_language,
+            'hysteresis_watts': self.hysteresis_watts,
+            'hysteresis_dwell': self.hysteresis_dwell,
+            'led_targets': self.led_targets,
+            'led_batch': self.led_batch,
+            'smoothing': self.smoothing,
+            'wheel_circumference': self.wheel_circumference,
+            'input_profile': self.input_profile,
+            'extra_sources': self.extra_sources,
+            'zone_metric': self.zone_metric,
+            'replay_file': self.replay_file,
+            'recording_enabled': self.recording_enabled,
+            'recording_dir': self.recording_dir,
+            'zone_profiles': {name: spec for name, spec in self.zone_profiles.items() if name != CUSTOM_PROFILE},
+            'active_profile': self.active_profile,
+            'chart_gradient': self.chart_gradient,
+            'scan_all_devices': self.scan_all_devices,
+            'metrics_port': self.metrics_port,
+            'riders': self.riders,
+            'gui_refresh_hz': self.gui_refresh_hz,
+            'led_effect': self.led_effect,
+            'led_fps': self.led_fps,
+            'led_pulse': self.led_pulse,
+            'feed_udp': self.feed_udp,
+            'feed_port': self.feed_port
+        }
+        self.config_store.save(config)
+
+    def create_filter(self, output):
+        try:
+            return make_filter(self.smoothing[output])
+        except (KeyError, ValueError):
+            logging.error(f"Lissage invalide pour la sortie {output}, utilisation de {DEFAULT_SMOOTHING[output]}", exc_info=True)
+            return make_filter(DEFAULT_SMOOTHING[output])
+
+    def create_source(self, profile):
+        # Les UUID de puissance restent modifiables en tête de fichier (voir README)
+        if profile == CyclingPowerSource.profile:
+            return CyclingPowerSource(SERVICE_UUID, CHARACTERISTIC_UUID, self.wheel_circumference)
+        return make_source(profile)
+
+    # Sources à écouter, regroupées par adresse : le home trainer puis les sources supplémentaires
+    # de la configuration, par exemple {"device": "XX:XX:XX:XX:XX:XX", "profile": "heart_rate"}
+    def device_sources(self, trainer_address):
+        self.sources = {trainer_address: [self.trainer_source]}
+        for extra in self.extra_sources:
+            try:
+                source = self.create_source(extra['profile'])
+            except (KeyError, ValueError):
+                logging.error(f"Source d'entrée invalide : {extra}", exc_info=True)
+                continue
+            self.sources.setdefault(extra.get('device', trainer_address), []).append(source)
+        return self.sources
+
+    # Client Bluetooth : le matériel, ou un enregistrement rejoué au lieu du matériel (replay_file)
+    def client_factory(self):
+        if not self.replay_file:
+            return bleak_client
+        replay_file = self.replay_file
+        return lambda address, **kwargs: ReplayBleClient.from_file(address, replay_file, loop=True, **kwargs)
+
+    # Début d'une sortie : lissage remis à zéro, enregistrement, un superviseur par périphérique.
+    # Sans adresse, celle de la configuration ; aucun superviseur si le cycliste n'a pas de home trainer.
+    def start_session(self, device=None):
+        device = device or self.default_device
+        if not device and self.replay_file:
+            device = f'REPLAY-{self.name}' if self.name else 'REPLAY'
+        if not device:
+            logging.warning(f"Aucun home trainer pour le cycliste {self.name or 'principal'}")
+            return []
+        self.reset_smoothing()
+        self.analytics.reset()
+        sources = self.device_sources(device)
+        self.start_recording()
+        return create_supervisors(self, sources, self.client_factory())
+
+    # FTP du profil de zones actif, None si le profil n'est pas défini par une FTP
+    def ftp(self):
+        return self.zone_profiles.get(self.active_profile, {}).get('ftp')
+
+    # Résumé de la sortie en cours (voir ride_analytics) : NP, IF, TSS, temps en zone, meilleures puissances
+    def ride_summary(self):
+        return self.analytics.summary(self.ftp())
+
+    def start_recording(self):
+        self.stop_recording()
+        if not self.recording_enabled:
+            return
+        try:
+            recorder = SessionRecorder.create(self.recording_dir)
+            # Canaux déclarés d'avance avec l'adresse du périphérique de chaque source
+            for address, sources in self.sources.items():
+                for source in sources:
+                    recorder.channel(source, address)
+            self.recorder = recorder
+            logging.info(f"Enregistrement de la sortie dans {recorder.path}")
+        except OSError:
+            logging.error("Impossible de créer l'enregistrement de la sortie", exc_info=True)
+
+    # La dernière écriture sur disque se fait hors du thread de l'interface, sauf si wait=True
+    def stop_recording(self, wait=False):
+        recorder, self.recorder = self.recorder, None
+        if recorder is None:
+            return
+        if wait:
+            recorder.close()
+        else:
+            threading.Thread(target=recorder.close).start()
+
+    def reset_smoothing(self):
+        self.trainer_source.reset()
+        for sources in self.sources.values():
+            for source in sources:
+                source.reset()
+        self.led_filter.reset()
+        self.label_filter.reset()
+        self.zone_state.reset()
+
+    def restore_default_config(self):
+        # Les profils nommés sont conservés, les zones personnalisées reprennent les valeurs par défaut
+        self.zone_profiles[CUSTOM_PROFILE] = {'thresholds': list(DEFAULT_ZONE_THRESHOLDS),
+                                              'colors': list(DEFAULT_ZONE_COLORS)}
+        self.select_zone_profile(CUSTOM_PROFILE, save=False)
+        self.default_device = ''
+        self.default_language = 'fr'
+        self.hysteresis_watts = DEFAULT_HYSTERESIS_WATTS
+        self.hysteresis_dwell = DEFAULT_HYSTERESIS_DWELL
+        self.zone_state = ZoneStateMachine(self.hysteresis_watts, self.hysteresis_dwell)
+        self.smoothing = dict(DEFAULT_SMOOTHING)
+        self.led_filter = self.create_filter('led')
+        self.label_filter = self.create_filter('label')
+        self.save_config()
+
+    def set_default_device(self, device_address):
+        self.default_device = device_address
+        self.save_config()
+
+    def get_zone_ranges(self):
+        ranges = []
+        lower_bound = 0
+        for threshold in self.zone_thresholds:
+            ranges.append((lower_bound, threshold))
+            lower_bound = threshold + 1
+        ranges.append((lower_bound, float('inf')))  # La dernière plage est ouverte
+        return ranges
+
+    # Profils de zones : les zones personnalisées et les profils nommés de la configuration
+    def set_zone_profiles(self, thresholds, colors, zone_profiles, active_profile):
+        self.zone_profiles = {CUSTOM_PROFILE: {'thresholds': list(thresholds), 'colors': list(colors)}}
+        self.zone_profiles.update((name, dict(spec)) for name, spec in zone_profiles.items() if name != CUSTOM_PROFILE)
+        try:
+            self.select_zone_profile(active_profile, save=False)
+        except (KeyError, ValueError, TypeError):
+            logging.error(f"Profil de zones invalide : {active_profile!r}, utilisation des zones personnalisées", exc_info=True)
+            self.select_zone_profile(CUSTOM_PROFILE, save=False)
+
+    # Calcule le profil puis le publie d'un bloc : la session Bluetooth continue sans interruption
+    # et le prochain échantillon utilise les nouveaux seuils et couleurs
+    def select_zone_profile(self, name, save=True):
+        profile = make_profile(name, self.zone_profiles[name], DEFAULT_ZONE_THRESHOLDS, DEFAULT_ZONE_COLORS)
+        self.active_profile = name
+        self.zone_thresholds = list(profile.thresholds)
+        self.zone_colors = list(profile.colors)
+        self.zones = profile
+        if save:
+            self.save_config()
+
+    def set_profile_ftp(self, ftp):
+        spec = self.zone_profiles[self.active_profile]
+        spec['ftp'] = ftp
+        spec.pop('thresholds', None)  # Les seuils sont recalculés à partir de la FTP
+        self.select_zone_profile(self.active_profile)
+
+    # Zones modifiées par un autre programme dans config.json
+    # Un cycliste supplémentaire garde son propre profil actif
+    def reload_zones(self, config):
+        try:
+            active_profile = config.get('active_profile', CUSTOM_PROFILE) if self.rider is None else self.active_profile
+            self.set_zone_profiles(config['thresholds'], [tuple(color) for color in config['colors']],
+                                   config.get('zone_profiles', {}), active_profile)
+            logging.info(f"Zones rechargées depuis {self.config_store.path}")
+        except (KeyError, ValueError, TypeError):
+            logging.error(f"Zones invalides dans {self.config_store.path}, modification ignorée", exc_info=True)
+
+    # Les listes ne sont jamais modifiées sur place : un nouveau profil est publié à chaque changement
+    def set_zone_threshold(self, index, value):
+        thresholds = list(self.zone_thresholds)
+        thresholds[index] = value
+        self.zone_profiles[self.active_profile]['thresholds'] = thresholds
+        self.select_zone_profile(self.active_profile)
+
+    def set_zone_color(self, index, color):
+        colors = list(self.zone_colors)
+        colors[index] = color
+        self.zone_profiles[self.active_profile]['colors'] = colors
+        self.select_zone_profile(self.active_profile)
+
+    def handle_notification(self, sender, data, source=None):
+        try:
+            source = source or self.trainer_source
+            recorder = self.recorder
+            if recorder is not None:
+                recorder.record_packet(source, data)
+            notification_count.inc()
+            start = time.perf_counter()
+            sample = source.decode(data, time.monotonic())
+            parse_time.observe(time.perf_counter() - start)
+            if recorder is not None:
+                recorder.record_sample(source, sample)
+            self.handle_sample(sample)
+            self.notify('sample', sample)
+        except Exception:
+            notification_errors.inc()
+            logging.error("Erreur lors de la gestion des données de puissance", exc_info=True)
+
+    def handle_sample(self, sample):
+        now = sample.time
+        if sample.cadence is not None:
+            self.notify('cadence', round(sample.cadence))
+        if sample.speed is not None:
+            self.notify('speed', sample.speed)
+        if sample.heart_rate is not None:
+            self.notify('heart_rate', sample.heart_rate)
+
+        # Chaque sortie a son propre lissage, disponible dès le premier échantillon
+        if sample.power is not None:
+            self.notify('power', int(self.label_filter.update(sample.power, now)))
+
+        # Les LED et l'affichage de la zone ne sont mis à jour qu'au changement de zone
+        value = sample.heart_rate if self.zone_metric == 'heart_rate' else sample.power
+        # Un seul accès au profil publié par l'interface ; un nouveau profil réévalue la zone
+        zones = self.zones
+        self.analytics.update(now, sample.power, value, zones.index)
+        if value is None:
+            return
+        if zones is not self.applied_zones:
+            self.applied_zones = zones
+            self.zone_state.reset()
+        start = time.perf_counter()
+        led_value = self.led_filter.update(value, now)
+        zone = self.zone_state.update(led_value, zones.index, now)
+        classify_time.observe(time.perf_counter() - start)
+        if zone is not None:
+            zone_changes.inc()
+            new_color = zones.colors[zone]
+            self.notify('color', new_color, zone + 1)
+            # L'effet est celui du rendu partagé par tous les cyclistes (réglages généraux ou
+            # ligne de commande du mode sans interface)
+            if self.led_renderer.effect == 'fade':
+                self.led_renderer.submit(*new_color, channel=self.channel)
+        # Les effets par LED suivent la valeur lissée à chaque échantillon
+        self.led_renderer.submit_power(led_value, zones.index, self.channel)
+
+
+# Client Bluetooth du matériel : bleak n'est importé qu'à la première connexion, dans le thread Bluetooth
+def bleak_client(address, **kwargs):
+    from bleak import BleakClient
+    return BleakClient(address, **kwargs)
+
+
+# Un superviseur de connexion par périphérique (home trainer, ceinture cardio...)
+# Avec le matériel, une carte GATT en cache limite la découverte aux services utilisés
+def create_supervisors(pipeline, device_sources, client_factory=bleak_client):
+    supervisors = []
+    for address, sources in device_sources.items():
+        client_kwargs = {}
+        if client_factory is bleak_client and pipeline.gatt_cache is not None:
+            services = pipeline.gatt_cache.required_services(address, sources)
+            if services:
+                client_kwargs['services'] = services
+        supervisors.append(BleSupervisor(address, sources, pipeline.handle_notification, client_factory,
+                                         on_state=partial(pipeline.notify, 'connection_state'),
+                                         gatt_cache=pipeline.gatt_cache, client_kwargs=client_kwargs))
+    return supervisors
+
+
+# Tous les cyclistes du processus : le cycliste principal (réglages généraux de config.json),
+# puis un pipeline par fiche de "riders" et par fiche de `extra` (ligne de commande).
+# Ils partagent la sortie et le rendu des LED, où chacun a son groupe de cibles.
+def create_riders(config_store, led_output, led_renderer, gatt_cache=None, extra=()):
+    primary = TrainerPipeline(config_store, led_output, led_renderer, gatt_cache)
+    riders = [primary]
+    for spec in list(primary.riders) + list(extra):
+        try:
+            if not spec['name'] or any(rider.name == spec['name'] for rider in riders):
+                raise ValueError(f"Nom de cycliste vide ou en double : {spec['name']!r}")
+            riders.append(TrainerPipeline(config_store, led_output, led_renderer, gatt_cache, rider=spec))
+        except (KeyError, TypeError, ValueError):
+            logging.error(f"Cycliste invalide : {spec!r}", exc_info=True)
+    configure_led_groups(riders)
+    return riders
+
+
+def configure_led_groups(riders):
+    riders[0].led_output.configure_groups({rider.channel: rider.led_targets for rider in riders}, riders[0].led_batch)
+
+
+# Toutes les sources sont écoutées sur la même boucle asyncio, jusqu'à l'arrêt des superviseurs
+async def main(supervisors):
+    await asyncio.gather(*(supervisor.run() for supervisor in supervisors))
+
+
+# Session de réception : les superviseurs tournent sur la boucle de l'exécuteur Bluetooth partagé
+class BleSession:
+    def __init__(self, supervisors, executor):
+        self.supervisors = supervisors
+        self.future = executor.submit(lambda: main(supervisors), key='session', limited=False)
+
+    # Arrêt depuis un autre thread (interface) : les connexions sont fermées proprement
+    def stop(self, timeout=None):
+        for supervisor in self.supervisors:
+            supervisor.stop()
+        if timeout is not None:
+            try:
+                self.future.result(timeout)
+            except Exception:
+                pass
+
+    def metrics(self):
+        return {supervisor.address: supervisor.metrics() for supervisor in self.supervisors}
@@ -0,0 +1,144 @@
+import time
+from bisect import bisect_left
+from collections import namedtuple
+from functools import partial
+
+# Limites hautes des zones 1 à 6 en pourcentage de la FTP (modèle de Coggan)
+DEFAULT_FTP_PERCENTAGES = (55, 75, 90, 105, 120, 150)
+
+# Profil de zones immuable : il est remplacé d'un bloc, jamais modifié sur place,
+# pour que le thread Bluetooth voie toujours un ensemble cohérent de seuils et de couleurs
+ZoneProfile = namedtuple('ZoneProfile', ['name', 'thresholds', 'colors', 'index'])
+
+# Étendue du dégradé de couleurs précalculé, en watts
+GRADIENT_MAX_WATTS = 2000
+
+
+# Indice de la zone (0 pour la zone 1) correspondant à une puissance
+def classify_zone(power, thresholds):
+    for i, threshold in enumerate(thresholds):
+        if power <= threshold:
+            return i
+    return len(thresholds)
+
+
+# Index des zones précalculé une fois par profil : recherche dichotomique dans les seuils
+# figés (même résultat que classify_zone quand les seuils sont croissants) et couleurs
+# en cache, en RVB 0-255 pour les LED et en 0-1 pour matplotlib.
+class ZoneIndex:
+    def __init__(self, thresholds, colors):
+        self.thresholds = tuple(thresholds)
+        self.colors = tuple(tuple(color) for color in colors)
+        self.chart_colors = tuple(tuple(component / 255 for component in color) for color in self.colors)
+        if list(self.thresholds) == sorted(self.thresholds):
+            self.zone = partial(bisect_left, self.thresholds)
+        else:
+            # Seuils dans le désordre (curseurs en cours de réglage) : parcours linéaire
+            self.zone = partial(_classify_zone, self.thresholds)
+        self.gradient = None
+
+    def color(self, power):
+        return self.colors[self.zone(power)]
+
+    def chart_color(self, power):
+        return self.chart_colors[self.zone(power)]
+
+    # Couleur 0-1 interpolée entre les milieux des zones, table par watt construite au premier appel
+    def gradient_color(self, power):
+        if self.gradient is None:
+            self.gradient = self.build_gradient()
+        watts = int(power)
+        if watts < 0:
+            watts = 0
+        elif watts > GRADIENT_MAX_WATTS:
+            watts = GRADIENT_MAX_WATTS
+        return self.gradient[watts]
+
+    def build_gradient(self):
+        bounds = (0,) + self.thresholds
+        last_width = self.thresholds[-1] - self.thresholds[-2] if len(self.thresholds) > 1 else self.thresholds[-1]
+        centers = [(low + high) / 2 for low, high in zip(bounds, bounds[1:])] + [self.thresholds[-1] + last_width / 2]
+        gradient = []
+        segment = 0
+        for watts in range(GRADIENT_MAX_WATTS + 1):
+            while segment < len(centers) - 2 and watts > centers[segment + 1]:
+                segment += 1
+            low, high = centers[segment], centers[segment + 1]
+            ratio = min(1.0, max(0.0, (watts - low) / (high - low))) if high > low else 1.0
+            start, end = self.chart_colors[segment], self.chart_colors[segment + 1]
+            gradient.append(tuple(s + (e - s) * ratio for s, e in zip(start, end)))
+        return tuple(gradient)
+
+
+def _classify_zone(thresholds, power):
+    return classify_zone(power, thresholds)
+
+
+# Machine à états des zones avec hystérésis : une bande en watts autour des seuils
+# et/ou un temps minimum passé dans la nouvelle zone avant de changer.
+# update() ne renvoie la zone que lorsque la zone effective change, sinon None.
+class ZoneStateMachine:
+    def __init__(self, hysteresis_watts=0, min_dwell=0.0):
+        self.hysteresis_watts = hysteresis_watts
+        self.min_dwell = min_dwell
+        self.zone = None
+        self.candidate = None
+        self.candidate_since = 0.0
+
+    def reset(self):
+        self.zone = None
+        self.candidate = None
+
+    # `index` : ZoneIndex du profil actif
+    def update(self, power, index, now=None):
+        raw_zone = index.zone(power)
+        thresholds = index.thresholds
+        if self.zone is None:
+            self.zone = raw_zone
+            self.candidate = None
+            return raw_zone
+        if raw_zone == self.zone:
+            self.candidate = None
+            return None
+
+        # La puissance doit sortir de la bande d'hystérésis autour du seuil franchi
+        if raw_zone > self.zone:
+            inside_band = power <= thresholds[self.zone] + self.hysteresis_watts
+        else:
+            inside_band = power > thresholds[self.zone - 1] - self.hysteresis_watts
+        if inside_band:
+            self.candidate = None
+            return None
+
+        if now is None:
+            now = time.monotonic()
+        if self.candidate != raw_zone:
+            self.candidate = raw_zone
+            self.candidate_since = now
+        if now - self.candidate_since < self.min_dwell:
+            return None
+
+        self.zone = raw_zone
+        self.candidate = None
+        return raw_zone
+
+
+def ftp_thresholds(ftp, percentages=DEFAULT_FTP_PERCENTAGES):
+    return tuple(round(ftp * percentage / 100) for percentage in percentages)
+
+
+# Profil à partir de sa description dans la configuration : seuils explicites ("thresholds"),
+# ou FTP ("ftp") et pourcentages facultatifs ("percentages"), couleurs facultatives ("colors").
+# Les seuils explicites l'emportent sur la FTP.
+def make_profile(name, spec, default_thresholds, default_colors):
+    if 'thresholds' in spec:
+        thresholds = tuple(int(threshold) for threshold in spec['thresholds'])
+    elif 'ftp' in spec:
+        thresholds = ftp_thresholds(spec['ftp'], spec.get('percentages', DEFAULT_FTP_PERCENTAGES))
+    else:
+        thresholds = tuple(default_thresholds)
+    colors = tuple(tuple(color) for color in spec.get('colors', default_colors))
+    if len(thresholds) != len(default_thresholds) or len(colors) != len(thresholds) + 1:
+        raise ValueError(f"Profil de zones {name!r} : {len(default_thresholds)} seuils et "
+                         f"{len(default_thresholds) + 1} couleurs attendus")
+    return ZoneProfile(name, thresholds, colors, ZoneIndex(thresholds, colors))